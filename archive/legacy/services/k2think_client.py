@@ -5,6 +5,7 @@ Replaces old Mistral 7B implementation.
 
 import os
 import requests
+from requests.adapters import HTTPAdapter
 from typing import Dict, Any, Optional
 import json
 
@@ -15,17 +16,25 @@ class K2ThinkClient:
     Handles text analysis for sentiment and geopolitical risk assessment.
     """
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, session: Optional[requests.Session] = None):
         """
         Initialize K2 Think client.
         
         Args:
             api_key: API key from environment variable K2THINK_API_KEY if not provided
+            session: HTTP session to reuse; a pooled keep-alive session is created if not provided
         """
         self.api_key = api_key or os.environ.get("K2THINK_API_KEY", "")
         # TODO: Update with actual K2 Think API endpoint
         self.api_endpoint = os.environ.get("K2THINK_API_ENDPOINT", "https://api.k2think.com/v1/chat/completions")
         self.model = os.environ.get("K2THINK_MODEL", "k2-think")
+        
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
     
     def analyze_text(self, text: str) -> Dict[str, Any]:
         """
@@ -41,6 +50,7 @@ class K2ThinkClient:
                 - geopolitical_risk: str ("low", "medium", "high")
                 - explanation: str (reasoning text)
                 - relevant_sectors: list (sector names)
+                - fallback: True (only when the neutral default was returned)
         """
         if not self.api_key:
             # Fallback to neutral if no API key
@@ -49,7 +59,8 @@ class K2ThinkClient:
                 "sentiment": "neutral",
                 "geopolitical_risk": "medium",
                 "explanation": "LLM unavailable (API key not set). Returning neutral default.",
-                "relevant_sectors": []
+                "relevant_sectors": [],
+                "fallback": True
             }
         
         try:
@@ -69,7 +80,8 @@ class K2ThinkClient:
                 "sentiment": "neutral",
                 "geopolitical_risk": "medium",
                 "explanation": f"LLM error: {str(e)}. Returning neutral default.",
-                "relevant_sectors": []
+                "relevant_sectors": [],
+                "fallback": True
             }
     
     def _build_prompt(self, text: str) -> str:
@@ -125,7 +137,7 @@ Respond in JSON format:
             "max_tokens": 500
         }
         
-        response = requests.post(
+        response = self.session.post(
             self.api_endpoint,
             headers=headers,
             json=payload,
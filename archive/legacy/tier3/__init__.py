@@ -1,7 +1,14 @@
 """Tier 3: Hybrid Prediction Model"""
 
-from tier3.hybrid_predictor import HybridPredictor, generate_prediction
+from tier3.hybrid_predictor import HybridPredictor, PredictionSession, generate_prediction, get_prediction_session
 from tier3.mlp_model import MLPPredictor, predict_from_features
 
-__all__ = ["HybridPredictor", "generate_prediction", "MLPPredictor", "predict_from_features"]
+__all__ = [
+    "HybridPredictor",
+    "PredictionSession",
+    "generate_prediction",
+    "get_prediction_session",
+    "MLPPredictor",
+    "predict_from_features"
+]
 
@@ -3,8 +3,11 @@ Hybrid Prediction Model
 Combines MLP (numerical) and LLM (text) predictions.
 """
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+from collections import OrderedDict
+import hashlib
 import sys
+import threading
 from pathlib import Path
 
 # Add project root to path
@@ -16,16 +19,24 @@ from services.k2think_client import K2ThinkClient
 from services.sectors import match_sectors_from_text, get_all_sectors
 from services.companies import get_all_companies_for_sectors
 
+# Bump when the combine logic changes; cached predictions keyed on it are invalidated
+MODEL_VERSION = "legacy-hybrid-v1"
+
 
 class HybridPredictor:
     """
     Hybrid predictor combining MLP and LLM outputs.
     """
     
-    def __init__(self):
-        """Initialize hybrid predictor."""
+    def __init__(self, llm: Optional[K2ThinkClient] = None):
+        """
+        Initialize hybrid predictor.
+        
+        Args:
+            llm: LLM client to reuse; a new K2ThinkClient is created if not provided
+        """
         self.mlp = get_mlp_predictor()
-        self.llm = K2ThinkClient()
+        self.llm = llm or K2ThinkClient()
     
     def predict(self, numerical_features: List[float], text_input: str, 
                 risk_level: str = "medium", investment_horizon: str = "Mid") -> Dict[str, Any]:
@@ -45,7 +56,7 @@ class HybridPredictor:
         mlp_output = self.mlp.predict(numerical_features)
         
         # 2. LLM Analysis (text)
-        llm_output = self.llm.analyze_text(text_input)
+        llm_output = self._analyze_text(text_input)
         
         # 3. Combine predictions
         final_prediction = self._combine_predictions(
@@ -57,6 +68,18 @@ class HybridPredictor:
         
         return final_prediction
     
+    def _analyze_text(self, text: str) -> Dict[str, Any]:
+        """Run LLM analysis (overridden by PredictionSession to add caching)."""
+        return self.llm.analyze_text(text)
+    
+    def _companies_for(self, sectors: List[str]) -> List[str]:
+        """Company lookup (overridden by PredictionSession to add caching)."""
+        return get_all_companies_for_sectors(sectors, limit_per_sector=3)
+    
+    def _sectors(self) -> List[str]:
+        """Sector list (overridden by PredictionSession to load it once)."""
+        return get_all_sectors()
+    
     def _combine_predictions(self, mlp_output: Dict[str, Any], llm_output: Dict[str, Any],
                            risk_level: str, investment_horizon: str) -> Dict[str, Any]:
         """
@@ -92,7 +115,7 @@ class HybridPredictor:
         )
         
         # Company selection
-        top_companies = get_all_companies_for_sectors(recommended_sectors, limit_per_sector=3)
+        top_companies = self._companies_for(recommended_sectors)
         
         # Generate reasoning
         reasoning = self._generate_reasoning(
@@ -117,7 +140,8 @@ class HybridPredictor:
             "llm_output": {
                 "sentiment": llm_output["sentiment"],
                 "geopolitical_risk": llm_output["geopolitical_risk"],
-                "explanation": llm_explanation
+                "explanation": llm_explanation,
+                "fallback": llm_output.get("fallback", False)
             }
         }
     
@@ -144,7 +168,7 @@ class HybridPredictor:
             llm_sectors = ["Technology", "Healthcare", "Financials"]
         
         # Adjust based on risk level and horizon
-        all_sectors = get_all_sectors()
+        all_sectors = self._sectors()
         
         # Defensive sectors for high risk / short horizon
         if risk_level == "high" or investment_horizon == "Short":
@@ -212,9 +236,106 @@ class HybridPredictor:
         return " ".join(reasoning_parts)
 
 
+class PredictionSession(HybridPredictor):
+    """
+    Long-lived hybrid predictor.
+    Owns the MLP, one K2ThinkClient with a pooled keep-alive HTTP session,
+    the sector/company lookups and an LRU cache of LLM analyses, so
+    repeated calls skip client construction and connection setup. Safe to
+    share across threads: the caches are guarded by one lock, which is not
+    held during LLM calls.
+    """
+    
+    def __init__(self, llm: Optional[K2ThinkClient] = None, analysis_cache_size: int = 256):
+        """
+        Args:
+            llm: LLM client to reuse; a pooled K2ThinkClient is created if not provided
+            analysis_cache_size: Max distinct texts whose LLM analysis is kept
+        """
+        super().__init__(llm=llm)
+        self.model_version = self._compute_model_version()
+        self.all_sectors = get_all_sectors()
+        self.analysis_cache_size = analysis_cache_size
+        self._analysis_cache = OrderedDict()
+        self._companies_cache = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.cache_hits = 0
+    
+    def _compute_model_version(self) -> str:
+        """
+        MODEL_VERSION + K2 model name + digest of the MLP weights file, so
+        retraining the MLP or switching K2THINK_MODEL invalidates cached results.
+        """
+        mlp_digest = "untrained"
+        model_path = getattr(self.mlp, "model_path", None)
+        if model_path is not None and Path(model_path).exists():
+            with open(model_path, "rb") as f:
+                mlp_digest = hashlib.sha256(f.read()).hexdigest()[:12]
+        return f"{MODEL_VERSION}:{self.llm.model}:{mlp_digest}"
+    
+    def predict(self, numerical_features: List[float], text_input: str,
+                risk_level: str = "medium", investment_horizon: str = "Mid") -> Dict[str, Any]:
+        with self._lock:
+            self.calls += 1
+        return super().predict(numerical_features, text_input, risk_level, investment_horizon)
+    
+    def _analyze_text(self, text: str) -> Dict[str, Any]:
+        with self._lock:
+            cached = self._analysis_cache.get(text)
+            if cached is not None:
+                self._analysis_cache.move_to_end(text)
+                self.cache_hits += 1
+                return cached
+        
+        result = self.llm.analyze_text(text)
+        # Never cache the neutral fallback; the next call should retry the API
+        if not result.get("fallback"):
+            with self._lock:
+                self._analysis_cache[text] = result
+                self._analysis_cache.move_to_end(text)
+                while len(self._analysis_cache) > self.analysis_cache_size:
+                    self._analysis_cache.popitem(last=False)
+        return result
+    
+    def _companies_for(self, sectors: List[str]) -> List[str]:
+        key = tuple(sectors)
+        with self._lock:
+            companies = self._companies_cache.get(key)
+        if companies is None:
+            companies = get_all_companies_for_sectors(sectors, limit_per_sector=3)
+            with self._lock:
+                self._companies_cache[key] = companies
+        return list(companies)
+    
+    def _sectors(self) -> List[str]:
+        return self.all_sectors
+    
+    def clear_cache(self):
+        """Drop cached LLM analyses (e.g. after new Tier 1 text lands)."""
+        with self._lock:
+            self._analysis_cache.clear()
+    
+    def close(self):
+        """Release pooled HTTP connections."""
+        self.llm.session.close()
+
+
+# Global session shared by generate_prediction callers
+_session_instance = None
+
+def get_prediction_session() -> PredictionSession:
+    """Get or create the process-wide prediction session."""
+    global _session_instance
+    if _session_instance is None:
+        _session_instance = PredictionSession()
+    return _session_instance
+
+
 # Convenience function
 def generate_prediction(numerical_features: List[float], text_input: str,
-                       risk_level: str = "medium", investment_horizon: str = "Mid") -> Dict[str, Any]:
+                       risk_level: str = "medium", investment_horizon: str = "Mid",
+                       session: Optional[PredictionSession] = None) -> Dict[str, Any]:
     """
     Generate hybrid prediction.
     
@@ -223,10 +344,11 @@ def generate_prediction(numerical_features: List[float], text_input: str,
         text_input: Combined text
         risk_level: Risk preference
         investment_horizon: Time horizon
+        session: Session to use; defaults to the shared process-wide session
         
     Returns:
         Prediction dictionary
     """
-    predictor = HybridPredictor()
-    return predictor.predict(numerical_features, text_input, risk_level, investment_horizon)
+    session = session or get_prediction_session()
+    return session.predict(numerical_features, text_input, risk_level, investment_horizon)
 
@@ -0,0 +1,165 @@
+"""
+Backtest Results Log
+Every scored date is appended to a SQLite log as soon as its chunk finishes,
+keyed by run id and config hash. A rerun with the same run id skips the
+dates already in the log, and the final report is built from the log, so an
+interrupted backtest only pays for the days it had not reached.
+"""
+
+import hashlib
+import itertools
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from backend.backtesting.utils import DATA_DIR
+
+DEFAULT_LOG_PATH = DATA_DIR / "backtest_runs.sqlite"
+
+
+def config_hash(config: Dict[str, Any]) -> str:
+    """sha256 of everything that changes a run's results."""
+    payload = json.dumps(config, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def input_hash(features: List[float], text: str) -> str:
+    """Digest of one date's inputs; a logged row is reused only if they are unchanged."""
+    payload = json.dumps([[float(f"{float(v):.10g}") for v in features], text],
+                         separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class ResultsLog:
+    """
+    SQLite store with one table of runs (run id -> config hash) and one of
+    result rows (run id, date -> row JSON). Each append is its own
+    transaction, so a crash loses at most the chunk in flight. Lookups by a
+    list of dates go through a temporary table joined in SQL, so the log is
+    never loaded into memory.
+    """
+
+    def __init__(self, path: Optional[Path] = DEFAULT_LOG_PATH):
+        """
+        Args:
+            path: SQLite file (None keeps the log in memory, for one process)
+        """
+        if path is not None:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._temp_ids = itertools.count()
+        self._db = sqlite3.connect(":memory:" if path is None else str(path), isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            "run_id TEXT PRIMARY KEY, config_hash TEXT NOT NULL, config TEXT NOT NULL, "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "run_id TEXT NOT NULL, date TEXT NOT NULL, input_hash TEXT NOT NULL, "
+            "row TEXT NOT NULL, created_at REAL NOT NULL, PRIMARY KEY (run_id, date))"
+        )
+
+    def start_run(self, run_id: str, config: Dict[str, Any], fresh: bool = False) -> str:
+        """
+        Register a run (or reopen it) and return its config hash.
+
+        Raises:
+            ValueError: run_id already exists with a different config
+        """
+        digest = config_hash(config)
+        now = time.time()
+        row = self._db.execute("SELECT config_hash FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        if row is not None and row[0] != digest and not fresh:
+            raise ValueError(
+                f"Run {run_id} was logged with config {row[0]}, this run has {digest}; "
+                f"use another run id or start it fresh"
+            )
+        with self._db:
+            self._db.execute("BEGIN")
+            if fresh:
+                self._db.execute("DELETE FROM results WHERE run_id = ?", (run_id,))
+            self._db.execute(
+                "INSERT INTO runs (run_id, config_hash, config, created_at, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(run_id) DO UPDATE SET config_hash = excluded.config_hash, "
+                "config = excluded.config, updated_at = excluded.updated_at",
+                (run_id, digest, json.dumps(config, sort_keys=True, default=str), now, now),
+            )
+        return digest
+
+    @contextmanager
+    def _staged(self, columns: str, records: Iterable[tuple]) -> Iterator[str]:
+        """Temporary table of records (streamed in), dropped on exit; yields its name."""
+        table = f"staged_{next(self._temp_ids)}"
+        self._db.execute(f"CREATE TEMP TABLE {table} ({columns})")
+        try:
+            placeholders = ", ".join("?" * (columns.count(",") + 1))
+            with self._db:
+                self._db.execute("BEGIN")
+                self._db.executemany(f"INSERT OR IGNORE INTO {table} VALUES ({placeholders})", records)
+            yield table
+        finally:
+            self._db.execute(f"DROP TABLE IF EXISTS {table}")
+
+    def completed(self, run_id: str, dates: Sequence[str], input_hashes: Sequence[str]) -> np.ndarray:
+        """Boolean mask of the (date, input hash) pairs already logged for the run."""
+        done = np.zeros(len(dates), dtype=bool)
+        with self._staged("position INTEGER, date TEXT, input_hash TEXT",
+                          zip(itertools.count(), dates, input_hashes)) as table:
+            for (position,) in self._db.execute(
+                f"SELECT s.position FROM {table} s JOIN results r "
+                f"ON r.run_id = ? AND r.date = s.date AND r.input_hash = s.input_hash",
+                (run_id,),
+            ):
+                done[position] = True
+        return done
+
+    def append(self, run_id: str, rows: Iterable[Dict[str, Any]], input_hashes: Iterable[str]):
+        """Log result rows (each with a "date") in one transaction."""
+        now = time.time()
+        records = [(run_id, row["date"], digest, json.dumps(row), now)
+                   for row, digest in zip(rows, input_hashes)]
+        with self._db:
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                "INSERT OR REPLACE INTO results (run_id, date, input_hash, row, created_at) VALUES (?, ?, ?, ?, ?)",
+                records,
+            )
+            self._db.execute("UPDATE runs SET updated_at = ? WHERE run_id = ?", (now, run_id))
+
+    def latest_run(self) -> Optional[str]:
+        """Id of the most recently updated run, or None."""
+        row = self._db.execute("SELECT run_id FROM runs ORDER BY updated_at DESC LIMIT 1").fetchone()
+        return row[0] if row else None
+
+    def iter_rows(self, run_id: str, dates: Optional[Iterable[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Logged rows of the run in date order, optionally only for `dates`, streamed from a cursor."""
+        if dates is None:
+            # Own cursor, so appends on the connection do not reset the iteration
+            cursor = self._db.cursor()
+            cursor.execute("SELECT row FROM results WHERE run_id = ? ORDER BY date", (run_id,))
+            for (row,) in cursor:
+                yield json.loads(row)
+            return
+        with self._staged("date TEXT PRIMARY KEY", ((date,) for date in dates)) as table:
+            cursor = self._db.cursor()
+            cursor.execute(
+                f"SELECT r.row FROM results r JOIN {table} s ON s.date = r.date "
+                f"WHERE r.run_id = ? ORDER BY r.date",
+                (run_id,),
+            )
+            try:
+                for (row,) in cursor:
+                    yield json.loads(row)
+            finally:
+                # An open statement would keep the staged table from being dropped
+                cursor.close()
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,242 @@
+"""
+Backtest Data Sources
+Where the backtester reads its Tier 2 history from:
+
+    supabase  tier2_processed over the network, paged (no row cap)
+    snapshot  a local Parquet export of it, read with date-range predicate
+              pushdown (row groups outside the range are never decoded)
+
+Both return the flat records run_backtest.group_data_by_date expects. The
+snapshot is written by this module's CLI:
+
+    python -m backend.backtesting.data_sources --start 2020-01-01
+    python -m backend.backtesting.run_backtest --source snapshot --start 2024-01-01
+"""
+
+import argparse
+import json
+import os
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from backend import database
+
+SNAPSHOT_DIR = Path(__file__).parent.parent.parent / "data" / "snapshots"
+SOURCES = ("supabase", "snapshot")
+MACRO_FIELDS = ["inflation_rate", "interest_rate", "unemployment_rate", "GDP_growth", "sp500_index"]
+
+# Rows per Parquet row group; the unit the date filter skips
+ROW_GROUP_SIZE = 4096
+
+
+def flatten_tier2_record(record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Map a tier2_processed row onto the flat shape of the legacy combined
+    dataset: timestamp, the macro fields, and every headline of the row in
+    headlines_list (Supabase stores one row per day with all headlines).
+    Returns None for rows without numerical features.
+    """
+    nums = record.get("numerical_features")
+    if not nums:
+        return None
+
+    # numerical_features is a list holding one dict (pipeline output) or a dict
+    if isinstance(nums, list) and len(nums) > 0:
+        macro_feats = nums[0]
+    elif isinstance(nums, dict):
+        macro_feats = nums
+    else:
+        macro_feats = {}
+
+    flat_record = {"timestamp": record.get("created_at")}
+    for field in MACRO_FIELDS:
+        flat_record[field] = macro_feats.get(field, 0)
+
+    flat_record["headlines_list"] = []
+    texts = record.get("text_features") or []
+    if isinstance(texts, list):
+        for t in texts:
+            if isinstance(t, dict):
+                flat_record["headlines_list"].append(t.get("original_headline") or t.get("cleaned_headline"))
+            elif isinstance(t, str):
+                flat_record["headlines_list"].append(t)
+    return flat_record
+
+
+def _day_after(day: str) -> str:
+    return (date.fromisoformat(day[:10]) + timedelta(days=1)).isoformat()
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Parquet snapshots need pyarrow: pip install pyarrow")
+    return pyarrow, pyarrow.parquet
+
+
+class SupabaseSource:
+    """tier2_processed read from Supabase on every run."""
+
+    name = "supabase"
+
+    def load(self, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Flat records with start <= date <= end (YYYY-MM-DD, either may be None)."""
+        if not database.db:
+            print("Database connection missing.")
+            return []
+        rows = database.db.fetch_table_range("tier2_processed", start=start,
+                                             end=_day_after(end) if end else None)
+        return [flat for flat in map(flatten_tier2_record, rows) if flat is not None]
+
+
+class SnapshotSource:
+    """tier2_processed read from a local Parquet snapshot."""
+
+    name = "snapshot"
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else SNAPSHOT_DIR / "tier2_processed.parquet"
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def load(self, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Flat records with start <= date <= end (YYYY-MM-DD, either may be None)."""
+        _, pq = _require_pyarrow()
+        if not self.exists():
+            raise FileNotFoundError(
+                f"No snapshot at {self.path}; create one with python -m backend.backtesting.data_sources"
+            )
+        filters = []
+        if start:
+            filters.append(("date", ">=", start[:10]))
+        if end:
+            filters.append(("date", "<=", end[:10]))
+        table = pq.read_table(self.path, filters=filters or None)
+        columns = table.to_pydict()
+        return [
+            {
+                "timestamp": columns["timestamp"][i],
+                **{field: columns[field][i] for field in MACRO_FIELDS},
+                "headlines_list": columns["headlines"][i] or [],
+            }
+            for i in range(table.num_rows)
+        ]
+
+
+def get_data_source(name: Optional[str] = None, path: Optional[Path] = None):
+    """
+    Data source by name (argument, then BACKTEST_DATA_SOURCE). Without a
+    name, the local snapshot is used when one exists, otherwise Supabase.
+    """
+    name = name or os.environ.get("BACKTEST_DATA_SOURCE") or None
+    if name is None:
+        snapshot = SnapshotSource(path)
+        return snapshot if snapshot.exists() else SupabaseSource()
+    if name == "snapshot":
+        return SnapshotSource(path)
+    if name == "supabase":
+        return SupabaseSource()
+    raise ValueError(f"Unknown data source {name!r}; expected one of {SOURCES}")
+
+
+def _write_parquet(table, path: Path):
+    _, pq = _require_pyarrow()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp.parquet")
+    pq.write_table(table, tmp, row_group_size=ROW_GROUP_SIZE, compression="zstd")
+    tmp.replace(path)
+
+
+def tier2_table(rows: List[Dict[str, Any]]):
+    """Arrow table of flattened tier2_processed rows, sorted by date (tight row-group statistics)."""
+    pa, _ = _require_pyarrow()
+    records = []
+    for row in rows:
+        flat = flatten_tier2_record(row)
+        if flat is None or not flat["timestamp"]:
+            continue
+        flat["id"] = row.get("id")
+        records.append(flat)
+    records.sort(key=lambda r: (r["timestamp"], r["id"] or 0))
+    return pa.table({
+        "id": pa.array([r["id"] for r in records], type=pa.int64()),
+        "timestamp": pa.array([r["timestamp"] for r in records], type=pa.string()),
+        "date": pa.array([r["timestamp"][:10] for r in records], type=pa.string()),
+        **{field: pa.array([float(r[field] or 0) for r in records], type=pa.float64())
+           for field in MACRO_FIELDS},
+        "headlines": pa.array([[h for h in r["headlines_list"] if h] for r in records],
+                              type=pa.list_(pa.string())),
+    })
+
+
+def generic_table(rows: List[Dict[str, Any]], date_column: str):
+    """Arrow table of raw rows; JSON columns are stored as JSON text."""
+    pa, _ = _require_pyarrow()
+    rows = sorted(rows, key=lambda r: (str(r.get(date_column) or ""), r.get("id") or 0))
+    names = list(dict.fromkeys(key for row in rows for key in row))
+    columns = {}
+    for name in names:
+        values = [row.get(name) for row in rows]
+        if any(isinstance(v, (dict, list)) for v in values):
+            values = [None if v is None else json.dumps(v) for v in values]
+        columns[name] = values
+    table = pa.table(columns) if columns else pa.table({"date": pa.array([], type=pa.string())})
+    if date_column in columns and date_column != "date":
+        table = table.append_column("date", pa.array([str(v)[:10] if v else None for v in columns[date_column]],
+                                                     type=pa.string()))
+    return table
+
+
+# Exportable tables and the column their date range applies to
+SNAPSHOT_TABLES = {"tier2_processed": "created_at", "processed_features": "date"}
+
+
+def export_snapshot(tables: Sequence[str] = tuple(SNAPSHOT_TABLES), out_dir: Path = SNAPSHOT_DIR,
+                    start: Optional[str] = None, end: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Download tables from Supabase into <out_dir>/<table>.parquet and record
+    what was exported in <out_dir>/manifest.json.
+    """
+    if not database.db:
+        raise RuntimeError("Database connection missing; set SUPABASE_URL and SUPABASE_KEY.")
+    unknown = set(tables) - set(SNAPSHOT_TABLES)
+    if unknown:
+        raise ValueError(f"Unknown tables {sorted(unknown)}; expected some of {list(SNAPSHOT_TABLES)}")
+    out_dir = Path(out_dir)
+    manifest = {"exported_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "start": start, "end": end, "tables": {}}
+    for name in tables:
+        started = time.perf_counter()
+        date_column = SNAPSHOT_TABLES[name]
+        rows = database.db.fetch_table_range(name, start=start, end=_day_after(end) if end else None,
+                                             date_column=date_column)
+        table = tier2_table(rows) if name == "tier2_processed" else generic_table(rows, date_column)
+        path = out_dir / f"{name}.parquet"
+        _write_parquet(table, path)
+        dates = table.column("date").to_pylist() if "date" in table.column_names else []
+        dates = [d for d in dates if d]
+        manifest["tables"][name] = {
+            "path": path.name,
+            "rows": table.num_rows,
+            "first_date": min(dates) if dates else None,
+            "last_date": max(dates) if dates else None,
+        }
+        print(f"Exported {table.num_rows} {name} rows to {path} in {time.perf_counter() - started:.1f}s")
+    with open(out_dir / "manifest.json", "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Snapshot Tier 2 tables from Supabase to local Parquet files.")
+    parser.add_argument("--tables", nargs="+", default=list(SNAPSHOT_TABLES), choices=list(SNAPSHOT_TABLES))
+    parser.add_argument("--out", default=str(SNAPSHOT_DIR), help="Snapshot directory")
+    parser.add_argument("--start", help="First date to export (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Last date to export (YYYY-MM-DD)")
+    args = parser.parse_args()
+    export_snapshot(args.tables, Path(args.out), args.start, args.end)
@@ -0,0 +1,79 @@
+"""
+Multi-Horizon Label Engine
+Forward returns and UP/DOWN labels for every date of the S&P 500 series,
+computed once in a vectorized pass.
+"""
+
+from typing import Dict, Iterable, List, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+# Horizons in trading days (observations of the series)
+DEFAULT_HORIZONS = (1, 5, 20, 60)
+
+UNKNOWN = "UNKNOWN"
+
+
+class LabelEngine:
+    """
+    Holds the series as sorted NumPy arrays plus a date -> position map.
+
+    For horizon h the label at position i compares close[i + h] with close[i]:
+    UP if it is higher, DOWN otherwise (same rule as
+    utils.get_actual_direction_for_date), UNKNOWN when i + h is past the end.
+    """
+
+    def __init__(self, history: Union[Dict[str, float], pd.Series],
+                 horizons: Sequence[int] = DEFAULT_HORIZONS):
+        """
+        Args:
+            history: Close per date, as {"YYYY-MM-DD": close} or a Series indexed by date
+            horizons: Forward horizons in trading days
+        """
+        series = history if isinstance(history, pd.Series) else pd.Series(history, dtype=np.float64)
+        series = series.sort_index()
+        self.dates = np.asarray(series.index.astype(str))
+        self.closes = series.to_numpy(dtype=np.float64)
+        self.index = {date: i for i, date in enumerate(self.dates)}
+        self.horizons = tuple(int(h) for h in horizons)
+
+        n = len(self.closes)
+        self.returns: Dict[int, np.ndarray] = {}
+        self.directions: Dict[int, np.ndarray] = {}
+        for h in self.horizons:
+            forward = np.full(n, np.nan)
+            if h < n:
+                forward[:n - h] = self.closes[h:]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                self.returns[h] = forward / self.closes - 1.0
+            known = ~np.isnan(forward)
+            self.directions[h] = np.where(known, np.where(forward > self.closes, "UP", "DOWN"), UNKNOWN)
+
+    def positions(self, dates: Iterable[str]) -> np.ndarray:
+        """Positions of dates in the series (-1 for dates not in it)."""
+        return np.fromiter((self.index.get(d, -1) for d in dates), dtype=np.int64)
+
+    def direction(self, date: str, horizon: int = 1) -> str:
+        """Label of one date, O(1)."""
+        i = self.index.get(date)
+        return UNKNOWN if i is None else str(self.directions[horizon][i])
+
+    def directions_for(self, dates: Sequence[str], horizon: int = 1) -> List[str]:
+        """Labels for many dates at once."""
+        pos = self.positions(dates)
+        labels = np.where(pos >= 0, self.directions[horizon][np.maximum(pos, 0)], UNKNOWN)
+        return labels.tolist()
+
+    def returns_for(self, dates: Sequence[str], horizon: int = 1) -> np.ndarray:
+        """Forward returns for many dates (NaN when unknown)."""
+        pos = self.positions(dates)
+        return np.where(pos >= 0, self.returns[horizon][np.maximum(pos, 0)], np.nan)
+
+    def to_frame(self) -> pd.DataFrame:
+        """All dates with close, return_<h>d and direction_<h>d columns."""
+        frame = {"date": self.dates, "close": self.closes}
+        for h in self.horizons:
+            frame[f"return_{h}d"] = self.returns[h]
+            frame[f"direction_{h}d"] = self.directions[h]
+        return pd.DataFrame(frame)
@@ -0,0 +1,253 @@
+"""
+Streaming Backtest Metrics
+Summary statistics updated one result row at a time in constant memory:
+confusion matrix, precision/recall/F1 per direction, Brier score, log-loss,
+calibration bins, per-horizon accuracy and rolling accuracy (a fixed-size
+ring buffer). Rows are written out in columnar chunks as they stream past,
+so a multi-million-row backtest never holds its results in a list.
+"""
+
+import csv
+import math
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+DIRECTIONS = ("UP", "DOWN")
+LOG_LOSS_EPS = 1e-15
+
+
+class StreamingMetrics:
+    """
+    Update with report rows (run_backtest.evaluate_rows shape): "correct",
+    "predicted_direction", "actual_direction", optional "probability_up" and
+    correct_<h>d columns for longer horizons.
+    """
+
+    def __init__(self, calibration_bins: int = 10, rolling_window: int = 60):
+        """
+        Args:
+            calibration_bins: Equal-width probability_up bins
+            rolling_window: Rows in the rolling accuracy
+        """
+        self.calibration_bins = calibration_bins
+        self.rolling_window = rolling_window
+        self.total = 0
+        self.correct = 0
+        # confusion[actual][predicted]
+        self.confusion = {a: {p: 0 for p in DIRECTIONS} for a in DIRECTIONS}
+        self.horizons: Dict[str, List[int]] = {}  # "5d" -> [days, correct]
+
+        self.scored = 0  # rows with a probability_up
+        self.brier_sum = 0.0
+        self.log_loss_sum = 0.0
+        self.bin_count = np.zeros(calibration_bins, dtype=np.int64)
+        self.bin_probability = np.zeros(calibration_bins)
+        self.bin_up = np.zeros(calibration_bins, dtype=np.int64)
+
+        self._ring = np.zeros(rolling_window, dtype=bool)
+        self._ring_correct = 0
+        self.rolling_accuracy: Optional[float] = None
+        self.rolling_min: Optional[float] = None
+        self.rolling_max: Optional[float] = None
+
+    def update(self, row: Dict[str, Any]) -> Optional[float]:
+        """Add one row; returns the rolling accuracy (%) once the window is full."""
+        is_correct = bool(row.get("correct"))
+        self.total += 1
+        self.correct += is_correct
+
+        actual = row.get("actual_direction")
+        predicted = row.get("predicted_direction")
+        if actual in self.confusion and predicted in DIRECTIONS:
+            self.confusion[actual][predicted] += 1
+
+        for key, value in row.items():
+            if key.startswith("correct_") and value is not None:
+                stats = self.horizons.setdefault(key[len("correct_"):], [0, 0])
+                stats[0] += 1
+                stats[1] += bool(value)
+
+        probability_up = row.get("probability_up")
+        if probability_up is not None and actual in DIRECTIONS:
+            outcome = 1.0 if actual == "UP" else 0.0
+            p = min(max(float(probability_up), 0.0), 1.0)
+            self.scored += 1
+            self.brier_sum += (p - outcome) ** 2
+            q = min(max(p, LOG_LOSS_EPS), 1.0 - LOG_LOSS_EPS)
+            self.log_loss_sum -= math.log(q) if outcome else math.log(1.0 - q)
+            b = min(int(p * self.calibration_bins), self.calibration_bins - 1)
+            self.bin_count[b] += 1
+            self.bin_probability[b] += p
+            self.bin_up[b] += int(outcome)
+
+        # Ring buffer: the slot being overwritten leaves the window
+        slot = (self.total - 1) % self.rolling_window
+        if self.total > self.rolling_window:
+            self._ring_correct -= int(self._ring[slot])
+        self._ring[slot] = is_correct
+        self._ring_correct += is_correct
+        if self.total >= self.rolling_window:
+            self.rolling_accuracy = round(self._ring_correct / self.rolling_window * 100, 2)
+            self.rolling_min = min(self.rolling_min, self.rolling_accuracy) if self.rolling_min is not None \
+                else self.rolling_accuracy
+            self.rolling_max = max(self.rolling_max, self.rolling_accuracy) if self.rolling_max is not None \
+                else self.rolling_accuracy
+        return self.rolling_accuracy
+
+    def update_many(self, rows: Iterable[Dict[str, Any]]) -> "StreamingMetrics":
+        for row in rows:
+            self.update(row)
+        return self
+
+    def _direction_stats(self, direction: str) -> Dict[str, Any]:
+        other = DIRECTIONS[1 - DIRECTIONS.index(direction)]
+        tp = self.confusion[direction][direction]
+        fp = self.confusion[other][direction]
+        fn = self.confusion[direction][other]
+        precision = tp / (tp + fp) if tp + fp else 0.0
+        recall = tp / (tp + fn) if tp + fn else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        return {
+            "precision": round(precision, 4),
+            "recall": round(recall, 4),
+            "f1": round(f1, 4),
+            "support": tp + fn,
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        """Same keys as before (total_days, correct_predictions, accuracy, accuracy_by_horizon) plus the rest."""
+        if self.total == 0:
+            return {
+                "total_days": 0,
+                "correct_predictions": 0,
+                "accuracy": 0.0
+            }
+        summary = {
+            "total_days": self.total,
+            "correct_predictions": self.correct,
+            "accuracy": round(self.correct / self.total * 100, 2),
+        }
+        if self.horizons:
+            summary["accuracy_by_horizon"] = {
+                horizon: {"days": days, "accuracy": round(hits / days * 100, 2) if days else 0.0}
+                for horizon, (days, hits) in sorted(self.horizons.items(), key=lambda kv: int(kv[0][:-1]))
+            }
+        summary["confusion_matrix"] = {"rows": "actual", "columns": "predicted",
+                                       **{a: dict(p) for a, p in self.confusion.items()}}
+        summary["by_direction"] = {d: self._direction_stats(d) for d in DIRECTIONS}
+        if self.scored:
+            edges = np.linspace(0.0, 1.0, self.calibration_bins + 1)
+            summary["probabilistic"] = {
+                "days": self.scored,
+                "brier_score": round(self.brier_sum / self.scored, 6),
+                "log_loss": round(self.log_loss_sum / self.scored, 6),
+                "calibration": [
+                    {
+                        "bin": f"{edges[b]:.2f}-{edges[b + 1]:.2f}",
+                        "days": int(self.bin_count[b]),
+                        "mean_probability_up": round(float(self.bin_probability[b] / self.bin_count[b]), 4),
+                        "observed_up_rate": round(float(self.bin_up[b] / self.bin_count[b]), 4),
+                    }
+                    for b in range(self.calibration_bins) if self.bin_count[b]
+                ],
+            }
+        if self.rolling_accuracy is not None:
+            summary["rolling_accuracy"] = {
+                "window": self.rolling_window,
+                "last": self.rolling_accuracy,
+                "min": self.rolling_min,
+                "max": self.rolling_max,
+            }
+        return summary
+
+
+class ChunkedResultsWriter:
+    """
+    Buffers rows and writes them as columnar chunks: a CSV (list values as
+    "a;b;c") and, with pyarrow installed, a Parquet file with one row group
+    per chunk. Columns are fixed by the first chunk; keys that only appear
+    later are dropped, with one warning per key.
+    """
+
+    def __init__(self, csv_path: Path, parquet_path: Optional[Path] = None, chunk_rows: int = 10_000):
+        self.csv_path = Path(csv_path)
+        self.parquet_path = Path(parquet_path) if parquet_path else None
+        self.chunk_rows = chunk_rows
+        self.fieldnames: Optional[List[str]] = None
+        self.rows_written = 0
+        self.dropped_columns: List[str] = []
+        self._buffer: List[Dict[str, Any]] = []
+        self._csv = None
+        self._parquet = None
+        self._schema = None
+
+    def write(self, row: Dict[str, Any]):
+        self._buffer.append(row)
+        if len(self._buffer) >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        if self.fieldnames is None:
+            fieldnames = ["date", "predicted_direction", "actual_direction", "correct"]
+            # Remaining columns in first-seen order
+            for row in self._buffer:
+                for key in row:
+                    if key not in fieldnames:
+                        fieldnames.append(key)
+            self.fieldnames = fieldnames
+            self._csv = open(self.csv_path, "w", newline="")
+            csv.writer(self._csv).writerow(fieldnames)
+
+        else:
+            known = set(self.fieldnames) | set(self.dropped_columns)
+            new = list(dict.fromkeys(key for row in self._buffer for key in row if key not in known))
+            if new:
+                self.dropped_columns.extend(new)
+                print(f"Warning: dropping column(s) {', '.join(new)} from {self.csv_path.name}: "
+                      f"not in the first {self.chunk_rows}-row chunk")
+
+        columns = {key: [row.get(key) for row in self._buffer] for key in self.fieldnames}
+        writer = csv.writer(self._csv)
+        writer.writerows(zip(*(
+            [";".join(v) if isinstance(v, list) else v for v in values] for values in columns.values()
+        )))
+        if self.parquet_path is not None:
+            self._write_parquet(columns)
+        self.rows_written += len(self._buffer)
+        self._buffer = []
+
+    def _write_parquet(self, columns: Dict[str, list]):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            self.parquet_path = None
+            return
+        table = pa.table(columns)
+        if self._parquet is None:
+            # Columns that are all None in the first chunk would be typed null forever; use string
+            self._schema = pa.schema([field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                                      for field in table.schema])
+            self._parquet = pq.ParquetWriter(self.parquet_path, self._schema)
+        self._parquet.write_table(table.cast(self._schema))
+
+    def close(self):
+        self.flush()
+        if self._csv is not None:
+            self._csv.close()
+        if self._parquet is not None:
+            self._parquet.close()
+        if self.fieldnames is None:
+            # No rows: still leave an empty CSV with the base header
+            with open(self.csv_path, "w", newline="") as f:
+                csv.writer(f).writerow(["date", "predicted_direction", "actual_direction", "correct"])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,120 @@
+"""
+Sharded Backtest Runner
+Text analysis fans out once over the distinct texts (concurrent LLM calls on
+the batch thread pool); the MLP forward pass, combine and formatting run on
+a process pool, one contiguous shard of dates per task. Shards are merged
+back in date order, so the output does not depend on --workers.
+"""
+
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from backend.core.pipeline import format_prediction
+from tier3_model.hybrid_core import combine_batch, get_hybrid_model
+from tier3_model import mlp_model
+
+
+def _init_worker(frozen_layers):
+    """Process-pool initializer: install the frozen MLP (never runs TensorFlow)."""
+    mlp = mlp_model.MLPPredictor()
+    mlp.frozen_layers = frozen_layers
+    mlp_model._mlp_instance = mlp
+
+
+def _run_shard(shard: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """MLP batch + vectorized combine + formatting for one shard of rows."""
+    mlp_prob_up = mlp_model.get_mlp_predictor().predict_batch(shard["features"])
+    batch = combine_batch(mlp_prob_up, shard["analyses"], shard["text_index"])
+    return [format_prediction(batch.row(i), shard["risk_level"], shard["investment_horizon"])
+            for i in range(len(batch))]
+
+
+def make_shards(features_list: List[List[float]], analyses: List[Dict[str, Any]],
+                text_index: np.ndarray, shard_size: int, risk_level: str,
+                investment_horizon: str) -> List[Dict[str, Any]]:
+    """
+    Contiguous shards in date order. Each carries only the analyses its rows
+    reference, re-indexed locally, to keep pickling small.
+    """
+    shards = []
+    for start in range(0, len(features_list), shard_size):
+        rows = text_index[start:start + shard_size]
+        used, local_index = np.unique(rows, return_inverse=True)
+        shards.append({
+            "start": start,
+            "features": features_list[start:start + shard_size],
+            "analyses": [analyses[i] for i in used],
+            "text_index": local_index.astype(np.int64),
+            "risk_level": risk_level,
+            "investment_horizon": investment_horizon,
+        })
+    return shards
+
+
+def _frozen_model():
+    model = get_hybrid_model()
+    # Same NumPy forward pass in every process, so results match for any worker count
+    if model.mlp.frozen_layers is None:
+        model.mlp.freeze()
+    return model
+
+
+def make_pool(workers: int) -> Optional[ProcessPoolExecutor]:
+    """
+    Process pool for run_sharded with the frozen MLP installed in every
+    worker, or None for workers <= 1. Create it once per run and shut it
+    down when done; forking a pool per call costs more than small shards save.
+    """
+    if workers <= 1:
+        return None
+    model = _frozen_model()
+    # fork where available (no re-import); spawn elsewhere
+    method = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method),
+                               initializer=_init_worker, initargs=(model.mlp.frozen_layers,))
+
+
+def run_sharded(features_list: List[List[float]], texts: List[str], workers: int = 1,
+                shard_size: int = 256, risk_level: str = "medium", investment_horizon: str = "Mid",
+                priority: str = "backfill", pool: Optional[ProcessPoolExecutor] = None) -> List[Dict[str, Any]]:
+    """
+    Predict every row, in input order.
+
+    Args:
+        features_list: Macro feature rows (one per date, in date order)
+        texts: Combined text per row
+        workers: Processes for the MLP/combine stage (1 = in this process)
+        shard_size: Rows per task
+        risk_level, investment_horizon: Profile for formatting
+        priority: LLM scheduler lane
+        pool: Pool from make_pool(workers), reused across calls (default:
+              one is created for this call)
+
+    Returns:
+        One prediction dictionary per row, same shape as generate_prediction
+    """
+    if len(features_list) != len(texts):
+        raise ValueError(f"Got {len(features_list)} feature rows but {len(texts)} texts")
+    model = _frozen_model()
+
+    start = time.perf_counter()
+    analyses, text_index = model.analyze_texts(texts, priority=priority)()
+    print(f"Analyzed {len(analyses)} distinct texts in {time.perf_counter() - start:.1f}s")
+
+    shards = make_shards(features_list, analyses, text_index, shard_size, risk_level, investment_horizon)
+    start = time.perf_counter()
+    if workers <= 1 or len(shards) <= 1:
+        results = [_run_shard(shard) for shard in shards]
+    elif pool is not None:
+        # map() yields in submission order: the merge is deterministic
+        results = list(pool.map(_run_shard, shards))
+    else:
+        with make_pool(workers) as own_pool:
+            results = list(own_pool.map(_run_shard, shards))
+    print(f"Scored {len(features_list)} rows in {len(shards)} shards on "
+          f"{max(1, min(workers, len(shards)))} worker(s) in {time.perf_counter() - start:.1f}s")
+    return [prediction for shard_result in results for prediction in shard_result]
@@ -0,0 +1,341 @@
+"""
+Portfolio Simulator
+Turns the daily sector/stock recommendations of a logged backtest run into
+portfolio weights on a local price panel and computes returns, turnover,
+drawdown and Sharpe. Everything after the recommendations are read is
+array math over a (dates x tickers) grid.
+
+A recommendation made on date d is traded at the close of the first panel
+date >= d and held until the next one replaces it, so day t's return uses
+weights decided by day t-1's close (no look-ahead). The last recommendation
+is held for one day.
+
+Usage:
+    python -m backend.backtesting.portfolio --prices data/price_panel.csv --weighting inverse_vol
+"""
+
+import argparse
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from backend.backtesting import checkpoint, report
+from backend.backtesting.utils import DATA_DIR
+from tier3_model.llm_client import TOP_COMPANIES
+
+TRADING_DAYS = 252
+WEIGHTINGS = ("equal", "sector", "inverse_vol")
+
+
+class PricePanel:
+    """Closes as a (dates x tickers) float array, NaN where a ticker has no price."""
+
+    def __init__(self, dates: Sequence[str], tickers: Sequence[str], closes: np.ndarray):
+        self.dates = np.asarray(dates, dtype=str)
+        self.tickers = list(tickers)
+        self.closes = np.asarray(closes, dtype=np.float64)
+        self.column = {ticker: j for j, ticker in enumerate(self.tickers)}
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> "PricePanel":
+        """
+        Long (date, ticker, close) or wide (date plus one column per ticker)
+        frame; dates are normalized to YYYY-MM-DD.
+        """
+        columns = {c.lower(): c for c in frame.columns}
+        if {"date", "ticker", "close"} <= set(columns):
+            frame = frame.pivot_table(index=columns["date"], columns=columns["ticker"],
+                                      values=columns["close"], aggfunc="last")
+        else:
+            frame = frame.set_index(columns.get("date", frame.columns[0]))
+        frame.index = pd.to_datetime(frame.index).strftime("%Y-%m-%d")
+        frame = frame.sort_index()
+        frame = frame[~frame.index.duplicated(keep="last")]
+        return cls(frame.index, [str(c) for c in frame.columns], frame.to_numpy(dtype=np.float64))
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "PricePanel":
+        """Panel from a CSV or Parquet file (PRICE_PANEL_PATH, or data/price_panel.*)."""
+        if path is None:
+            path = os.environ.get("PRICE_PANEL_PATH")
+        if path is None:
+            candidates = [DATA_DIR / "price_panel.parquet", DATA_DIR / "price_panel.csv"]
+            path = next((p for p in candidates if p.exists()), candidates[-1])
+        path = Path(path)
+        if not path.exists():
+            raise FileNotFoundError(
+                f"No price panel at {path}; provide a CSV/Parquet of closes for the "
+                f"TOP_COMPANIES tickers (long: date,ticker,close or wide: date,<ticker>...)"
+            )
+        frame = pd.read_parquet(path) if path.suffix == ".parquet" else pd.read_csv(path)
+        return cls.from_frame(frame)
+
+    def returns(self) -> np.ndarray:
+        """Simple daily returns; row t is close[t] / close[t-1] - 1 (row 0 and gaps are NaN)."""
+        returns = np.full_like(self.closes, np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns[1:] = self.closes[1:] / self.closes[:-1] - 1.0
+        return returns
+
+
+class RecommendationMatrix:
+    """
+    Raw weights per recommendation of a logged run. Rows are consumed as a
+    stream; only the weights, dates and directions are kept.
+    """
+
+    def __init__(self, panel: PricePanel, rows: Iterable[Dict[str, Any]], weighting: str = "equal"):
+        """
+        Args:
+            panel: Price panel the weights are laid out on
+            rows: Logged report rows; those with "top_companies" (plus "date",
+                  "recommended_sectors", "predicted_direction") are recommendations
+            weighting: "equal" splits evenly over tickers, "sector" evenly over
+                       sectors then over each sector's tickers; "inverse_vol"
+                       starts from "equal" and is rescaled in build_weights
+        """
+        if weighting not in WEIGHTINGS:
+            raise ValueError(f"Unknown weighting {weighting!r}; expected one of {WEIGHTINGS}")
+        self.weighting = weighting
+        dates, down, rows_i, cols, values = [], [], [], [], []
+        missing = set()
+        for rec in rows:
+            if "top_companies" not in rec:
+                continue
+            i = len(dates)
+            dates.append(rec["date"])
+            down.append(rec.get("predicted_direction") == "DOWN")
+            missing.update(t for t in rec["top_companies"] or [] if t not in panel.column)
+            if weighting == "sector":
+                sectors = [s for s in rec.get("recommended_sectors") or [] if s in TOP_COMPANIES]
+                for sector in sectors:
+                    held = [t for t in TOP_COMPANIES[sector] if t in panel.column]
+                    for ticker in held:
+                        rows_i.append(i)
+                        cols.append(panel.column[ticker])
+                        values.append(1.0 / (len(sectors) * len(held)))
+            else:
+                for ticker in rec["top_companies"] or []:
+                    if ticker in panel.column:
+                        rows_i.append(i)
+                        cols.append(panel.column[ticker])
+                        values.append(1.0)
+        matrix = np.zeros((len(dates), len(panel.tickers)))
+        # Accumulate: a ticker listed under two recommended sectors gets both shares
+        np.add.at(matrix, (np.array(rows_i, dtype=np.int64), np.array(cols, dtype=np.int64)), values)
+        order = np.argsort(np.array(dates, dtype=str), kind="stable")
+        self.dates = np.array(dates, dtype=str)[order]
+        self.weights = matrix[order]
+        self.down = np.array(down, dtype=bool)[order]
+        # Panel row each recommendation trades at
+        self.trade_rows = np.searchsorted(panel.dates, self.dates)
+        # Recommended tickers without prices (held as cash)
+        self.missing = sorted(missing)
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+
+def trailing_volatility(returns: np.ndarray, lookback: int) -> np.ndarray:
+    """
+    Std of each ticker's last `lookback` returns up to and including row t,
+    via cumulative sums (NaN returns count as 0; NaN until `lookback` rows exist).
+    """
+    r = np.nan_to_num(returns)
+    zero = np.zeros((1, r.shape[1]))
+    s1 = np.vstack([zero, np.cumsum(r, axis=0)])
+    s2 = np.vstack([zero, np.cumsum(r * r, axis=0)])
+    t = np.arange(r.shape[0])
+    lo = np.maximum(t + 1 - lookback, 0)
+    n = (t + 1 - lo)[:, None].astype(np.float64)
+    mean = (s1[t + 1] - s1[lo]) / n
+    var = np.maximum((s2[t + 1] - s2[lo]) / n - mean ** 2, 0.0)
+    vol = np.sqrt(var)
+    vol[:lookback] = np.nan
+    return vol
+
+
+def build_weights(panel: PricePanel, recommendations: RecommendationMatrix, vol_lookback: int = 60,
+                  cash_on_down: bool = False) -> np.ndarray:
+    """
+    Target weights held from each panel date's close to the next, (dates x tickers).
+    Rows sum to 1 (fully invested) or 0 (cash: before the first recommendation,
+    when no recommended ticker has a price, or on DOWN calls with cash_on_down).
+    """
+    d, k = panel.closes.shape
+    trade_rows, raw = recommendations.trade_rows, recommendations.weights.copy()
+    if cash_on_down:
+        raw[recommendations.down] = 0.0
+
+    # Latest recommendation in force on every panel date (forward fill by position)
+    in_force = np.full(d, -1, dtype=np.int64)
+    valid = trade_rows < d
+    # Several recommendations on one panel date: the last one wins
+    in_force[trade_rows[valid]] = np.arange(len(trade_rows))[valid]
+    in_force = np.maximum.accumulate(in_force)
+    # Positions close one day after the last recommendation: the run says nothing later
+    if valid.any():
+        in_force[trade_rows[valid].max() + 1:] = -1
+    weights = np.where((in_force >= 0)[:, None], raw[np.maximum(in_force, 0)], 0.0) if len(raw) \
+        else np.zeros((d, k))
+
+    priced = ~np.isnan(panel.closes)
+    weights = np.where(priced, weights, 0.0)
+    if recommendations.weighting == "inverse_vol":
+        vol = trailing_volatility(panel.returns(), vol_lookback)
+        with np.errstate(divide="ignore"):
+            inverse = np.where((vol > 0) & ~np.isnan(vol), 1.0 / vol, 0.0)
+        # Until enough history exists, fall back to equal weights
+        warm = (inverse * (weights > 0)).sum(axis=1, keepdims=True) > 0
+        weights = np.where(warm, weights * inverse, weights)
+
+    totals = weights.sum(axis=1, keepdims=True)
+    return np.divide(weights, totals, out=np.zeros_like(weights), where=totals > 0)
+
+
+def simulate(panel: PricePanel, weights: np.ndarray, cost_bps: float = 0.0,
+             risk_free_rate: float = 0.0) -> Dict[str, Any]:
+    """
+    Daily portfolio returns and summary metrics.
+
+    Day t's return is weights[t-1] . returns[t]; a ticker whose return is
+    missing that day contributes 0. Turnover on day t is the traded value
+    as a fraction of equity: the summed absolute change from the drifted
+    previous weights to the new target, buys and sells both counted (so
+    moving in from cash is 1 and a full rotation is 2). cost_bps is charged
+    on every unit of it.
+    """
+    asset_returns = np.nan_to_num(panel.returns())
+    held = weights[:-1]
+    gross = np.zeros(len(weights))
+    gross[1:] = np.einsum("ij,ij->i", held, asset_returns[1:])
+
+    # Weights drift with prices until the next rebalance
+    drifted = np.zeros_like(weights)
+    grown = held * (1.0 + asset_returns[1:])
+    totals = grown.sum(axis=1, keepdims=True)
+    drifted[1:] = np.divide(grown, totals, out=np.zeros_like(grown), where=totals > 0)
+    turnover = np.abs(weights - drifted).sum(axis=1)
+    net = gross - turnover * cost_bps / 10_000
+
+    equity = np.cumprod(1.0 + net)
+    drawdown = equity / np.maximum.accumulate(equity) - 1.0
+    invested = weights.sum(axis=1) > 0
+    active = np.flatnonzero(invested)
+    # Metrics over the days the strategy ran: first trade to the day after the last position
+    window = slice(active[0] + 1, active[-1] + 2) if len(active) else slice(0, 0)
+    span = net[window]
+    years = len(span) / TRADING_DAYS
+    excess = span - risk_free_rate / TRADING_DAYS
+    volatility = float(span.std(ddof=1) * np.sqrt(TRADING_DAYS)) if len(span) > 1 else 0.0
+    total_return = float(np.prod(1.0 + span) - 1.0) if len(span) else 0.0
+
+    return {
+        "dates": panel.dates,
+        "daily_returns": net,
+        "equity": equity,
+        "drawdown": drawdown,
+        "turnover": turnover,
+        "summary": {
+            "days": int(len(span)),
+            "total_return": round(total_return, 6),
+            "annualized_return": round((1.0 + total_return) ** (1.0 / years) - 1.0, 6) if years > 0 else 0.0,
+            "annualized_volatility": round(volatility, 6),
+            "sharpe": round(float(excess.mean() / excess.std(ddof=1) * np.sqrt(TRADING_DAYS)), 4)
+                      if len(span) > 1 and excess.std(ddof=1) > 0 else 0.0,
+            "max_drawdown": round(float(drawdown.min()), 6) if len(drawdown) else 0.0,
+            "average_daily_turnover": round(float(turnover[window].mean()), 6) if len(span) else 0.0,
+            "invested_days_pct": round(float(invested[active[0]:active[-1] + 1].mean() * 100), 2)
+                                 if len(active) else 0.0,
+            "cost_bps": cost_bps,
+        },
+    }
+
+
+def benchmark_weights(panel: PricePanel, start_row: int = 0, end_row: int = None) -> np.ndarray:
+    """Equal weight over every priced ticker of the panel, on rows [start_row, end_row]."""
+    priced = ~np.isnan(panel.closes)
+    weights = priced / np.maximum(priced.sum(axis=1, keepdims=True), 1)
+    weights[:start_row] = 0.0
+    if end_row is not None:
+        weights[end_row + 1:] = 0.0
+    return weights
+
+
+def save_portfolio(result: Dict[str, Any], benchmark: Dict[str, Any], name: str = "portfolio"):
+    report.ensure_results_dir()
+    pd.DataFrame({
+        "date": result["dates"],
+        "daily_return": result["daily_returns"],
+        "equity": result["equity"],
+        "drawdown": result["drawdown"],
+        "turnover": result["turnover"],
+        "benchmark_equity": benchmark["equity"],
+    }).to_csv(report.RESULTS_DIR / f"{name}_daily.csv", index=False)
+    with open(report.RESULTS_DIR / f"{name}_summary.json", "w") as f:
+        json.dump({"portfolio": result["summary"], "benchmark": benchmark["summary"]}, f, indent=2)
+
+
+def main(run_id: Optional[str] = None, prices: Optional[str] = None, weighting: str = "equal",
+         vol_lookback: int = 60, cost_bps: float = 0.0, cash_on_down: bool = False,
+         risk_free_rate: float = 0.0) -> Optional[Dict[str, Any]]:
+    """
+    Simulate a logged backtest run's recommendations.
+
+    Args:
+        run_id: Results-log run (default: the most recently updated one)
+        prices: Price panel file (see PricePanel.load)
+        weighting: "equal", "sector" or "inverse_vol"
+        vol_lookback: Trading days of the inverse-volatility estimate
+        cost_bps: Transaction cost per unit of traded value, in basis points
+        cash_on_down: Hold cash on days the model calls DOWN
+        risk_free_rate: Annual rate for the Sharpe ratio
+    """
+    results_log = checkpoint.ResultsLog()
+    run_id = run_id or results_log.latest_run()
+    if run_id is None:
+        print("No backtest runs logged yet; run backend/backtesting/run_backtest.py first.")
+        return None
+    panel = PricePanel.load(prices)
+    recommendations = RecommendationMatrix(panel, results_log.iter_rows(run_id), weighting)
+    results_log.close()
+    if not len(recommendations):
+        print(f"Run {run_id} has no logged recommendations; rerun the backtest with --fresh.")
+        return None
+    if recommendations.missing:
+        print(f"No prices for {len(recommendations.missing)} recommended tickers (held as cash): "
+              f"{', '.join(recommendations.missing)}")
+
+    weights = build_weights(panel, recommendations, vol_lookback, cash_on_down)
+    result = simulate(panel, weights, cost_bps, risk_free_rate)
+    invested = np.flatnonzero(weights.sum(axis=1) > 0)
+    span = (invested[0], invested[-1]) if len(invested) else (len(weights), None)
+    benchmark = simulate(panel, benchmark_weights(panel, *span), cost_bps, risk_free_rate)
+    save_portfolio(result, benchmark)
+
+    print("-" * 30)
+    print(f"PORTFOLIO REPORT: run {run_id}, {weighting} weights, "
+          f"{len(panel.dates)} days x {len(panel.tickers)} tickers")
+    print("-" * 30)
+    for key, value in result["summary"].items():
+        print(f"{key:<24}{value:>12}   (equal-weight universe: {benchmark['summary'][key]})")
+    print("-" * 30)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate the portfolio of a logged backtest run.")
+    parser.add_argument("--run-id", help="Results-log run (default: most recent)")
+    parser.add_argument("--prices", help="CSV/Parquet price panel (default: PRICE_PANEL_PATH or data/price_panel.*)")
+    parser.add_argument("--weighting", choices=WEIGHTINGS, default="equal")
+    parser.add_argument("--vol-lookback", type=int, default=60, help="Days for inverse-volatility weights")
+    parser.add_argument("--cost-bps", type=float, default=0.0, help="Cost per unit of traded value (bps)")
+    parser.add_argument("--cash-on-down", action="store_true", help="Hold cash when the model calls DOWN")
+    parser.add_argument("--risk-free-rate", type=float, default=0.0, help="Annual rate for Sharpe")
+    args = parser.parse_args()
+    main(args.run_id, args.prices, args.weighting, args.vol_lookback, args.cost_bps,
+         args.cash_on_down, args.risk_free_rate)
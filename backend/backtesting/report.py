@@ -1,7 +1,9 @@
 import json
-import csv
+import math
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import Iterable, Dict, Any
+
+from backend.backtesting.metrics import ChunkedResultsWriter, StreamingMetrics
 
 RESULTS_DIR = Path(__file__).parent / "results"
 
@@ -10,30 +12,19 @@ def ensure_results_dir():
     if not RESULTS_DIR.exists():
         RESULTS_DIR.mkdir(parents=True)
 
-def generate_summary(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+def round_return(value) -> Any:
+    """Forward return rounded for the report (None when unknown)."""
+    return None if value is None or math.isnan(value) else round(float(value), 6)
+
+def generate_summary(results: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
     """
     Generate summary statistics from backtest results.
     """
-    total_days = len(results)
-    if total_days == 0:
-        return {
-            "total_days": 0,
-            "correct_predictions": 0,
-            "accuracy": 0.0
-        }
-        
-    correct_predictions = sum(1 for r in results if r.get("correct"))
-    accuracy = (correct_predictions / total_days) * 100
-    
-    return {
-        "total_days": total_days,
-        "correct_predictions": correct_predictions,
-        "accuracy": round(accuracy, 2)
-    }
+    return StreamingMetrics().update_many(results).summary()
 
-def save_results(results: List[Dict[str, Any]], summary: Dict[str, Any]):
+def save_results(results: Iterable[Dict[str, Any]], summary: Dict[str, Any]):
     """
-    Save results to CSV and JSON.
+    Save results to CSV (and Parquet when pyarrow is installed) and JSON.
     """
     ensure_results_dir()
     
@@ -42,20 +33,26 @@ def save_results(results: List[Dict[str, Any]], summary: Dict[str, Any]):
     with open(summary_path, 'w') as f:
         json.dump(summary, f, indent=2)
         
-    # 2. Save Daily Results CSV
-    csv_path = RESULTS_DIR / "daily_results.csv"
-    fieldnames = ["date", "predicted_direction", "actual_direction", "correct"]
-    
-    with open(csv_path, 'w', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
+    # 2. Save Daily Results in columnar chunks
+    with ChunkedResultsWriter(RESULTS_DIR / "daily_results.csv", RESULTS_DIR / "daily_results.parquet") as writer:
         for row in results:
-            writer.writerow({
-                "date": row.get("date"),
-                "predicted_direction": row.get("predicted_direction"),
-                "actual_direction": row.get("actual_direction"),
-                "correct": row.get("correct")
-            })
+            writer.write(row)
+
+def write_report(results: Iterable[Dict[str, Any]], rolling_window: int = 60) -> Dict[str, Any]:
+    """
+    One streaming pass over the results: update the metrics, add the rolling
+    accuracy to each row, write the rows in chunks, then save summary.json.
+    Memory stays constant however many rows there are.
+    """
+    ensure_results_dir()
+    metrics = StreamingMetrics(rolling_window=rolling_window)
+    with ChunkedResultsWriter(RESULTS_DIR / "daily_results.csv", RESULTS_DIR / "daily_results.parquet") as writer:
+        for row in results:
+            writer.write({**row, "rolling_accuracy": metrics.update(row)})
+    summary = metrics.summary()
+    with open(RESULTS_DIR / "summary.json", 'w') as f:
+        json.dump(summary, f, indent=2)
+    return summary
 
 def print_console_report(summary: Dict[str, Any]):
     """Print final accuracy to console."""
@@ -65,6 +62,18 @@ def print_console_report(summary: Dict[str, Any]):
     print(f"Total Days Processed: {summary['total_days']}")
     print(f"Correct Predictions:  {summary['correct_predictions']}")
     print(f"Accuracy:             {summary['accuracy']}%")
+    for horizon, stats in summary.get("accuracy_by_horizon", {}).items():
+        print(f"Accuracy ({horizon:>4}):      {stats['accuracy']}% over {stats['days']} days")
+    for direction, stats in summary.get("by_direction", {}).items():
+        print(f"{direction:<4} precision/recall: {stats['precision']:.2f} / {stats['recall']:.2f} "
+              f"({stats['support']} days)")
+    if "probabilistic" in summary:
+        print(f"Brier score:          {summary['probabilistic']['brier_score']}")
+        print(f"Log-loss:             {summary['probabilistic']['log_loss']}")
+    if "rolling_accuracy" in summary:
+        rolling = summary["rolling_accuracy"]
+        print(f"Rolling {rolling['window']}d accuracy: {rolling['last']}% "
+              f"(min {rolling['min']}%, max {rolling['max']}%)")
     print("-" * 30)
     if summary['total_days'] == 0:
         print("Note: No valid data points found for backtesting.")
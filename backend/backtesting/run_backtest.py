@@ -6,6 +6,7 @@ Runs the hybrid model against historical data and evaluates accuracy.
 import sys
 import os
 import json
+import argparse
 from pathlib import Path
 from collections import defaultdict
 from dotenv import load_dotenv
@@ -16,8 +17,14 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../'
 # Load env variables (e.g. OPENAI_API_KEY)
 load_dotenv(Path(__file__).parent.parent / ".env")
 
-from backend.backtesting import utils, report
-from backend.core.pipeline import generate_prediction
+from backend.backtesting import checkpoint, utils, report
+from backend.backtesting.labels import LabelEngine, DEFAULT_HORIZONS, UNKNOWN
+from backend.backtesting.parallel import make_pool, run_sharded
+from backend.backtesting.walk_forward import predict_rows, train_walk_forward
+from tier3_model.hybrid_core import get_hybrid_model
+from tier3_model.llm_cassette import CassetteMissError, LLMCassette
+from tier3_model.llm_scheduler import get_llm_scheduler
+from tier3_model.llm_telemetry import get_llm_telemetry
 
 def group_data_by_date(combined_data):
     """
@@ -58,15 +65,75 @@ def group_data_by_date(combined_data):
             
     return grouped
 
-def main():
+def evaluate_rows(labels: LabelEngine, horizons, dates, predictions, actuals):
+    """Report rows for scored dates: the headline label plus every longer horizon."""
+    rows = []
+    horizon_directions = {h: labels.directions_for(dates, h) for h in horizons[1:]}
+    horizon_returns = {h: labels.returns_for(dates, h) for h in horizons}
+    for i, (date_str, prediction, actual_direction) in enumerate(zip(dates, predictions, actuals)):
+        is_correct = utils.evaluate_prediction(prediction, actual_direction)
+        
+        logger_msg = f"Date: {date_str} | Pred: {prediction['sp500_direction']} | Actual: {actual_direction} | Correct: {is_correct}"
+        print(logger_msg)
+        
+        row = {
+            "date": date_str,
+            "predicted_direction": prediction['sp500_direction'],
+            "actual_direction": actual_direction,
+            "correct": is_correct,
+            "probability_up": prediction["probability_up"],
+            # Component outputs, so blend sweeps (sweep.py) can recombine without rerunning the models
+            "mlp_probability_up": prediction["mlp_output"]["probability_up"],
+            "sentiment_score": prediction["llm_output"]["sentiment_score"],
+            # What a user would act on; portfolio.py simulates holding it
+            "recommended_sectors": prediction["recommended_sectors"],
+            "top_companies": prediction["top_companies"],
+            f"return_{horizons[0]}d": report.round_return(horizon_returns[horizons[0]][i]),
+        }
+        for h in horizons[1:]:
+            row[f"actual_direction_{h}d"] = horizon_directions[h][i]
+            row[f"return_{h}d"] = report.round_return(horizon_returns[h][i])
+            row[f"correct_{h}d"] = (None if horizon_directions[h][i] == UNKNOWN
+                                    else utils.evaluate_prediction(prediction, horizon_directions[h][i]))
+        rows.append(row)
+    return rows
+
+def main(cassette: LLMCassette = None, horizons=DEFAULT_HORIZONS, workers: int = 1,
+         shard_size: int = 256, walk_forward: dict = None, run_id: str = None,
+         fresh: bool = False, checkpoint_every: int = 250, data_source: str = None,
+         start: str = None, end: str = None):
+    """
+    Run the backtest.
+    
+    Args:
+        cassette: Optional LLM cassette; record mode captures every LLM
+                  response of the run, replay mode serves them offline.
+        horizons: Label horizons in trading days; the first one decides
+                  which dates are scored and the headline accuracy.
+        workers: Processes for the MLP/combine stage (results do not depend on it)
+        shard_size: Dates per process-pool task
+        walk_forward: Walk-forward settings (train_window, test_window, step,
+                      expanding, hyperparams); retrains the MLP per window
+                      instead of scoring every date with the saved model
+        run_id: Results-log run to resume (default: derived from the config,
+                so rerunning the same backtest resumes it)
+        fresh: Discard the run's logged rows and score every date again
+        checkpoint_every: Dates scored and logged per chunk (rounded up to a
+                          multiple of shard_size * workers when workers > 1)
+        data_source: "supabase" or "snapshot" (default: the snapshot if one exists)
+        start, end: Inclusive date range to backtest (YYYY-MM-DD)
+    """
     print("Starting Backtest...")
+    if cassette is not None:
+        get_hybrid_model().llm.cassette = cassette
+        print(f"LLM cassette: {cassette.mode} {cassette.path}")
     
     # 1. Load Data
-    macro_data = utils.load_historical_macro() # Loads tier1_tier2_combined.json by default
+    macro_data = utils.load_historical_macro(data_source, start, end)
     sp500_history = utils.load_actual_sp500()
     
     if not macro_data:
-        print("No historical data found in Supabase (tier2_processed table).")
+        print("No historical data found (tier2_processed table or its local snapshot).")
         return
 
     # 2. Prepare Data
@@ -85,13 +152,18 @@ def main():
             sp500_history[date_str] = float(data["sp500_index"])
             
     
-    results = []
     sorted_dates = sorted(grouped_data.keys())
     
     print(f"Found data for {len(sorted_dates)} days.")
     
-    # 3. Run Backtest
-    for date_str in sorted_dates:
+    # Forward labels for every date and horizon in one pass
+    horizons = tuple(horizons)
+    labels = LabelEngine(sp500_history, horizons=horizons)
+    primary_directions = labels.directions_for(sorted_dates, horizons[0])
+    
+    # 3. Collect inputs for every date with a known outcome
+    dates, features_list, texts, actuals = [], [], [], []
+    for date_str, actual_direction in zip(sorted_dates, primary_directions):
         day_data = grouped_data[date_str]
         
         # Determine contents
@@ -107,43 +179,157 @@ def main():
         # Combine sentiments
         text_input = " ".join(day_data["sentiments"])
         
-        # Actual Direction
-        actual_direction = utils.get_actual_direction_for_date(date_str, sp500_history)
-        
-        if actual_direction == "UNKNOWN":
+        if actual_direction == UNKNOWN:
             print(f"Skipping {date_str}: Cannot determine actual direction (next day data missing).")
             continue
-            
-        # Predict
+        
+        dates.append(date_str)
+        features_list.append(numerical_features)
+        texts.append(text_input)
+        actuals.append(actual_direction)
+    
+    # 4. Resume: dates already in this run's results log (with unchanged inputs) are skipped
+    # Using defaults for risk and horizon
+    config = {
+        "model_version": get_hybrid_model().model_version,
+        "horizons": list(horizons),
+        "risk_level": "medium",
+        "investment_horizon": "Mid",
+        "walk_forward": walk_forward,
+    }
+    results_log = checkpoint.ResultsLog()
+    run_id = run_id or f"run-{checkpoint.config_hash(config)}"
+    results_log.start_run(run_id, config, fresh=fresh)
+    input_hashes = [checkpoint.input_hash(f, t) for f, t in zip(features_list, texts)]
+
+    # Backfill lane so backtests never starve live /predict traffic
+    pool = None
+    if walk_forward:
+        row_models = train_walk_forward(features_list, actuals, label_horizon=horizons[0],
+                                        workers=workers, **walk_forward)
+        candidates = sorted(row_models)
+
+        def score(rows):
+            return predict_rows(row_models, features_list, texts, rows,
+                                risk_level="medium", investment_horizon="Mid", priority="backfill")
+    else:
+        candidates = list(range(len(dates)))
+        if workers > 1:
+            # Whole shards for every worker in each chunk, or run_sharded falls back to serial
+            per_round = shard_size * workers
+            checkpoint_every = -(-checkpoint_every // per_round) * per_round
+            pool = make_pool(workers)
+
+        def score(rows):
+            # One LLM fan-out per chunk, then sharded MLP/combine on the run's pool
+            return run_sharded([features_list[i] for i in rows], [texts[i] for i in rows],
+                               workers=workers, shard_size=shard_size,
+                               risk_level="medium", investment_horizon="Mid", priority="backfill",
+                               pool=pool)
+
+    logged = results_log.completed(run_id, [dates[i] for i in candidates], [input_hashes[i] for i in candidates])
+    pending = [i for i, done in zip(candidates, logged) if not done]
+    print(f"Run {run_id}: {len(candidates) - len(pending)} of {len(candidates)} days already logged, "
+          f"{len(pending)} to score.")
+
+    failed = []
+
+    def without_fallbacks(rows, predictions):
+        """Drop dates whose text analysis fell back to neutral (LLM error); they count as failed."""
+        kept_rows, kept = [], []
+        for i, prediction in zip(rows, predictions):
+            if prediction["llm_output"].get("fallback"):
+                failed.append(dates[i])
+            else:
+                kept_rows.append(i)
+                kept.append(prediction)
+        return kept_rows, kept
+
+    def score_chunk(chunk):
+        """(rows scored, their predictions); a failing chunk is retried date by date."""
         try:
-            # Using defaults for risk and horizon
-            prediction = generate_prediction(
-                numerical_features=numerical_features,
-                text_input=text_input,
-                risk_level="medium",
-                investment_horizon="Mid"
-            )
-            
-            # Evaluate
-            is_correct = utils.evaluate_prediction(prediction, actual_direction)
-            
-            logger_msg = f"Date: {date_str} | Pred: {prediction['sp500_direction']} | Actual: {actual_direction} | Correct: {is_correct}"
-            print(logger_msg)
-            
-            results.append({
-                "date": date_str,
-                "predicted_direction": prediction['sp500_direction'],
-                "actual_direction": actual_direction,
-                "correct": is_correct
-            })
-            
+            return without_fallbacks(chunk, score(chunk))
+        except CassetteMissError:
+            # A replay miss means the run is no longer deterministic; fail loudly
+            raise
         except Exception as e:
-            print(f"Error predicting for {date_str}: {e}")
-            
-    # 4. Generate Report
-    summary = report.generate_summary(results)
-    report.save_results(results, summary)
+            print(f"Scoring {len(chunk)} dates from {dates[chunk[0]]} failed ({e}); retrying one date at a time")
+        scored, predictions = [], []
+        for i in chunk:
+            try:
+                predictions.extend(score([i]))
+                scored.append(i)
+            except CassetteMissError:
+                raise
+            except Exception as e:
+                print(f"Error predicting for {dates[i]}: {e}")
+                failed.append(dates[i])
+        return without_fallbacks(scored, predictions)
+
+    # 5. Predict and evaluate chunk by chunk; each chunk is logged before the next starts
+    try:
+        for offset in range(0, len(pending), checkpoint_every):
+            chunk, predictions = score_chunk(pending[offset:offset + checkpoint_every])
+            rows = evaluate_rows(labels, horizons, [dates[i] for i in chunk], predictions,
+                                 [actuals[i] for i in chunk])
+            results_log.append(run_id, rows, [input_hashes[i] for i in chunk])
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    if failed:
+        # Not logged, so the next run with this run id retries them
+        print(f"Skipped {len(failed)} dates after prediction errors or LLM fallbacks: {', '.join(failed)}")
+
+    print(f"LLM scheduler: {get_llm_scheduler().get_metrics()}")
+    report.ensure_results_dir()
+    get_llm_telemetry().dump_json(report.RESULTS_DIR / "llm_telemetry.json")
+
+    # 6. Generate Report: one streaming pass over the log (constant memory)
+    summary = report.write_report(results_log.iter_rows(run_id, [dates[i] for i in candidates]))
+    results_log.close()
     report.print_console_report(summary)
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Backtest the Tier 3 hybrid model.")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--record", metavar="CASSETTE", help="Record every LLM response to this cassette file")
+    group.add_argument("--replay", metavar="CASSETTE", help="Replay LLM responses from this cassette (no network)")
+    parser.add_argument("--horizons", default=",".join(str(h) for h in DEFAULT_HORIZONS),
+                        help="Comma-separated label horizons in trading days (first = headline accuracy)")
+    parser.add_argument("--workers", type=int, default=1, help="Processes for MLP/combine shards (or window training)")
+    parser.add_argument("--shard-size", type=int, default=256, help="Dates per shard")
+    parser.add_argument("--walk-forward", action="store_true", help="Retrain the MLP per window; no look-ahead")
+    parser.add_argument("--train-window", type=int, default=250, help="Walk-forward training days")
+    parser.add_argument("--test-window", type=int, default=20, help="Walk-forward days scored per window")
+    parser.add_argument("--step", type=int, default=None, help="Days between windows (default: test window)")
+    parser.add_argument("--expanding", action="store_true", help="Train on all days up to each cut-off")
+    parser.add_argument("--epochs", type=int, default=50, help="Walk-forward training epochs")
+    parser.add_argument("--run-id", help="Results-log run to resume (default: derived from the config)")
+    parser.add_argument("--fresh", action="store_true", help="Ignore logged results and rescore every date")
+    parser.add_argument("--checkpoint-every", type=int, default=250, help="Dates scored and logged per chunk (rounded up to whole shards per worker)")
+    parser.add_argument("--source", choices=["supabase", "snapshot"],
+                        help="Tier 2 history source (default: local snapshot if present, else Supabase)")
+    parser.add_argument("--start", help="First date to backtest (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Last date to backtest (YYYY-MM-DD)")
+    args = parser.parse_args()
+    horizons = [int(h) for h in args.horizons.split(",") if h.strip()]
+    options = dict(horizons=horizons, workers=args.workers, shard_size=args.shard_size,
+                   run_id=args.run_id, fresh=args.fresh, checkpoint_every=args.checkpoint_every,
+                   data_source=args.source, start=args.start, end=args.end)
+    if args.walk_forward:
+        options["walk_forward"] = dict(
+            train_window=args.train_window,
+            test_window=args.test_window,
+            step=args.step,
+            expanding=args.expanding,
+            hyperparams={"epochs": args.epochs},
+        )
+
+    if args.record:
+        with LLMCassette(args.record, mode="record") as cassette:
+            main(cassette, **options)
+    elif args.replay:
+        with LLMCassette(args.replay, mode="replay") as cassette:
+            main(cassette, **options)
+    else:
+        main(**options)
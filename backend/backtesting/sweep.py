@@ -0,0 +1,210 @@
+"""
+Blend-Parameter Sweep
+Re-scores a logged backtest run for many combine settings at once. The
+per-day MLP probability and text sentiment are read from the results log
+(run_backtest stores them with every row), so a sweep never reruns the MLP
+or the LLM: every (mode, weight, threshold, clip) combination is one row of
+a vectorized NumPy computation over the component columns.
+
+Modes:
+    shift:    p = clip(mlp + weight * s, 0, 1)            (HybridModel, weight 0.2)
+    weighted: p = (1 - weight) * mlp + weight * (s + 1) / 2  (legacy predictor, weight 0.4)
+where s is the sentiment score clipped to [-clip, clip]; UP if p >= threshold.
+
+Usage:
+    python -m backend.backtesting.sweep --weights 0:0.5:0.02 --thresholds 0.45:0.55:0.005
+"""
+
+import argparse
+import csv
+import itertools
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from backend.backtesting import checkpoint, report
+from backend.backtesting.labels import UNKNOWN
+from tier3_model.hybrid_core import DECISION_THRESHOLD, SENTIMENT_WEIGHT
+
+MODES = ("shift", "weighted")
+
+# Cap on combinations x days held in memory at once
+MAX_CELLS = 4_000_000
+
+
+class ComponentMatrix:
+    """Component outputs and labels of a logged run, as aligned NumPy columns."""
+
+    def __init__(self, rows: Iterable[Dict[str, Any]]):
+        """
+        Args:
+            rows: Logged report rows, consumed as a stream; only the component
+                  and label columns are kept
+        """
+        self.dates, mlp, sentiment = [], [], []
+        self.skipped = 0
+        label_keys, actuals = None, {}
+        for r in rows:
+            if r.get("mlp_probability_up") is None or r.get("sentiment_score") is None:
+                self.skipped += 1
+                continue
+            if label_keys is None:
+                # "headline" is the run's first horizon
+                label_keys = [("headline", "actual_direction")] + [
+                    (key[len("actual_direction_"):], key) for key in r if key.startswith("actual_direction_")]
+                actuals = {name: [] for name, _ in label_keys}
+            self.dates.append(r["date"])
+            mlp.append(r["mlp_probability_up"])
+            sentiment.append(r["sentiment_score"])
+            for name, key in label_keys:
+                actuals[name].append(r.get(key) or UNKNOWN)
+        self.mlp_probability_up = np.array(mlp, dtype=np.float64)
+        self.sentiment_score = np.array(sentiment, dtype=np.float64)
+
+        # labels[name]: (known mask, actual UP)
+        self.labels: Dict[str, tuple] = {}
+        for name, values in (actuals or {"headline": []}).items():
+            actual = np.array(values, dtype=object)
+            self.labels[name] = (actual != UNKNOWN, actual == "UP")
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+
+def make_grid(modes: Sequence[str], weights: Sequence[float], thresholds: Sequence[float],
+              clips: Sequence[float]) -> Dict[str, np.ndarray]:
+    """Cartesian product of the settings as parallel arrays."""
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        raise ValueError(f"Unknown blend mode(s) {sorted(unknown)}; expected {MODES}")
+    combos = list(itertools.product(modes, weights, thresholds, clips))
+    return {
+        "mode": np.array([c[0] for c in combos]),
+        "weight": np.array([c[1] for c in combos], dtype=np.float64),
+        "threshold": np.array([c[2] for c in combos], dtype=np.float64),
+        "clip": np.array([c[3] for c in combos], dtype=np.float64),
+    }
+
+
+def blend(mlp_prob_up: np.ndarray, sentiment: np.ndarray, mode: np.ndarray, weight: np.ndarray,
+          clip: np.ndarray) -> np.ndarray:
+    """probability_up for K combinations x N days, shape (K, N)."""
+    w = weight[:, None]
+    s = np.clip(sentiment[None, :], -clip[:, None], clip[:, None])
+    shifted = np.clip(mlp_prob_up[None, :] + w * s, 0.0, 1.0)
+    weighted = (1.0 - w) * mlp_prob_up[None, :] + w * (s + 1.0) / 2.0
+    return np.where((mode == "weighted")[:, None], weighted, shifted)
+
+
+def sweep(components: ComponentMatrix, grid: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Accuracy of every grid combination on every label horizon.
+
+    Returns:
+        The grid columns plus accuracy_<label> and up_rate (share of UP calls)
+    """
+    k, n = len(grid["weight"]), len(components)
+    out = {name: np.zeros(k) for name in ["up_rate"] + [f"accuracy_{l}" for l in components.labels]}
+    chunk = max(1, MAX_CELLS // max(n, 1))
+    for start in range(0, k, chunk):
+        part = slice(start, start + chunk)
+        probability_up = blend(components.mlp_probability_up, components.sentiment_score,
+                               grid["mode"][part], grid["weight"][part], grid["clip"][part])
+        up = probability_up >= grid["threshold"][part, None]
+        out["up_rate"][part] = up.mean(axis=1) if n else 0.0
+        for label, (known, actual_up) in components.labels.items():
+            correct = (up == actual_up[None, :]) & known[None, :]
+            days = known.sum()
+            out[f"accuracy_{label}"][part] = correct.sum(axis=1) / days * 100 if days else 0.0
+    return {**grid, **out}
+
+
+def parse_range(spec: str) -> List[float]:
+    """"0.1,0.2" or "start:stop:step" (stop inclusive)."""
+    if ":" in spec:
+        start, stop, step = (float(x) for x in spec.split(":"))
+        return [round(v, 10) for v in np.arange(start, stop + step / 2, step)]
+    return [float(x) for x in spec.split(",") if x.strip()]
+
+
+def save_sweep(results: Dict[str, np.ndarray], order: np.ndarray, path):
+    report.ensure_results_dir()
+    columns = {name: values[order].tolist() for name, values in results.items()}
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(list(columns))
+        writer.writerows(zip(*columns.values()))
+
+
+def main(run_id: Optional[str] = None, modes: Sequence[str] = MODES,
+         weights: Sequence[float] = None, thresholds: Sequence[float] = None,
+         clips: Sequence[float] = (1.0,), top: int = 20) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Sweep the blend settings over a logged run.
+
+    Args:
+        run_id: Results-log run (default: the most recently updated one)
+        modes, weights, thresholds, clips: Values to combine (full Cartesian product)
+        top: Combinations printed, best headline accuracy first
+    """
+    results_log = checkpoint.ResultsLog()
+    run_id = run_id or results_log.latest_run()
+    if run_id is None:
+        print("No backtest runs logged yet; run backend/backtesting/run_backtest.py first.")
+        return None
+    components = ComponentMatrix(results_log.iter_rows(run_id))
+    results_log.close()
+    if components.skipped:
+        print(f"{components.skipped} logged days have no component outputs "
+              f"(logged before they were recorded); rerun the backtest with --fresh to include them.")
+    if not len(components):
+        print(f"Run {run_id} has no days to sweep.")
+        return None
+
+    grid = make_grid(
+        modes,
+        weights if weights is not None else parse_range("0:1:0.05"),
+        thresholds if thresholds is not None else parse_range("0.4:0.6:0.01"),
+        clips,
+    )
+    results = sweep(components, grid)
+    # Best headline accuracy first; ties go to the mildest setting
+    order = np.lexsort((results["weight"], np.abs(results["threshold"] - DECISION_THRESHOLD),
+                        -results["accuracy_headline"]))
+    save_sweep(results, order, report.RESULTS_DIR / "sweep.csv")
+
+    current = sweep(components, make_grid(["shift"], [SENTIMENT_WEIGHT], [DECISION_THRESHOLD], [1.0]))
+    horizons = [l for l in components.labels if l != "headline"]
+    print("-" * 30)
+    print(f"BLEND SWEEP: run {run_id}, {len(components)} days, {len(grid['weight'])} combinations")
+    print(f"Current (shift, weight {SENTIMENT_WEIGHT}, threshold {DECISION_THRESHOLD}): "
+          f"{current['accuracy_headline'][0]:.2f}%")
+    print("-" * 30)
+    print(f"{'mode':<9}{'weight':>7}{'thresh':>8}{'clip':>6}{'acc':>8}"
+          + "".join(f"{h:>8}" for h in horizons) + f"{'up%':>7}")
+    for i in order[:top]:
+        print(f"{results['mode'][i]:<9}{results['weight'][i]:>7.3f}{results['threshold'][i]:>8.3f}"
+              f"{results['clip'][i]:>6.2f}{results['accuracy_headline'][i]:>8.2f}"
+              + "".join(f"{results[f'accuracy_{h}'][i]:>8.2f}" for h in horizons)
+              + f"{results['up_rate'][i] * 100:>7.1f}")
+    print(f"All combinations written to {report.RESULTS_DIR / 'sweep.csv'}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep combine parameters over a logged backtest run.")
+    parser.add_argument("--run-id", help="Results-log run (default: most recent)")
+    parser.add_argument("--modes", default=",".join(MODES), help="Comma-separated: shift, weighted")
+    parser.add_argument("--weights", default="0:1:0.05", help="List or start:stop:step")
+    parser.add_argument("--thresholds", default="0.4:0.6:0.01", help="List or start:stop:step")
+    parser.add_argument("--clips", default="1.0", help="Sentiment clip bounds, list or start:stop:step")
+    parser.add_argument("--top", type=int, default=20, help="Combinations to print")
+    args = parser.parse_args()
+    main(
+        run_id=args.run_id,
+        modes=[m.strip() for m in args.modes.split(",") if m.strip()],
+        weights=parse_range(args.weights),
+        thresholds=parse_range(args.thresholds),
+        clips=parse_range(args.clips),
+        top=args.top,
+    )
@@ -0,0 +1,235 @@
+"""
+Walk-Forward Backtesting
+Retrains the MLP for every window on data up to the window's cut-off and
+scores only the dates after it, so no date is scored by a model that saw
+its outcome. Trained window models are cached on disk by
+(training data hash, window, hyperparameters); windows train in parallel.
+"""
+
+import hashlib
+import json
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from backend.backtesting.utils import DATA_DIR
+from backend.core.pipeline import format_prediction
+from tier3_model.hybrid_core import combine_batch, get_hybrid_model
+from tier3_model import mlp_model
+
+CACHE_DIR = DATA_DIR / "walk_forward_models"
+
+# Bump when the MLP architecture or training recipe changes; part of the cache key
+TRAINING_VERSION = "mlp-v1"
+
+DEFAULT_HYPERPARAMS = {"epochs": 50, "batch_size": 32, "seed": 42}
+
+
+def make_windows(n_rows: int, train_window: int, test_window: int, step: int,
+                 label_horizon: int = 1, expanding: bool = False) -> List[Dict[str, int]]:
+    """
+    Row ranges of every walk-forward window (end indices exclusive).
+
+    Row i's label needs the close label_horizon rows later, so training for a
+    test block starting at row t uses rows < t - label_horizon + 1 only.
+    """
+    windows = []
+    test_start = train_window + label_horizon - 1
+    while test_start < n_rows:
+        train_end = test_start - label_horizon + 1
+        windows.append({
+            "train_start": 0 if expanding else max(0, train_end - train_window),
+            "train_end": train_end,
+            "test_start": test_start,
+            "test_end": min(test_start + test_window, n_rows),
+        })
+        test_start += step
+    return windows
+
+
+def window_cache_key(X: np.ndarray, y: np.ndarray, window: Dict[str, int],
+                     hyperparams: Dict[str, Any]) -> str:
+    """
+    Content key of a window model. The data hash covers which rows the window
+    trained on, so the same window in a longer or shifted run still hits.
+    """
+    window = {"train_rows": window["train_end"] - window["train_start"]}
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(X, dtype=np.float64).tobytes())
+    digest.update(np.ascontiguousarray(y, dtype=np.float64).tobytes())
+    digest.update(json.dumps({"window": window, "hyperparams": hyperparams,
+                              "version": TRAINING_VERSION}, sort_keys=True).encode())
+    return digest.hexdigest()[:32]
+
+
+def _cache_path(key: str) -> Path:
+    return CACHE_DIR / f"{key}.npz"
+
+
+def load_window_model(key: str):
+    """Frozen layers of a cached window model, or None."""
+    path = _cache_path(key)
+    if not path.exists():
+        return None
+    with np.load(path) as data:
+        activations = json.loads(str(data["activations"]))
+        return [(data[f"kernel_{i}"], data[f"bias_{i}"], act) for i, act in enumerate(activations)]
+
+
+def save_window_model(key: str, layers):
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    arrays = {}
+    for i, (kernel, bias, _) in enumerate(layers):
+        arrays[f"kernel_{i}"] = kernel
+        arrays[f"bias_{i}"] = bias
+    arrays["activations"] = np.array(json.dumps([act for _, _, act in layers]))
+    tmp = _cache_path(key).with_suffix(".tmp.npz")
+    np.savez(tmp, **arrays)
+    tmp.replace(_cache_path(key))
+
+
+def _train_window(task: Dict[str, Any]):
+    """Process-pool task: fit a fresh MLP on one window and return its frozen layers."""
+    import tensorflow as tf
+
+    hyperparams = task["hyperparams"]
+    tf.keras.utils.set_random_seed(hyperparams["seed"])
+    mlp = mlp_model.MLPPredictor()
+    mlp.model = mlp.create_model()
+    mlp.model.fit(
+        mlp._normalize_features(task["X"]),
+        task["y"],
+        epochs=hyperparams["epochs"],
+        batch_size=hyperparams["batch_size"],
+        verbose=0,
+    )
+    mlp.freeze()
+    return mlp.frozen_layers
+
+
+def train_windows(tasks: List[Dict[str, Any]], workers: int = 1) -> Dict[str, Any]:
+    """
+    Frozen layers per cache key; cached windows are loaded, the rest trained
+    (across `workers` processes) and cached.
+    """
+    models, missing = {}, []
+    for task in tasks:
+        if task["key"] in models:
+            continue
+        cached = load_window_model(task["key"])
+        if cached is not None:
+            models[task["key"]] = cached
+        else:
+            missing.append(task)
+    print(f"Walk-forward: {len(tasks)} windows, {len(tasks) - len(missing)} cached, {len(missing)} to train")
+
+    if missing:
+        start = time.perf_counter()
+        if workers <= 1:
+            trained = map(_train_window, missing)
+            for task, layers in zip(missing, trained):
+                save_window_model(task["key"], layers)
+                models[task["key"]] = layers
+        else:
+            # spawn: each trainer gets its own TensorFlow runtime
+            with ProcessPoolExecutor(max_workers=workers,
+                                     mp_context=multiprocessing.get_context("spawn")) as pool:
+                for task, layers in zip(missing, pool.map(_train_window, missing)):
+                    save_window_model(task["key"], layers)
+                    models[task["key"]] = layers
+        print(f"Walk-forward: trained {len(missing)} windows in {time.perf_counter() - start:.1f}s")
+    return models
+
+
+def train_walk_forward(features_list: List[List[float]], actuals: List[str],
+                       train_window: int = 250, test_window: int = 20, step: int = None,
+                       label_horizon: int = 1, expanding: bool = False,
+                       hyperparams: Dict[str, Any] = None, workers: int = 1) -> Dict[int, Any]:
+    """
+    Train (or load) every window model.
+
+    Args:
+        features_list: One row per date, in date order
+        actuals: "UP"/"DOWN" label per row (training targets)
+        train_window: Training rows per window (the minimum when expanding)
+        test_window: Rows scored per window
+        step: Rows between window starts (defaults to test_window)
+        label_horizon: Trading days of the label, to keep outcomes out of training
+        expanding: Train on all rows up to the cut-off instead of a rolling window
+        hyperparams: Training settings (DEFAULT_HYPERPARAMS)
+        workers: Processes for training
+
+    Returns:
+        {row: frozen layers of the model that scores it}; a row covered by
+        overlapping windows goes to the first. Rows before the first window
+        have no model and are missing.
+    """
+    hyperparams = {**DEFAULT_HYPERPARAMS, **(hyperparams or {})}
+    step = step or test_window
+    X = np.zeros((len(features_list), 5))
+    for i, features in enumerate(features_list):
+        row = list(features)[:5]
+        X[i, :len(row)] = row
+    y = np.array([a == "UP" for a in actuals], dtype=np.float64)
+
+    windows = make_windows(len(features_list), train_window, test_window, step, label_horizon, expanding)
+    tasks = []
+    for window in windows:
+        X_train = X[window["train_start"]:window["train_end"]]
+        y_train = y[window["train_start"]:window["train_end"]]
+        tasks.append({
+            "key": window_cache_key(X_train, y_train, window, hyperparams),
+            "X": X_train,
+            "y": y_train,
+            "hyperparams": hyperparams,
+        })
+    models = train_windows(tasks, workers)
+
+    row_models = {}
+    for window, task in zip(windows, tasks):
+        for i in range(window["test_start"], window["test_end"]):
+            row_models.setdefault(i, models[task["key"]])
+    return row_models
+
+
+def predict_rows(row_models: Dict[int, Any], features_list: List[List[float]], texts: List[str],
+                 rows: List[int], risk_level: str = "medium", investment_horizon: str = "Mid",
+                 priority: str = "backfill") -> List[Dict[str, Any]]:
+    """Predictions for `rows` (in that order), each scored by its window's model."""
+    # Text analysis once for the requested rows, then one MLP batch per run of rows sharing a model
+    analyses, text_index = get_hybrid_model().analyze_texts([texts[i] for i in rows], priority=priority)()
+    predictions = []
+    for _, group in groupby(range(len(rows)), key=lambda j: id(row_models[rows[j]])):
+        group = list(group)
+        mlp = mlp_model.MLPPredictor()
+        mlp.frozen_layers = row_models[rows[group[0]]]
+        batch = combine_batch(mlp.predict_batch([features_list[rows[j]] for j in group]),
+                              analyses, text_index[group])
+        predictions.extend(format_prediction(batch.row(k), risk_level, investment_horizon)
+                           for k in range(len(group)))
+    return predictions
+
+
+def run_walk_forward(features_list: List[List[float]], texts: List[str], actuals: List[str],
+                     risk_level: str = "medium", investment_horizon: str = "Mid",
+                     priority: str = "backfill", **options) -> Tuple[List[int], List[Dict[str, Any]]]:
+    """
+    Walk-forward predictions for every row that has a window model.
+
+    Args:
+        features_list, texts: One row per date, in date order
+        actuals: "UP"/"DOWN" label per row (training targets)
+        **options: Window and training settings of train_walk_forward
+
+    Returns:
+        (scored row indices, predictions in the same order)
+    """
+    row_models = train_walk_forward(features_list, actuals, **options)
+    rows = sorted(row_models)
+    return rows, predict_rows(row_models, features_list, texts, rows,
+                              risk_level, investment_horizon, priority)
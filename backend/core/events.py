@@ -0,0 +1,193 @@
+"""
+Server-Sent Events Hub
+Fans out published events (prediction snapshots, Tier 1 ticker updates) to
+every connected dashboard. Each event is serialized once; subscribers only
+read the shared frames, so the per-change cost does not grow with clients.
+
+Pre-fork workers each have their own hub. One leader worker produces the
+events and appends them to an EventJournal; the others replay it.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+def format_sse(event_id: str, event_type: str, data: str) -> bytes:
+    """One SSE frame (data must be a single line, e.g. compact JSON)."""
+    return f"id: {event_id}\nevent: {event_type}\ndata: {data}\n\n".encode("utf-8")
+
+
+class EventHub:
+    """
+    Ring buffer of recent events plus the latest event of each type.
+
+    Event ids look like "<epoch>-<seq>", the epoch being the start time and
+    pid of the process. A subscriber resuming with a Last-Event-ID from the
+    current epoch gets every event it missed; if the id is from an earlier
+    server run or another worker, or has fallen out of the buffer, it gets
+    the latest event of each type instead (enough to rebuild its state).
+    """
+
+    def __init__(self, history: int = 256, heartbeat_sec: float = 15.0, retry_ms: int = 3000):
+        """
+        Args:
+            history: Events kept for Last-Event-ID resume
+            heartbeat_sec: Idle time before a comment frame keeps the connection open
+            retry_ms: Reconnect delay suggested to EventSource clients
+        """
+        self.heartbeat_sec = heartbeat_sec
+        self.retry_ms = retry_ms
+        self.epoch = f"{int(time.time())}.{os.getpid()}"
+        self._cond = threading.Condition()
+        self._events = deque(maxlen=history)  # (seq, event_type, frame)
+        self._latest: Dict[str, Tuple[int, str, bytes]] = {}
+        self._seq = 0
+        self._closed = False
+        self.stats = {"published": 0, "subscribers": 0, "max_subscribers": 0, "connections": 0}
+
+    def publish(self, event_type: str, data: Any) -> str:
+        """Serialize once and wake every subscriber. Returns the event id."""
+        payload = json.dumps(data, separators=(",", ":"), default=str)
+        with self._cond:
+            self._seq += 1
+            event_id = f"{self.epoch}-{self._seq}"
+            event = (self._seq, event_type, format_sse(event_id, event_type, payload))
+            self._events.append(event)
+            self._latest[event_type] = event
+            self.stats["published"] += 1
+            self._cond.notify_all()
+        return event_id
+
+    def _parse_last_id(self, last_event_id: Optional[str]) -> Optional[int]:
+        """Sequence number inside this epoch, or None when the id is unusable."""
+        if not last_event_id:
+            return None
+        epoch, _, seq = last_event_id.partition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def _pending(self, cursor: Optional[int]) -> Tuple[List[bytes], int]:
+        """Frames after cursor and the new cursor. Caller holds the lock."""
+        oldest = self._events[0][0] if self._events else self._seq + 1
+        if cursor is None or cursor > self._seq or cursor < oldest - 1:
+            events = sorted(self._latest.values())
+        else:
+            events = [e for e in self._events if e[0] > cursor]
+        return [e[2] for e in events], self._seq
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> Iterator[bytes]:
+        """
+        Generator of SSE frames for one client (ends when the client disconnects).
+        """
+        with self._cond:
+            self.stats["subscribers"] += 1
+            self.stats["connections"] += 1
+            self.stats["max_subscribers"] = max(self.stats["max_subscribers"], self.stats["subscribers"])
+        try:
+            yield f"retry: {self.retry_ms}\n\n".encode("utf-8")
+            with self._cond:
+                frames, cursor = self._pending(self._parse_last_id(last_event_id))
+            for frame in frames:
+                yield frame
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._seq > cursor or self._closed, timeout=self.heartbeat_sec)
+                    frames, cursor = self._pending(cursor) if self._seq > cursor else ([], cursor)
+                    closed = self._closed
+                for frame in frames:
+                    yield frame
+                if closed:
+                    return
+                if not frames:
+                    yield b": heartbeat\n\n"
+        finally:
+            with self._cond:
+                self.stats["subscribers"] -= 1
+
+    def close(self):
+        """End every stream once its pending frames are sent (graceful worker shutdown)."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cond:
+            stats = dict(self.stats)
+            stats["last_event_id"] = f"{self.epoch}-{self._seq}" if self._seq else None
+            return stats
+
+
+class EventJournal:
+    """
+    Raw events shared by pre-fork workers through a SQLite file. The leader
+    appends what it publishes; followers poll for rows after their cursor.
+    Old rows are pruned, except the latest of each type.
+    """
+
+    def __init__(self, path: Path, keep: int = 256):
+        """
+        Args:
+            path: SQLite file, opened separately by each worker after fork
+            keep: Rows kept besides the latest of each type
+        """
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, event_type TEXT NOT NULL, "
+            "data TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+
+    def append(self, event_type: str, data: Any) -> int:
+        """Store one event; returns its sequence number."""
+        payload = json.dumps(data, separators=(",", ":"), default=str)
+        with self._lock, self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            seq = self._db.execute(
+                "INSERT INTO events (event_type, data, created_at) VALUES (?, ?, ?)",
+                (event_type, payload, time.time()),
+            ).lastrowid
+            self._db.execute(
+                "DELETE FROM events WHERE seq <= ? AND seq NOT IN "
+                "(SELECT MAX(seq) FROM events GROUP BY event_type)",
+                (seq - self.keep,),
+            )
+        return seq
+
+    def read(self, after: Optional[int] = None) -> List[Tuple[int, str, Any]]:
+        """(seq, event_type, data) after a cursor, or the latest of each type when after is None."""
+        with self._lock:
+            if after is None:
+                rows = self._db.execute(
+                    "SELECT seq, event_type, data FROM events WHERE seq IN "
+                    "(SELECT MAX(seq) FROM events GROUP BY event_type) ORDER BY seq"
+                ).fetchall()
+            else:
+                rows = self._db.execute(
+                    "SELECT seq, event_type, data FROM events WHERE seq > ? ORDER BY seq", (after,)
+                ).fetchall()
+        return [(seq, event_type, json.loads(data)) for seq, event_type, data in rows]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+# Global instance
+_hub_instance = None
+
+def get_event_hub() -> EventHub:
+    """Get or create the process-wide event hub."""
+    global _hub_instance
+    if _hub_instance is None:
+        _hub_instance = EventHub()
+    return _hub_instance
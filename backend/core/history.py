@@ -0,0 +1,232 @@
+"""
+Chart History
+Columnar (NumPy) caches of the S&P 500 and prediction history, downsampled
+with Largest-Triangle-Three-Buckets so chart payloads stay small.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from backend.database import db
+
+REPO_ROOT = Path(__file__).parent.parent.parent
+SP500_CSV_CANDIDATES = [Path("sp500_data.csv"), REPO_ROOT / "archive" / "legacy" / "data" / "sp500_data.csv"]
+
+SERIES = ("sp500", "predictions")
+MAX_POINTS = 5000
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Args:
+        x: Sorted x values (float)
+        y: y values
+        n_out: Target number of points (>= 3)
+
+    Returns:
+        Indices of the selected points (first and last always included)
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # Interior points split into n_out - 2 buckets; bucket means in one pass
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    counts = np.diff(edges)
+    mean_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / counts
+    mean_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / counts
+    # The bucket after the last one is the final point
+    next_x = np.append(mean_x[1:], x[n - 1])
+    next_y = np.append(mean_y[1:], y[n - 1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        ax, ay = x[a], y[a]
+        # Twice the triangle area for every candidate in the bucket at once
+        area = np.abs((ax - next_x[i]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (next_y[i] - ay))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+class SeriesCache:
+    """
+    One time series as parallel NumPy columns (epoch seconds, value),
+    reloaded when its source changes and memoizing downsampled windows.
+    The loader runs outside the lock, so readers keep the current columns
+    while a reload is in flight.
+    """
+
+    def __init__(self, name: str, loader, refresh_sec: float = 300.0, max_windows: int = 256):
+        """
+        Args:
+            name: Series name used in responses
+            loader: Callable(current_version) returning (source_version,
+                    timestamps[datetime64], values, appended); timestamps is
+                    None when unchanged, and appended marks rows added since
+                    current_version rather than the whole series
+            refresh_sec: Min seconds between source version checks
+            max_windows: Memoized (range, resolution) results kept
+        """
+        self.name = name
+        self.loader = loader
+        self.refresh_sec = refresh_sec
+        self.max_windows = max_windows
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = None
+        self._t = np.empty(0, dtype=np.int64)
+        self._v = np.empty(0, dtype=np.float64)
+        self._windows = OrderedDict()
+        self.stats = {"loads": 0, "hits": 0, "misses": 0}
+
+    def _refresh(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._checked_at is not None and now - self._checked_at < self.refresh_sec:
+                return
+            # Claimed before loading, so concurrent readers do not start a second load
+            self._checked_at = now
+            current = self._version
+        version, timestamps, values, appended = self.loader(current)
+        if version == current:
+            return
+        t = np.asarray(timestamps, dtype="datetime64[s]").astype(np.int64)
+        v = np.asarray(values, dtype=np.float64)
+        keep = ~np.isnan(v)
+        t, v = t[keep], v[keep]
+        with self._lock:
+            if self._version != current:
+                return
+            if appended:
+                t, v = np.concatenate([self._t, t]), np.concatenate([self._v, v])
+            order = np.argsort(t, kind="stable")
+            t, v = t[order], v[order]
+            # Keep the last value for duplicate timestamps
+            last = np.append(t[1:] != t[:-1], True)
+            self._t, self._v = t[last], v[last]
+            self._version = version
+            self._windows.clear()
+            self.stats["loads"] += 1
+
+    def window(self, start: Optional[np.datetime64], end: Optional[np.datetime64], points: int) -> Dict[str, Any]:
+        """Downsampled [start, end] window (None = open-ended), memoized."""
+        self._refresh()
+        with self._lock:
+            key = (start, end, points)
+            cached = self._windows.get(key)
+            if cached is not None:
+                self._windows.move_to_end(key)
+                self.stats["hits"] += 1
+                return cached
+            self.stats["misses"] += 1
+
+            lo = 0 if start is None else np.searchsorted(self._t, start.astype("datetime64[s]").astype(np.int64), "left")
+            hi = len(self._t) if end is None else np.searchsorted(self._t, end.astype("datetime64[s]").astype(np.int64), "right")
+            t, v = self._t[lo:hi], self._v[lo:hi]
+            idx = lttb(t.astype(np.float64), v, points)
+            result = {
+                "series": self.name,
+                "source_points": int(len(t)),
+                "points": int(len(idx)),
+                "dates": np.datetime_as_string(t[idx].astype("datetime64[s]"), unit="D").tolist(),
+                "values": np.round(v[idx], 4).tolist(),
+            }
+            self._windows[key] = result
+            while len(self._windows) > self.max_windows:
+                self._windows.popitem(last=False)
+            return result
+
+
+def _load_sp500_csv(current_version):
+    """S&P 500 closes from the yfinance export (version = path + mtime)."""
+    path = os.environ.get("SP500_CSV_PATH")
+    candidates = [Path(path)] if path else SP500_CSV_CANDIDATES
+    for candidate in candidates:
+        if candidate.exists():
+            version = (str(candidate), candidate.stat().st_mtime)
+            if version == current_version:
+                return version, None, None, False
+            df = pd.read_csv(candidate)
+            # yfinance writes a ticker row (",^GSPC") under the header
+            dates = pd.to_datetime(df["Date"], errors="coerce")
+            closes = pd.to_numeric(df["Close"], errors="coerce")
+            valid = dates.notna().to_numpy()
+            return version, dates.to_numpy()[valid], closes.to_numpy(dtype=np.float64)[valid], False
+    return None, [], [], False
+
+
+def _load_prediction_history(current_version):
+    """
+    probability_up of stored predictions (version = id and created_at of the
+    highest-id row, checked with a one-row query). Predictions are append-only,
+    so a change fetches only the rows after the cached id; a lower newest id
+    (rows deleted) reloads the table.
+    """
+    if not db:
+        return None, [], [], False
+    latest = db.fetch_latest_prediction()
+    if latest is None:
+        return None, [], [], False
+    version = (latest.get("id"), latest.get("created_at"))
+    if version == current_version:
+        return version, None, None, False
+    appended = current_version is not None and version[0] > current_version[0]
+    rows = db.fetch_prediction_history(after_id=current_version[0] if appended else None)
+    dates = pd.to_datetime([r.get("created_at") for r in rows], errors="coerce", utc=True).tz_localize(None)
+    stored = np.array([r.get("probability_up") for r in rows], dtype=np.float64)
+    # Rows saved before probability_up was stored: confidence_score = |p_up - 0.5| * 2 (rounded)
+    confidence = np.array([r.get("confidence_score") or 0.0 for r in rows], dtype=np.float64)
+    up = np.array([r.get("sp500_direction") == "UP" for r in rows])
+    derived = np.where(up, 0.5 + confidence / 2, 0.5 - confidence / 2)
+    probability_up = np.where(np.isnan(stored), derived, stored)
+    valid = ~dates.isna()
+    return version, dates.to_numpy()[valid], probability_up[valid], appended
+
+
+_caches: Dict[str, SeriesCache] = {}
+_caches_lock = threading.Lock()
+
+def get_series_cache(name: str) -> SeriesCache:
+    """Get or create the process-wide cache for a series ("sp500" or "predictions")."""
+    if name not in SERIES:
+        raise ValueError(f"Unknown series: {name}")
+    with _caches_lock:
+        if name not in _caches:
+            if name == "sp500":
+                _caches[name] = SeriesCache(name, _load_sp500_csv)
+            else:
+                _caches[name] = SeriesCache(name, _load_prediction_history, refresh_sec=60.0)
+        return _caches[name]
+
+
+def get_history(series: str, start: Optional[str] = None, end: Optional[str] = None,
+                points: int = 500) -> Dict[str, Any]:
+    """
+    Downsampled history for a chart.
+
+    Args:
+        series: "sp500" or "predictions"
+        start, end: ISO dates (inclusive, open-ended when omitted)
+        points: Target point count (capped at MAX_POINTS)
+
+    Raises:
+        ValueError: Unknown series or unparseable dates
+    """
+    points = max(3, min(int(points), MAX_POINTS))
+    start_ts = np.datetime64(start, "s") if start else None
+    end_ts = np.datetime64(end, "D") + np.timedelta64(1, "D") - np.timedelta64(1, "s") if end else None
+    return get_series_cache(series).window(start_ts, end_ts, points)
@@ -0,0 +1,74 @@
+"""
+Model Input Loader
+Turns the latest tier2_processed record into HybridModel inputs.
+"""
+
+import threading
+import time
+from typing import Dict, Any, Optional
+
+from backend.database import db
+
+MACRO_FIELDS = ["inflation_rate", "interest_rate", "unemployment_rate", "GDP_growth", "sp500_index"]
+
+
+def tier2_record_to_inputs(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Map a tier2_processed row onto model inputs.
+
+    Returns:
+        Dictionary with numerical_features, text_input, tier1_snapshot and record_id
+    """
+    nums = record.get("numerical_features")
+    if isinstance(nums, list) and len(nums) > 0:
+        macro = nums[0]
+    elif isinstance(nums, dict):
+        macro = nums
+    else:
+        macro = {}
+
+    headlines = []
+    for t in record.get("text_features") or []:
+        if isinstance(t, dict):
+            headline = t.get("original_headline") or t.get("cleaned_headline")
+            if headline:
+                headlines.append(headline)
+        elif isinstance(t, str):
+            headlines.append(t)
+
+    return {
+        "numerical_features": [macro.get(field, 0) for field in MACRO_FIELDS],
+        "text_input": " ".join(headlines),
+        "tier1_snapshot": {field: macro.get(field, 0) for field in MACRO_FIELDS},
+        "record_id": record.get("id"),
+        "created_at": record.get("created_at"),
+    }
+
+
+_lock = threading.Lock()
+_latest = {"inputs": None, "fetched_at": 0.0}
+
+def get_latest_inputs(max_age_sec: float = 60.0) -> Optional[Dict[str, Any]]:
+    """
+    Latest model inputs, refetched from Supabase at most every max_age_sec.
+    Returns None if the database is unavailable or empty.
+    """
+    with _lock:
+        now = time.monotonic()
+        if _latest["inputs"] is not None and now - _latest["fetched_at"] < max_age_sec:
+            return _latest["inputs"]
+        if not db:
+            return None
+        record = db.fetch_latest_tier2_data()
+        if not record:
+            return None
+        _latest["inputs"] = tier2_record_to_inputs(record)
+        _latest["fetched_at"] = now
+        return _latest["inputs"]
+
+
+def reset_latest_inputs():
+    """Force the next get_latest_inputs() call to refetch."""
+    with _lock:
+        _latest["inputs"] = None
+        _latest["fetched_at"] = 0.0
@@ -0,0 +1,128 @@
+"""
+Prediction Matrix Materialization
+Runs the hybrid model once per data refresh and derives the prediction for
+every (risk_level, investment_horizon) profile, so serving is a lookup.
+"""
+
+import threading
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from backend.core.inputs import get_latest_inputs
+from backend.core.pipeline import RISK_LEVELS, HORIZONS, cache_all_profiles, predict_shared
+from backend.database import db
+from tier3_model.hybrid_core import get_hybrid_model
+from tier3_model.prediction_cache import make_cache_key
+
+PROFILES = [(risk_level, horizon) for risk_level in RISK_LEVELS for horizon in HORIZONS]
+
+_lock = threading.Lock()
+_snapshot = None
+
+
+def profile_key(risk_level: str, investment_horizon: str) -> str:
+    return f"{risk_level}:{investment_horizon}"
+
+
+def snapshot_version(model_version: str, inputs: Dict[str, Any]) -> str:
+    """Deterministic id for (model, inputs): rerunning on unchanged data keeps the version."""
+    return make_cache_key(
+        model_version,
+        numerical_features=inputs["numerical_features"],
+        text_input=inputs["text_input"],
+    )[:16]
+
+
+def materialize_predictions(inputs: Optional[Dict[str, Any]] = None, save: bool = True,
+                            priority: str = "scheduled") -> Optional[Dict[str, Any]]:
+    """
+    Compute the shared MLP and LLM components once and derive all 9 profiles.
+
+    Args:
+        inputs: Model inputs (defaults to a fresh read of the latest Tier 2 row)
+        save: Also insert the 9 rows into the predictions table
+        priority: LLM scheduler lane
+
+    Returns:
+        The new snapshot, or None when no input data is available or the
+        model result was degraded or an LLM fallback (the previous snapshot stays)
+    """
+    global _snapshot
+    if inputs is None:
+        inputs = get_latest_inputs(max_age_sec=0)
+    if inputs is None:
+        return None
+
+    model = get_hybrid_model()
+    version = snapshot_version(model.model_version, inputs)
+    result = predict_shared(inputs["numerical_features"], inputs["text_input"], priority=priority)
+    if result.get("degraded"):
+        # Coalesced onto a deadline-limited request; the next refresh retries
+        print("Skipping materialization: model result was degraded")
+        return None
+    if result["llm_analysis"].get("fallback"):
+        # Neutral stand-in for a failed LLM call; keep the previous snapshot until a real answer
+        print("Skipping materialization: LLM analysis fell back to neutral")
+        return None
+
+    predictions = {
+        profile_key(risk_level, horizon): prediction
+        for (risk_level, horizon), prediction in cache_all_profiles(
+            result, inputs["numerical_features"], inputs["text_input"], model.model_version
+        ).items()
+    }
+
+    snapshot = {
+        "version": version,
+        "model_version": model.model_version,
+        "created_at": datetime.utcnow().isoformat(),
+        "input_record_id": inputs.get("record_id"),
+        "tier1_snapshot": inputs["tier1_snapshot"],
+        "predictions": predictions,
+    }
+    with _lock:
+        _snapshot = snapshot
+
+    if save and db:
+        db.save_predictions([
+            {
+                "sp500_direction": p["sp500_direction"],
+                "confidence_score": p["confidence_score"],
+                "probability_up": p["probability_up"],
+                "sector_recommendations": p["recommended_sectors"],
+                "top_stocks": p["top_companies"],
+                "model_version": model.model_version,
+                "risk_level": p["risk_level"],
+                "investment_horizon": p["investment_horizon"],
+                "snapshot_version": version,
+            }
+            for p in predictions.values()
+        ])
+    print(f"Materialized {len(predictions)} profile predictions (snapshot {version})")
+    return snapshot
+
+
+def install_snapshot(snapshot: Dict[str, Any]):
+    """Adopt a snapshot materialized by another process (the pre-fork leader)."""
+    global _snapshot
+    with _lock:
+        _snapshot = snapshot
+
+
+def get_snapshot() -> Optional[Dict[str, Any]]:
+    """Current in-memory snapshot, if any."""
+    return _snapshot
+
+
+def lookup_prediction(risk_level: str, investment_horizon: str,
+                      input_record_id: Any = None) -> Optional[Dict[str, Any]]:
+    """
+    O(1) lookup in the current snapshot.
+    If input_record_id is given, only a snapshot built from that row matches.
+    """
+    snapshot = _snapshot
+    if snapshot is None:
+        return None
+    if input_record_id is not None and snapshot["input_record_id"] != input_record_id:
+        return None
+    return snapshot["predictions"].get(profile_key(risk_level, investment_horizon))
@@ -0,0 +1,186 @@
+"""
+Prediction Pipeline Adapter
+Exposes the Tier 3 HybridModel in the generate_prediction() shape used by
+the backtester and batch jobs.
+"""
+
+import time
+from typing import Dict, Any, List, Optional
+
+from tier3_model.hybrid_core import get_hybrid_model, select_top_stocks
+from tier3_model.prediction_cache import get_prediction_cache, make_cache_key
+from tier3_model.single_flight import get_single_flight
+
+
+RISK_LEVELS = ("low", "medium", "high")
+HORIZONS = ("Short", "Mid", "Long")
+
+DEFENSIVE_SECTORS = ["Utilities", "Consumer Staples", "Healthcare"]
+GROWTH_SECTORS = ["Technology", "Consumer Discretionary", "Communication Services"]
+DEFAULT_SECTORS = ["Technology", "Healthcare", "Financials"]
+
+
+def select_profile_sectors(llm_sectors: List[str], risk_level: str, investment_horizon: str) -> List[str]:
+    """
+    Tilt the LLM's sectors toward the user profile (same rules as the legacy
+    HybridPredictor._select_sectors, with a deterministic order).
+    """
+    llm_sectors = list(llm_sectors) or DEFAULT_SECTORS
+    if risk_level == "high" or investment_horizon == "Short":
+        sectors = DEFENSIVE_SECTORS[:2] + llm_sectors[:2]
+    elif risk_level == "low" or investment_horizon == "Long":
+        sectors = GROWTH_SECTORS[:2] + llm_sectors[:2]
+    else:
+        sectors = llm_sectors[:3] if len(llm_sectors) >= 3 else llm_sectors + ["Technology", "Financials"]
+    return list(dict.fromkeys(sectors))[:3]
+
+
+def format_prediction(result: Dict[str, Any], risk_level: str, investment_horizon: str) -> Dict[str, Any]:
+    """
+    Map a HybridModel result onto the Tier3Prediction response shape for one
+    (risk_level, investment_horizon) profile. Only the sector overlay depends
+    on the profile, so one model run serves every profile.
+    """
+    llm = result["llm_analysis"]
+    mlp = result["mlp_output"]
+    recommended_sectors = select_profile_sectors(result["recommended_sectors"], risk_level, investment_horizon)
+    top_companies = []
+    for tickers in select_top_stocks(recommended_sectors).values():
+        for ticker in tickers:
+            if ticker not in top_companies:
+                top_companies.append(ticker)
+
+    return {
+        "sp500_direction": result["final_trend"],
+        "direction": result["final_trend"],
+        "probability_up": result["probability_up"],
+        "probability_down": 1.0 - result["probability_up"],
+        "confidence_score": result["confidence_score"],
+        "recommended_sectors": recommended_sectors,
+        "top_companies": top_companies,
+        "reasoning": llm["explanation"],
+        "risk_level": risk_level,
+        "investment_horizon": investment_horizon,
+        "mlp_output": mlp,
+        "llm_output": llm,
+        "degraded": result.get("degraded"),
+    }
+
+
+def profile_cache_key(model_version: str, numerical_features: List[float], text_input: str,
+                      risk_level: str, investment_horizon: str) -> str:
+    """Prediction cache key of one (inputs, profile) pair."""
+    return make_cache_key(
+        model_version,
+        numerical_features=list(numerical_features),
+        text_input=text_input,
+        risk_level=risk_level,
+        investment_horizon=investment_horizon,
+    )
+
+
+def cache_all_profiles(result: Dict[str, Any], numerical_features: List[float], text_input: str,
+                       model_version: str) -> Dict[tuple, Dict[str, Any]]:
+    """
+    Format one model result for every (risk_level, horizon) profile and store
+    each in the prediction cache (fallback and degraded results are not stored).
+
+    Returns:
+        {(risk_level, investment_horizon): prediction}
+    """
+    cache = get_prediction_cache()
+    predictions = {}
+    for risk_level in RISK_LEVELS:
+        for horizon in HORIZONS:
+            prediction = format_prediction(result, risk_level, horizon)
+            predictions[(risk_level, horizon)] = prediction
+            if not prediction["llm_output"].get("fallback") and not prediction["degraded"]:
+                key = profile_cache_key(model_version, numerical_features, text_input, risk_level, horizon)
+                cache.set(key, prediction, model_version=model_version)
+    return predictions
+
+
+def predict_shared(numerical_features: List[float], text_input: str,
+                   priority: str = "interactive", deadline: Optional[float] = None) -> Dict[str, Any]:
+    """
+    HybridModel.predict behind the single-flight group.
+    Concurrent identical requests share one model run; the key leaves out
+    risk/horizon because the model output does not depend on them.
+
+    With a deadline (time.monotonic()), a follower that cannot wait for the
+    in-flight run answers from the MLP alone, and a late LLM analysis warms
+    the prediction cache for every profile.
+    """
+    model = get_hybrid_model()
+    flight_key = make_cache_key(
+        model.model_version,
+        numerical_features=list(numerical_features),
+        text_input=text_input,
+    )
+    if deadline is None:
+        return get_single_flight().do(
+            flight_key, lambda: model.predict(numerical_features, text_input, priority=priority)
+        )
+
+    def warm(result):
+        cache_all_profiles(result, numerical_features, text_input, model.model_version)
+
+    try:
+        return get_single_flight().do(
+            flight_key,
+            lambda: model.predict(numerical_features, text_input, priority=priority,
+                                  deadline=deadline, on_late_result=warm),
+            timeout_sec=max(0.0, deadline - time.monotonic()),
+        )
+    except TimeoutError:
+        return model.degraded_predict(numerical_features, text_input)
+
+
+def generate_prediction(numerical_features: List[float], text_input: str,
+                        risk_level: str = "medium", investment_horizon: str = "Mid",
+                        priority: str = "interactive", use_cache: bool = True,
+                        deadline: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Generate hybrid prediction.
+
+    Args:
+        numerical_features: List of 5 macro features
+        text_input: Combined text
+        risk_level: Risk preference
+        investment_horizon: Time horizon
+        priority: LLM scheduler lane; batch tools should pass "backfill"
+        use_cache: Serve/store the result in the prediction cache
+        deadline: time.monotonic() by which to answer; past it the prediction
+                  is degraded to MLP-only or cached sentiment ("degraded" field)
+
+    Returns:
+        Prediction dictionary
+    """
+    model = get_hybrid_model()
+    if use_cache:
+        cache = get_prediction_cache()
+        key = profile_cache_key(model.model_version, numerical_features, text_input,
+                                risk_level, investment_horizon)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    result = predict_shared(numerical_features, text_input, priority=priority, deadline=deadline)
+    prediction = format_prediction(result, risk_level, investment_horizon)
+    # Fallbacks and degraded answers are not cached so the next request retries the LLM
+    if use_cache and not prediction["llm_output"].get("fallback") and not prediction["degraded"]:
+        cache.set(key, prediction, model_version=model.model_version)
+    return prediction
+
+
+def generate_predictions(numerical_features_list: List[List[float]], text_inputs: List[str],
+                         risk_level: str = "medium", investment_horizon: str = "Mid",
+                         priority: str = "backfill") -> List[Dict[str, Any]]:
+    """
+    Batch version of generate_prediction built on HybridModel.predict_many.
+
+    Returns:
+        One prediction dictionary per input row, in input order
+    """
+    batch = get_hybrid_model().predict_many(numerical_features_list, text_inputs, priority=priority)
+    return [format_prediction(batch.row(i), risk_level, investment_horizon) for i in range(len(batch))]
@@ -3,6 +3,7 @@ import os
 from supabase import create_client, Client
 from dotenv import load_dotenv
 import json
+import base64
 from datetime import datetime
 
 from pathlib import Path
@@ -14,6 +15,29 @@ load_dotenv(dotenv_path=backend_dir / ".env")
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
+# Columns clients may request from the predictions history API
+PREDICTION_COLUMNS = (
+    "id", "created_at", "prediction_date", "sp500_direction", "confidence_score", "probability_up",
+    "sector_recommendations", "top_stocks", "model_version",
+    "risk_level", "investment_horizon", "snapshot_version",
+)
+DEFAULT_PREDICTION_COLUMNS = ("id", "created_at", "sp500_direction", "confidence_score", "model_version")
+
+
+def encode_cursor(created_at: str, row_id: int) -> str:
+    """Opaque keyset cursor for the (created_at, id) of the last row on a page."""
+    return base64.urlsafe_b64encode(json.dumps([created_at, row_id]).encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    """Inverse of encode_cursor. Raises ValueError on a malformed cursor."""
+    try:
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(created_at), int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
 class SupabaseDB:
     def __init__(self):
         if not SUPABASE_URL or not SUPABASE_KEY:
@@ -75,6 +99,120 @@ class SupabaseDB:
             print(f"Error fetching historical data: {e}")
             return []
 
+    def fetch_table_range(self, table: str, start: str = None, end: str = None,
+                          date_column: str = "created_at", page_size: int = 1000, columns: str = "*",
+                          after_id: int = None):
+        """
+        Every row of a table in a date range, oldest id first. Pages with a
+        keyset on id, so there is no row cap and each page costs the same.
+
+        Args:
+            table: Table name (e.g. "tier2_processed", "processed_features")
+            start, end: date_column range (ISO dates/timestamps, inclusive start, exclusive end)
+            date_column: Column the range applies to
+            page_size: Rows per request
+            columns: Comma-separated columns to select (must include id)
+            after_id: Only rows with a larger id (incremental reads)
+        """
+        rows, last_id = [], after_id
+        while True:
+            query = self.client.table(table).select(columns)
+            if start:
+                query = query.gte(date_column, start)
+            if end:
+                query = query.lt(date_column, end)
+            if last_id is not None:
+                query = query.gt("id", last_id)
+            try:
+                response = query.order("id").limit(page_size).execute()
+            except Exception as e:
+                print(f"Error fetching {table}: {e}")
+                raise
+            page = response.data or []
+            rows.extend(page)
+            if len(page) < page_size:
+                return rows
+            last_id = page[-1]["id"]
+
+    def fetch_latest_prediction(self):
+        """(id, created_at) of the highest-id stored prediction: a cheap change check for history caches."""
+        try:
+            response = (self.client.table("predictions").select("id,created_at")
+                        .order("id", desc=True).limit(1).execute())
+            if response.data:
+                return response.data[0]
+            return None
+        except Exception as e:
+            print(f"Error fetching latest prediction: {e}")
+            return None
+
+    def fetch_prediction_history(self, after_id: int = None):
+        """
+        Fetch (id, created_at, sp500_direction, confidence_score, probability_up)
+        of every stored prediction, or only those with id > after_id, oldest
+        id first (keyset-paged, no row cap).
+        """
+        try:
+            return self.fetch_table_range(
+                "predictions", columns="id,created_at,sp500_direction,confidence_score,probability_up",
+                after_id=after_id
+            )
+        except Exception as e:
+            print(f"Error fetching prediction history: {e}")
+            return []
+
+    def fetch_predictions_page(self, cursor: str = None, limit: int = 100, columns=None,
+                               direction: str = None, model_version: str = None,
+                               start: str = None, end: str = None):
+        """
+        One page of predictions, newest first, using keyset pagination on
+        (created_at, id) so every page costs the same regardless of depth.
+
+        Args:
+            cursor: next_cursor from the previous page (None for the first page)
+            limit: Page size
+            columns: Subset of PREDICTION_COLUMNS (id and created_at are always included)
+            direction: Filter on sp500_direction ("UP"/"DOWN")
+            model_version: Filter on model_version
+            start, end: created_at range (ISO timestamps, inclusive start, exclusive end)
+
+        Returns:
+            (rows, next_cursor); next_cursor is None on the last page
+        """
+        columns = list(columns or DEFAULT_PREDICTION_COLUMNS)
+        unknown = set(columns) - set(PREDICTION_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown columns: {', '.join(sorted(unknown))}")
+        columns = list(dict.fromkeys(["id", "created_at"] + columns))
+
+        query = self.client.table("predictions").select(",".join(columns))
+        if direction:
+            query = query.eq("sp500_direction", direction)
+        if model_version:
+            query = query.eq("model_version", model_version)
+        if start:
+            query = query.gte("created_at", start)
+        if end:
+            query = query.lt("created_at", end)
+        if cursor:
+            created_at, row_id = decode_cursor(cursor)
+            query = query.or_(
+                f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{row_id})'
+            )
+        try:
+            # Fetch one extra row to know whether another page exists
+            response = (query.order("created_at", desc=True).order("id", desc=True)
+                        .limit(limit + 1).execute())
+        except Exception as e:
+            print(f"Error fetching predictions page: {e}")
+            raise
+        rows = response.data or []
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+        return rows, next_cursor
+
     def save_prediction(self, prediction_data: dict):
         """Save prediction result to predictions table."""
         try:
@@ -87,6 +225,17 @@ class SupabaseDB:
             # Don't raise here to avoid blocking response? 
             # Better to log.
 
+    def save_predictions(self, records: list):
+        """Save several prediction rows in one insert (e.g. a materialized profile matrix)."""
+        try:
+            now = datetime.utcnow().isoformat()
+            for record in records:
+                record.setdefault("created_at", now)
+            self.client.table("predictions").insert(records).execute()
+            print(f"Successfully saved {len(records)} predictions")
+        except Exception as e:
+            print(f"Error saving predictions: {e}")
+
 # Singleton instance
 try:
     db = SupabaseDB()
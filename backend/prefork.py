@@ -0,0 +1,269 @@
+"""
+Pre-fork Prediction Server
+The master loads and warms the hybrid model once, freezes the MLP weights
+into read-only NumPy arrays and forks workers that share them copy-on-write.
+Workers accept on one listening socket, never touch the TensorFlow runtime,
+and are recycled after a request count or RSS limit without a cold start
+(replacements are forked from the still-warm master). Worker slot 0 leads:
+it alone materializes snapshots and polls for updates, and the other
+workers replay its event journal.
+
+Usage (Linux):
+    python -m backend.prefork --workers 4 --max-requests 10000 --max-rss-mb 1024
+"""
+
+import argparse
+import gc
+import os
+import random
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+
+def process_memory(pid: Any = "self") -> Dict[str, float]:
+    """
+    Resident memory of a process in MB from /proc/<pid>/smaps_rollup.
+    pss_mb charges each shared page 1/N to each of its N sharers, so summing
+    pss_mb over workers gives the real footprint.
+    """
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1])
+    except OSError:
+        return {}
+    shared = fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0)
+    private = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    return {
+        "rss_mb": round(fields.get("Rss", 0) / 1024, 1),
+        "pss_mb": round(fields.get("Pss", 0) / 1024, 1),
+        "shared_mb": round(shared / 1024, 1),
+        "private_mb": round(private / 1024, 1),
+    }
+
+
+class RequestCounter:
+    """
+    WSGI middleware that calls on_limit once after `limit` requests and
+    tracks the requests still in flight (until their response is closed).
+    """
+
+    def __init__(self, app, limit: int, on_limit):
+        self.app = app
+        self.limit = limit
+        self.on_limit = on_limit
+        self.count = 0
+        self.active = 0
+        self._cond = threading.Condition()
+
+    def __call__(self, environ, start_response):
+        from werkzeug.wsgi import ClosingIterator
+
+        with self._cond:
+            self.count += 1
+            self.active += 1
+            reached = self.limit and self.count == self.limit
+        if reached:
+            self.on_limit(f"served {self.count} requests")
+        try:
+            return ClosingIterator(self.app(environ, start_response), self._finished)
+        except BaseException:
+            self._finished()
+            raise
+
+    def _finished(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify_all()
+
+    def wait_idle(self, timeout: float) -> bool:
+        """Wait until no request is in flight; False if some still are after timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.active == 0, timeout=timeout)
+
+
+def _reset_after_fork(workers: int):
+    """
+    Replace process-wide objects that must not be shared across processes:
+    thread pools (their threads did not survive the fork), the SQLite
+    connection of the prediction cache, and the LLM scheduler, whose quota
+    is split evenly between workers.
+    """
+    import tier3_model.hybrid_core as hybrid_core
+    import tier3_model.llm_scheduler as llm_scheduler
+    import tier3_model.prediction_cache as prediction_cache
+    import tier3_model.single_flight as single_flight
+    from backend import server
+
+    hybrid_core._executor = None
+    hybrid_core._batch_executor = None
+    server._predict_executor = None
+    prediction_cache._cache_instance = None
+    single_flight._single_flight_instance = None
+
+    old_scheduler = llm_scheduler._scheduler_instance
+    llm_scheduler._scheduler_instance = llm_scheduler.LLMScheduler(
+        requests_per_minute=max(1, int(os.environ.get("OPENAI_RPM_LIMIT", "500")) // workers),
+        tokens_per_minute=max(1, int(os.environ.get("OPENAI_TPM_LIMIT", "200000")) // workers),
+    )
+    model = hybrid_core._hybrid_instance
+    llm = getattr(model, "llm", None)
+    if llm is not None and getattr(llm, "scheduler", None) is old_scheduler:
+        llm.scheduler = llm_scheduler._scheduler_instance
+
+
+def run_worker(sock: socket.socket, workers: int, max_requests: int, max_rss_mb: float,
+               leader: bool, journal_path: Path, graceful_timeout: float = 30.0):
+    """
+    Serve on the inherited socket until recycled or told to stop. On the way
+    out the worker stops accepting, ends its /events streams (clients
+    reconnect to another worker) and waits up to graceful_timeout seconds
+    for in-flight requests before returning.
+    """
+    from werkzeug.serving import make_server
+    from backend import server
+    from backend.core.events import EventJournal, get_event_hub
+
+    _reset_after_fork(workers)
+    host, port = sock.getsockname()[:2]
+    httpd = make_server(host, port, server.app, threaded=True, fd=sock.fileno())
+    stopping = threading.Event()
+
+    def recycle(reason: str):
+        if not stopping.is_set():
+            stopping.set()
+            print(f"[worker {os.getpid()}] recycling: {reason}")
+            threading.Thread(target=httpd.shutdown, daemon=True).start()
+
+    def watch_memory():
+        while not stopping.wait(10.0):
+            rss = process_memory().get("rss_mb", 0.0)
+            if max_rss_mb and rss > max_rss_mb:
+                recycle(f"RSS {rss} MB > {max_rss_mb} MB")
+
+    signal.signal(signal.SIGTERM, lambda *_: recycle("SIGTERM"))
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    counter = RequestCounter(server.app, max_requests, recycle)
+    httpd.app = counter
+    server.start_background_tasks(load=False, leader=leader, journal=EventJournal(journal_path))
+    threading.Thread(target=watch_memory, name="rss-watch", daemon=True).start()
+    httpd.serve_forever()
+
+    # Stopped accepting; request threads are daemons, so drain them before os._exit
+    get_event_hub().close()
+    if not counter.wait_idle(graceful_timeout):
+        print(f"[worker {os.getpid()}] exiting with {counter.active} requests still in flight "
+              f"after {graceful_timeout:g}s")
+    httpd.server_close()
+
+
+def main(workers: int = 2, host: str = "0.0.0.0", port: int = 5000, max_requests: int = 0,
+         max_requests_jitter: int = 0, max_rss_mb: float = 0.0, report_sec: float = 60.0,
+         graceful_timeout: float = 30.0):
+    # Importing backend.server starts no threads; workers start theirs after fork
+    from backend import server
+    from tier3_model.hybrid_core import get_hybrid_model
+
+    server.load_models(materialize=False)
+    if not server._state["ready"]:
+        print(f"Model warm-up failed, not forking: {server._state['error']}")
+        sys.exit(1)
+    mlp = get_hybrid_model().mlp
+    mlp.freeze()
+    mlp.predict(server.WARMUP_FEATURES)
+    print(f"Master {os.getpid()} ready: {process_memory()}")
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(1024)
+    sock.set_inheritable(True)
+
+    # Move everything loaded so far out of the GC's reach so collections in
+    # workers do not write to (and un-share) the master's pages
+    gc.collect()
+    gc.freeze()
+
+    journal_dir = tempfile.mkdtemp(prefix="prefork-events-")
+    journal_path = Path(journal_dir) / "events.sqlite"
+    children: Dict[int, Tuple[float, int]] = {}  # pid -> (started, slot)
+    stopping = False
+
+    def spawn(slot: int):
+        limit = max_requests + (random.randint(0, max_requests_jitter) if max_requests_jitter else 0)
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(sock, workers, limit, max_rss_mb, slot == 0, journal_path, graceful_timeout)
+            except BaseException as e:
+                print(f"[worker {os.getpid()}] crashed: {e}")
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = (time.time(), slot)
+        print(f"Started worker {pid}" + (" (leader)" if slot == 0 else ""))
+
+    def stop(*_):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for slot in range(workers):
+        spawn(slot)
+    print(f"Serving on http://{host}:{port} with {workers} workers")
+
+    last_report = time.monotonic()
+    while children:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid:
+            child = children.pop(pid, None)
+            if child is not None and not stopping:
+                started, slot = child
+                print(f"Worker {pid} exited (status {status}) after {time.time() - started:.0f}s; replacing")
+                # The replacement takes over the slot, and with slot 0 the leader role
+                spawn(slot)
+            continue
+        if report_sec and time.monotonic() - last_report >= report_sec:
+            last_report = time.monotonic()
+            for child in children:
+                print(f"Worker {child}: {process_memory(child)}")
+        time.sleep(0.5)
+    sock.close()
+    shutil.rmtree(journal_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-fork prediction server with shared model memory.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", "5000")))
+    parser.add_argument("--max-requests", type=int, default=0, help="Recycle a worker after N requests (0 = never)")
+    parser.add_argument("--max-requests-jitter", type=int, default=0, help="Random extra requests so workers do not recycle together")
+    parser.add_argument("--max-rss-mb", type=float, default=0.0, help="Recycle a worker above this RSS (0 = never)")
+    parser.add_argument("--report-sec", type=float, default=60.0, help="Per-worker memory report interval")
+    parser.add_argument("--graceful-timeout", type=float, default=30.0,
+                        help="Seconds a stopping worker waits for in-flight requests")
+    args = parser.parse_args()
+    main(args.workers, args.host, args.port, args.max_requests, args.max_requests_jitter,
+         args.max_rss_mb, args.report_sec, args.graceful_timeout)
@@ -0,0 +1,441 @@
+"""
+Flask Backend Server
+Serves hybrid predictions to the dashboard.
+
+The hybrid model is loaded once at startup and warmed with one inference
+before /ready reports ready. Importing this module starts nothing; the
+entry points below start the model warm-up and the /events watcher:
+    python -m backend.server
+    gunicorn --workers 1 --threads 8 "backend.server:create_app()"
+    python -m backend.prefork --workers 4   (multi-core, shared model memory)
+
+Each open /events stream holds one server thread; for thousands of
+dashboards use more threads or a gevent worker.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any
+
+from dotenv import load_dotenv
+from flask import Flask, Response, jsonify, request
+from flask_cors import CORS
+
+load_dotenv(Path(__file__).parent / ".env")
+
+from backend.core.events import EventJournal, get_event_hub
+from backend.core.history import get_history
+from backend.core.inputs import get_latest_inputs
+from backend.core.materialize import lookup_prediction, materialize_predictions, get_snapshot, install_snapshot
+from backend.core.pipeline import generate_prediction, RISK_LEVELS, HORIZONS
+from backend.database import db
+from backend.prefork import process_memory
+from tier3_model.hybrid_core import get_hybrid_model
+from tier3_model.llm_scheduler import SchedulerBusyError, get_llm_scheduler
+from tier3_model.llm_telemetry import get_llm_telemetry
+from tier3_model.prediction_cache import get_prediction_cache
+from tier3_model.single_flight import get_single_flight
+
+REQUEST_TIMEOUT_SEC = float(os.environ.get("PREDICT_TIMEOUT_SEC", "30"))
+INPUT_REFRESH_SEC = float(os.environ.get("INPUT_REFRESH_SEC", "60"))
+# Latency budget when the client sends no X-Request-Deadline-Ms header (0 = none)
+DEFAULT_DEADLINE_MS = float(os.environ.get("DEFAULT_DEADLINE_MS", "0"))
+# Extra time past the deadline for the MLP-only answer before giving up with 504
+DEADLINE_GRACE_SEC = float(os.environ.get("DEADLINE_GRACE_SEC", "1"))
+UPDATE_POLL_SEC = float(os.environ.get("UPDATE_POLL_SEC", "2"))
+TIER1_POLL_SEC = float(os.environ.get("TIER1_POLL_SEC", "30"))
+# Threads running model inference for /predict requests that miss the snapshot
+PREDICT_THREADS = int(os.environ.get("PREDICT_THREADS", "8"))
+
+# Reference snapshot used only for the warm-up inference
+WARMUP_FEATURES = [2.5, 4.33, 4.2, 1.31, 5881.63]
+
+app = Flask(__name__)
+CORS(app)
+
+_state = {"ready": False, "error": None, "warmup_ms": None, "started_at": time.time(), "leader": True}
+_materialize_lock = threading.Lock()
+_predict_executor = None
+
+
+def load_models(materialize: bool = True):
+    """Load the hybrid model and run a warm-up MLP inference."""
+    try:
+        start = time.perf_counter()
+        model = get_hybrid_model()
+        model.mlp.predict(WARMUP_FEATURES)
+        model.mlp.predict_batch([WARMUP_FEATURES])
+        _state["warmup_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        _state["ready"] = True
+        print(f"Hybrid model ready ({model.model_version}) after {_state['warmup_ms']} ms")
+    except Exception as e:
+        _state["error"] = str(e)
+        print(f"Model warm-up failed: {e}")
+        return
+    if materialize:
+        refresh_snapshot_async()
+
+
+def get_predict_executor() -> ThreadPoolExecutor:
+    """
+    Pool for /predict inference. A timed-out request returns 504 while its
+    inference keeps running here (and still fills the cache).
+    """
+    global _predict_executor
+    if _predict_executor is None:
+        _predict_executor = ThreadPoolExecutor(max_workers=PREDICT_THREADS, thread_name_prefix="predict")
+    return _predict_executor
+
+
+def start_background_tasks(load: bool = True, leader: bool = True, journal: EventJournal = None):
+    """
+    Start the model warm-up (skipped when the model is already loaded, as in
+    pre-fork workers) and the update loop behind /events.
+
+    Args:
+        load: Load and warm the model in the background
+        leader: Run the fan-out loop (materialize and poll for updates). Of
+                the pre-fork workers only one leads; the others follow it
+        journal: EventJournal shared by the pre-fork workers
+    """
+    _state["leader"] = leader
+    if load:
+        # Load in the background so /health answers while TensorFlow initializes
+        threading.Thread(target=load_models, name="model-warmup", daemon=True).start()
+    if leader:
+        threading.Thread(target=watch_updates, args=(journal,), name="update-watcher", daemon=True).start()
+    else:
+        threading.Thread(target=follow_updates, args=(journal,), name="update-follower", daemon=True).start()
+
+
+def refresh_snapshot_async(inputs: Dict[str, Any] = None):
+    """Rebuild the profile matrix in the background, one rebuild at a time."""
+    if not _materialize_lock.acquire(blocking=False):
+        return
+
+    def run():
+        try:
+            materialize_predictions(inputs, save=False)
+        except Exception as e:
+            print(f"Materialization failed: {e}")
+        finally:
+            _materialize_lock.release()
+
+    threading.Thread(target=run, name="materialize", daemon=True).start()
+
+
+def snapshot_event(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    """All 9 profile responses of a snapshot, keyed "risk_level:horizon"."""
+    inputs = {"tier1_snapshot": snapshot["tier1_snapshot"]}
+    return {
+        "version": snapshot["version"],
+        "created_at": snapshot["created_at"],
+        "predictions": {
+            key: build_response(p, inputs, p["risk_level"], p["investment_horizon"])
+            for key, p in snapshot["predictions"].items()
+        },
+    }
+
+
+def apply_event(event_type: str, data: Dict[str, Any]):
+    """Publish a raw event to this process's hub ("snapshot" carries the snapshot itself)."""
+    if event_type == "snapshot":
+        get_event_hub().publish("snapshot", snapshot_event(data))
+    else:
+        get_event_hub().publish(event_type, data)
+
+
+def watch_updates(journal: EventJournal = None):
+    """
+    The single fan-out loop behind /events.
+    Materializes new Tier 2 rows and publishes each new snapshot and Tier 1
+    row once, however many clients are subscribed. Under pre-fork it runs in
+    the leader worker only, which also appends every event to the journal.
+    """
+    published_version = None
+    tier1_key = None
+    tier1_checked_at = 0.0
+
+    def publish(event_type: str, data: Dict[str, Any]):
+        if journal is not None:
+            journal.append(event_type, data)
+        apply_event(event_type, data)
+
+    if journal is not None:
+        # A replacement leader resumes from the previous leader's last events
+        for _, event_type, data in journal.read():
+            if event_type == "snapshot":
+                install_snapshot(data)
+                published_version = data["version"]
+            elif event_type == "ticker":
+                tier1_key = (data.get("id"), data.get("created_at"))
+            apply_event(event_type, data)
+
+    while True:
+        try:
+            if _state["ready"]:
+                inputs = get_latest_inputs(INPUT_REFRESH_SEC)
+                if inputs is not None and lookup_prediction("medium", "Mid", inputs.get("record_id")) is None:
+                    refresh_snapshot_async(inputs)
+
+                snapshot = get_snapshot()
+                if snapshot is not None and snapshot["version"] != published_version:
+                    publish("snapshot", snapshot)
+                    published_version = snapshot["version"]
+
+            now = time.monotonic()
+            if db and now - tier1_checked_at >= TIER1_POLL_SEC:
+                tier1_checked_at = now
+                record = db.fetch_latest_tier1_data()
+                if record and (record.get("id"), record.get("created_at")) != tier1_key:
+                    publish("ticker", record)
+                    tier1_key = (record.get("id"), record.get("created_at"))
+        except Exception as e:
+            print(f"Update watcher error: {e}")
+        time.sleep(UPDATE_POLL_SEC)
+
+
+def follow_updates(journal: EventJournal):
+    """
+    Pre-fork follower loop: replays the leader's journal into this worker's
+    hub and adopts its snapshots, so each change is materialized only once.
+    """
+    cursor = None
+    while True:
+        try:
+            for seq, event_type, data in journal.read(cursor):
+                if event_type == "snapshot":
+                    install_snapshot(data)
+                apply_event(event_type, data)
+                cursor = seq
+            if cursor is None:
+                cursor = 0
+        except Exception as e:
+            print(f"Update follower error: {e}")
+        time.sleep(UPDATE_POLL_SEC)
+
+
+def build_response(prediction: Dict[str, Any], inputs: Dict[str, Any],
+                   risk_level: str, horizon: str) -> Dict[str, Any]:
+    """Shape a prediction as the frontend's FullPredictionResponse."""
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "tier1_snapshot": inputs["tier1_snapshot"],
+        "tier2_risk_level": risk_level,
+        "tier2_horizon": horizon,
+        "tier3_prediction": {
+            "sp500_direction": prediction["sp500_direction"],
+            "probability_up": prediction["probability_up"],
+            "probability_down": prediction["probability_down"],
+            "recommended_sectors": prediction["recommended_sectors"],
+            "top_companies": prediction["top_companies"],
+            "reasoning": prediction["reasoning"],
+        },
+        "direction": prediction["sp500_direction"],
+        "sectors": prediction["recommended_sectors"],
+        "companies": prediction["top_companies"],
+        "reasoning": prediction["reasoning"],
+        "probability_up": prediction["probability_up"],
+        "probability_down": prediction["probability_down"],
+        "degraded": prediction.get("degraded"),
+    }
+
+
+def save_prediction_async(prediction: Dict[str, Any], model_version: str):
+    """Persist to the predictions table off the request path."""
+    if not db:
+        return
+    record = {
+        "sp500_direction": prediction["sp500_direction"],
+        "confidence_score": prediction["confidence_score"],
+        "probability_up": prediction["probability_up"],
+        "sector_recommendations": prediction["recommended_sectors"],
+        "top_stocks": prediction["top_companies"],
+        "model_version": model_version,
+    }
+    threading.Thread(target=db.save_prediction, args=(record,), daemon=True).start()
+
+
+@app.route("/predict", methods=["POST"])
+def predict():
+    """
+    API endpoint for running predictions.
+
+    Expected JSON body:
+    {
+        "risk_level": "low|medium|high",
+        "investment_horizon": "Short|Mid|Long"
+    }
+
+    Optional header X-Request-Deadline-Ms: latency budget. If the LLM cannot
+    answer in time the response is degraded to MLP-only or cached sentiment
+    ("degraded" field and X-Prediction-Degraded header).
+    """
+    received = time.monotonic()
+    try:
+        budget_ms = float(request.headers.get("X-Request-Deadline-Ms") or DEFAULT_DEADLINE_MS)
+    except ValueError:
+        return jsonify({"error": "Invalid X-Request-Deadline-Ms"}), 400
+    deadline = received + budget_ms / 1000.0 if budget_ms > 0 else None
+
+    if not _state["ready"]:
+        return jsonify({"error": "Model is warming up"}), 503
+
+    data = request.get_json(silent=True) or {}
+    risk_level = data.get("risk_level", "medium")
+    horizon = data.get("investment_horizon") or data.get("horizon") or "Mid"
+    if risk_level not in RISK_LEVELS:
+        return jsonify({"error": "Invalid risk_level"}), 400
+    if horizon not in HORIZONS:
+        return jsonify({"error": "Invalid investment_horizon"}), 400
+
+    inputs = get_latest_inputs(INPUT_REFRESH_SEC)
+    if inputs is None:
+        return jsonify({"error": "No Tier 2 data available"}), 503
+
+    # O(1) path: the materialized matrix for the current Tier 2 row
+    prediction = lookup_prediction(risk_level, horizon, inputs.get("record_id"))
+    if prediction is not None:
+        return jsonify(build_response(prediction, inputs, risk_level, horizon))
+    if _state["leader"]:
+        # Followers wait for the leader's snapshot instead of materializing their own
+        refresh_snapshot_async(inputs)
+
+    timeout = REQUEST_TIMEOUT_SEC
+    if deadline is not None:
+        timeout = min(timeout, deadline - time.monotonic() + DEADLINE_GRACE_SEC)
+    future = get_predict_executor().submit(
+        generate_prediction,
+        numerical_features=inputs["numerical_features"],
+        text_input=inputs["text_input"],
+        risk_level=risk_level,
+        investment_horizon=horizon,
+        deadline=deadline,
+    )
+    try:
+        prediction = future.result(timeout=max(0.0, timeout))
+    except FutureTimeoutError:
+        return jsonify({"error": f"Prediction timed out after {timeout:g}s"}), 504
+    except SchedulerBusyError as e:
+        # LLM backpressure: tell the client to retry rather than serve a neutral guess
+        return jsonify({"error": f"Prediction service busy: {e}"}), 503, {"Retry-After": "1"}
+    except Exception as e:
+        return jsonify({"error": f"Prediction failed: {e}"}), 500
+
+    response = jsonify(build_response(prediction, inputs, risk_level, horizon))
+    if prediction.get("degraded"):
+        response.headers["X-Prediction-Degraded"] = prediction["degraded"]
+    else:
+        save_prediction_async(prediction, get_hybrid_model().model_version)
+    return response
+
+
+@app.route("/events", methods=["GET"])
+def events():
+    """
+    Server-Sent Events stream of "snapshot" and "ticker" events.
+    Browsers resume automatically via the Last-Event-ID header; new
+    connections first receive the latest event of each type.
+    """
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    return Response(
+        get_event_hub().subscribe(last_event_id),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route("/history", methods=["GET"])
+def history():
+    """
+    LTTB-downsampled chart history.
+
+    Query: series=sp500|predictions, start/end=YYYY-MM-DD (optional), points=N
+    """
+    try:
+        result = get_history(
+            request.args.get("series", "sp500"),
+            start=request.args.get("start"),
+            end=request.args.get("end"),
+            points=int(request.args.get("points", "500")),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    response = jsonify(result)
+    response.headers["Cache-Control"] = "public, max-age=60"
+    return response
+
+
+@app.route("/predictions", methods=["GET"])
+def predictions_history():
+    """
+    Keyset-paginated prediction history, newest first.
+
+    Query: limit (max 1000), cursor, fields (comma-separated), direction,
+    model_version, start, end
+    """
+    if not db:
+        return jsonify({"error": "Database unavailable"}), 503
+    fields = request.args.get("fields")
+    try:
+        rows, next_cursor = db.fetch_predictions_page(
+            cursor=request.args.get("cursor"),
+            limit=max(1, min(int(request.args.get("limit", "100")), 1000)),
+            columns=fields.split(",") if fields else None,
+            direction=request.args.get("direction"),
+            model_version=request.args.get("model_version"),
+            start=request.args.get("start"),
+            end=request.args.get("end"),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"History query failed: {e}"}), 500
+    return jsonify({"items": rows, "next_cursor": next_cursor})
+
+
+@app.route("/health", methods=["GET"])
+def health():
+    """Liveness: the process is up (the model may still be warming)."""
+    return jsonify({"status": "healthy", "ready": _state["ready"]})
+
+
+@app.route("/ready", methods=["GET"])
+def ready():
+    """Readiness: 200 only once the model is loaded and warmed."""
+    if _state["ready"]:
+        return jsonify({"status": "ready", "warmup_ms": _state["warmup_ms"]})
+    status = "failed" if _state["error"] else "warming"
+    return jsonify({"status": status, "error": _state["error"]}), 503
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Serving metrics as JSON: coalescing, cache, LLM scheduler and telemetry."""
+    return jsonify({
+        "worker": {"pid": os.getpid(), "leader": _state["leader"], **process_memory()},
+        "snapshot_version": (get_snapshot() or {}).get("version"),
+        "events": get_event_hub().get_stats(),
+        "single_flight": get_single_flight().get_stats(),
+        "prediction_cache": dict(get_prediction_cache().stats),
+        "llm_scheduler": get_llm_scheduler().get_metrics(),
+        "llm_telemetry": get_llm_telemetry().snapshot(),
+    })
+
+
+def create_app() -> Flask:
+    """App factory for WSGI servers: starts the background tasks and returns the app."""
+    start_background_tasks()
+    return app
+
+
+if __name__ == "__main__":
+    port = int(os.environ.get("PORT", "5000"))
+    print(f"Starting backend server on http://localhost:{port}")
+    print(f"API endpoint: POST http://localhost:{port}/predict")
+    print(f"Push channel: GET http://localhost:{port}/events (SSE)")
+    create_app().run(host="0.0.0.0", port=port, threaded=True)
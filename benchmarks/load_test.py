@@ -0,0 +1,238 @@
+"""
+Prediction Load Test
+Drives the prediction path in-process (generate_prediction -> HybridModel.predict)
+or through the HTTP service, and reports throughput and HDR latency percentiles.
+
+Closed loop: --concurrency workers issue requests back to back.
+Open loop:   --rate requests/second arrive on a Poisson schedule regardless of
+             how fast they complete; latency is measured from the scheduled
+             arrival time, so queueing delay is not hidden (no coordinated omission).
+
+Usage:
+    TEXT_ANALYZER=local python benchmarks/load_test.py --requests 2000 --concurrency 8
+    python benchmarks/load_test.py --mode open --rate 50 --duration 30
+    python benchmarks/load_test.py --target http --url http://localhost:5000 --concurrency 32
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tier3_model.llm_telemetry import LatencyHistogram
+
+RISK_LEVELS = ("low", "medium", "high")
+HORIZONS = ("Short", "Mid", "Long")
+
+DEFAULT_TEXTS = [
+    "Federal Reserve signals rate cuts as inflation cools",
+    "Tech stocks rally on strong AI chip demand",
+    "Oil prices surge after supply disruption in the Middle East",
+    "Unemployment rises unexpectedly, raising recession fears",
+    "Banks report record earnings amid higher interest income",
+    "Trade tensions escalate as new tariffs are announced",
+]
+DEFAULT_FEATURES = [
+    [2.5, 4.33, 4.2, 1.31, 5881.63],
+    [3.1, 5.25, 3.9, 2.1, 4500.0],
+    [1.8, 3.5, 4.8, 0.4, 5200.0],
+]
+
+REPORT_PERCENTILES = (50, 75, 90, 95, 99, 99.9, 99.99, 100)
+
+
+class RequestMix:
+    """Random (features, text, risk_level, horizon) draws with a fixed seed."""
+
+    def __init__(self, texts: List[str], features: List[List[float]], seed: int = 0):
+        self.texts = texts
+        self.features = features
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def next(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "numerical_features": self._rng.choice(self.features),
+                "text_input": self._rng.choice(self.texts),
+                "risk_level": self._rng.choice(RISK_LEVELS),
+                "investment_horizon": self._rng.choice(HORIZONS),
+            }
+
+
+def in_process_target(use_cache: bool) -> Callable[[Dict[str, Any]], None]:
+    """Call generate_prediction directly (loads and warms the model first)."""
+    from backend.core.pipeline import generate_prediction
+    from tier3_model.hybrid_core import get_hybrid_model
+
+    model = get_hybrid_model()
+    model.mlp.predict(DEFAULT_FEATURES[0])
+    print(f"In-process target: {model.model_version}")
+
+    def call(req):
+        generate_prediction(priority="interactive", use_cache=use_cache, **req)
+    return call
+
+
+def http_target(url: str, timeout: float) -> Callable[[Dict[str, Any]], None]:
+    """POST /predict; the server supplies features and text from its latest Tier 2 row."""
+    import requests
+
+    local = threading.local()
+
+    def call(req):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        response = session.post(
+            f"{url.rstrip('/')}/predict",
+            json={"risk_level": req["risk_level"], "investment_horizon": req["investment_horizon"]},
+            timeout=timeout,
+        )
+        response.raise_for_status()
+    return call
+
+
+class LoadResult:
+    """Thread-safe latency histogram plus error counts."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = LatencyHistogram()
+        self.errors: Dict[str, int] = {}
+
+    def record(self, seconds: float, error: Optional[BaseException] = None):
+        with self._lock:
+            if error is None:
+                self.latency.record(seconds)
+            else:
+                name = type(error).__name__
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+
+def run_closed(call, mix: RequestMix, concurrency: int, total: int, duration: float) -> LoadResult:
+    """Each worker sends its next request as soon as the previous one returns."""
+    result = LoadResult()
+    deadline = time.perf_counter() + duration if duration else None
+    remaining = [total]
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                if remaining[0] <= 0 or (deadline and time.perf_counter() >= deadline):
+                    return
+                remaining[0] -= 1
+            req = mix.next()
+            start = time.perf_counter()
+            try:
+                call(req)
+                result.record(time.perf_counter() - start)
+            except Exception as e:
+                result.record(time.perf_counter() - start, e)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return result
+
+
+def run_open(call, mix: RequestMix, concurrency: int, total: int, duration: float,
+             rate: float, seed: int = 0) -> LoadResult:
+    """Poisson arrivals at `rate`/s into a pool of `concurrency` workers."""
+    result = LoadResult()
+    rng = random.Random(seed)
+
+    def one(req, scheduled):
+        try:
+            call(req)
+            result.record(time.perf_counter() - scheduled)
+        except Exception as e:
+            result.record(time.perf_counter() - scheduled, e)
+
+    start = time.perf_counter()
+    scheduled = start
+    sent = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        while sent < total and (not duration or scheduled - start < duration):
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(one, mix.next(), scheduled)
+            sent += 1
+            scheduled += rng.expovariate(rate)
+    return result
+
+
+def build_report(result: LoadResult, elapsed: float, config: Dict[str, Any]) -> Dict[str, Any]:
+    latency = result.latency
+    completed = latency.total_count
+    return {
+        "config": config,
+        "elapsed_sec": round(elapsed, 3),
+        "completed": completed,
+        "errors": result.errors,
+        "throughput_rps": round(completed / elapsed, 2) if elapsed else 0.0,
+        "latency": latency.to_dict(),
+        "percentile_distribution_ms": {str(p): latency.percentile(p) for p in REPORT_PERCENTILES},
+    }
+
+
+def main(target: str = "inprocess", mode: str = "closed", concurrency: int = 8,
+         requests_total: int = 1000, duration: float = 0.0, rate: float = 20.0,
+         url: str = "http://localhost:5000", timeout: float = 60.0, texts_path: Optional[str] = None,
+         use_cache: bool = False, seed: int = 0, out: Optional[str] = None) -> Dict[str, Any]:
+    texts = DEFAULT_TEXTS
+    if texts_path:
+        texts = [line.strip() for line in Path(texts_path).read_text(encoding="utf-8").splitlines() if line.strip()]
+    mix = RequestMix(texts, DEFAULT_FEATURES, seed=seed)
+    call = http_target(url, timeout) if target == "http" else in_process_target(use_cache)
+
+    start = time.perf_counter()
+    if mode == "open":
+        result = run_open(call, mix, concurrency, requests_total, duration, rate, seed=seed)
+    else:
+        result = run_closed(call, mix, concurrency, requests_total, duration)
+    elapsed = time.perf_counter() - start
+
+    report = build_report(result, elapsed, {
+        "target": target, "mode": mode, "concurrency": concurrency,
+        "requests": requests_total, "duration_sec": duration,
+        "rate_rps": rate if mode == "open" else None,
+        "texts": len(texts), "use_cache": use_cache,
+    })
+    print(json.dumps(report, indent=2))
+    if out:
+        Path(out).parent.mkdir(parents=True, exist_ok=True)
+        Path(out).write_text(json.dumps(report, indent=2))
+        print(f"Report written to {out}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the prediction path.")
+    parser.add_argument("--target", choices=["inprocess", "http"], default="inprocess")
+    parser.add_argument("--mode", choices=["closed", "open"], default="closed",
+                        help="closed: back-to-back per worker; open: fixed arrival rate")
+    parser.add_argument("--concurrency", type=int, default=8, help="Workers (closed) or max in flight (open)")
+    parser.add_argument("--requests", type=int, default=1000, help="Total requests")
+    parser.add_argument("--duration", type=float, default=0.0, help="Stop after this many seconds (0 = no limit)")
+    parser.add_argument("--rate", type=float, default=20.0, help="Open-loop arrivals per second")
+    parser.add_argument("--url", default="http://localhost:5000", help="Base URL for --target http")
+    parser.add_argument("--timeout", type=float, default=60.0, help="HTTP request timeout")
+    parser.add_argument("--texts", help="File with one input text per line (in-process only)")
+    parser.add_argument("--cache", action="store_true", help="Let requests hit the prediction cache")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Also write the JSON report here")
+    args = parser.parse_args()
+    main(args.target, args.mode, args.concurrency, args.requests, args.duration, args.rate,
+         args.url, args.timeout, args.texts, args.cache, args.seed, args.out)
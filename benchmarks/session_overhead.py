@@ -0,0 +1,171 @@
+"""
+Prediction Session Benchmark
+Compares per-call cost of generate_prediction when a new HybridPredictor is
+built on every call (old behaviour) against reusing one PredictionSession.
+
+Both variants must reach the LLM endpoint, or the benchmark only measures
+object construction: by default the K2 Think API is replaced with a local
+stub server (same response shape, optional simulated latency); --live uses
+the real endpoint and needs K2THINK_API_KEY. Every call sends a distinct
+text so the session's analysis cache cannot skip the request; a final pass
+with one repeated text shows what the cache adds on top.
+
+Usage:
+    python benchmarks/session_overhead.py --calls 1000
+    python benchmarks/session_overhead.py --calls 1000 --stub-latency-ms 20
+    K2THINK_API_KEY=... python benchmarks/session_overhead.py --calls 50 --live
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, List
+
+# Legacy tier packages live under archive/legacy
+sys.path.insert(0, str(Path(__file__).parent.parent / "archive" / "legacy"))
+
+from tier1 import get_static_test_data
+from tier2 import MockTier2Processor
+from tier3 import HybridPredictor, PredictionSession
+
+STUB_ANALYSIS = {
+    "sentiment": "positive",
+    "geopolitical_risk": "low",
+    "explanation": "Benchmark stub response.",
+    "relevant_sectors": ["Technology", "Financials"],
+}
+
+
+class StubK2Server(ThreadingHTTPServer):
+    """Local stand-in for the K2 Think chat endpoint; counts requests and TCP connections."""
+
+    daemon_threads = True
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.requests = 0
+        self.connections = set()
+        self.lock = threading.Lock()
+        super().__init__(("127.0.0.1", 0), _StubHandler)
+
+    @property
+    def endpoint(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1/chat/completions"
+
+    def reset(self):
+        with self.lock:
+            self.requests = 0
+            self.connections = set()
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps connections open, so a pooled session can reuse them
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; without this, Nagle plus
+    # delayed ACK adds ~40 ms to every response on a reused connection
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.connections.add(self.client_address)
+        if self.server.latency_ms:
+            time.sleep(self.server.latency_ms / 1000)
+        body = json.dumps({"choices": [{"message": {"content": json.dumps(STUB_ANALYSIS)}}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def time_calls(predict: Callable, features: List[float], texts: List[str]) -> float:
+    """Mean milliseconds per call, one call per text."""
+    start = time.perf_counter()
+    for text in texts:
+        predict(features, text)
+    return (time.perf_counter() - start) / len(texts) * 1000
+
+
+def main(calls: int = 1000, live: bool = False, stub_latency_ms: float = 0.0):
+    stub = None
+    if live:
+        if not os.environ.get("K2THINK_API_KEY"):
+            print("--live needs K2THINK_API_KEY; without it both variants take the no-key "
+                  "fallback and never call the API. Run without --live to use the local stub.")
+            return None
+    else:
+        stub = StubK2Server(stub_latency_ms)
+        threading.Thread(target=stub.serve_forever, name="k2-stub", daemon=True).start()
+        # K2ThinkClient reads these when constructed
+        os.environ["K2THINK_API_ENDPOINT"] = stub.endpoint
+        os.environ["K2THINK_API_KEY"] = "benchmark-stub"
+
+    tier2_data = MockTier2Processor(risk_level="medium").process(get_static_test_data())
+    features = tier2_data["numerical_features"]
+    text = tier2_data["text_input"]
+    # Distinct texts: every call is an LLM request in both variants
+    texts = [f"{text} [{i}]" for i in range(calls)]
+
+    # Warm the MLP singleton so neither side pays model loading
+    warm = HybridPredictor().predict(features, text)
+    if warm.get("llm_output", {}).get("fallback"):
+        print(f"LLM endpoint did not answer ({warm['llm_output'].get('explanation')}); aborting.")
+        return None
+
+    def served():
+        if stub is None:
+            return {}
+        with stub.lock:
+            counts = {"requests": stub.requests, "connections": len(stub.connections)}
+        stub.reset()
+        return counts
+
+    served()
+    before_ms = time_calls(lambda f, t: HybridPredictor().predict(f, t), features, texts)
+    before_served = served()
+
+    session = PredictionSession()
+    after_ms = time_calls(session.predict, features, texts)
+    after_served = served()
+    # Same text every call: the analysis cache answers after the first request
+    cached_ms = time_calls(session.predict, features, [text] * calls)
+    cached_served = served()
+    session.close()
+
+    result = {
+        "calls": calls,
+        "endpoint": "live" if live else f"stub ({stub_latency_ms:g} ms latency)",
+        "per_call_ms_new_predictor": round(before_ms, 4),
+        "per_call_ms_session": round(after_ms, 4),
+        "saved_per_call_ms": round(before_ms - after_ms, 4),
+        "per_call_ms_session_repeated_text": round(cached_ms, 4),
+        "session_llm_cache_hits": session.cache_hits,
+    }
+    if stub is not None:
+        result["stub_served"] = {
+            "new_predictor": before_served,
+            "session": after_served,
+            "session_repeated_text": cached_served,
+        }
+        stub.shutdown()
+    print(json.dumps(result, indent=2))
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark per-call prediction overhead.")
+    parser.add_argument("--calls", type=int, default=1000, help="Calls per variant")
+    parser.add_argument("--live", action="store_true", help="Call the real K2 Think API (needs K2THINK_API_KEY)")
+    parser.add_argument("--stub-latency-ms", type=float, default=0.0, help="Simulated latency of the local stub")
+    args = parser.parse_args()
+    main(args.calls, args.live, args.stub_latency_ms)
@@ -52,3 +52,14 @@ CREATE TABLE IF NOT EXISTS predictions (
     model_version VARCHAR(50),
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
+
+-- Profile columns for materialized prediction matrices (backend/core/materialize.py)
+ALTER TABLE predictions ADD COLUMN IF NOT EXISTS risk_level VARCHAR(10);
+ALTER TABLE predictions ADD COLUMN IF NOT EXISTS investment_horizon VARCHAR(10);
+ALTER TABLE predictions ADD COLUMN IF NOT EXISTS snapshot_version VARCHAR(64);
+
+-- Full-precision probability for the /history chart (confidence_score is rounded)
+ALTER TABLE predictions ADD COLUMN IF NOT EXISTS probability_up FLOAT;
+
+-- Keyset pagination for the predictions history API (created_at DESC, id DESC)
+CREATE INDEX IF NOT EXISTS predictions_created_at_id_idx ON predictions (created_at DESC, id DESC);
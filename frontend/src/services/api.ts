@@ -4,7 +4,7 @@
  */
 // Backend integration disabled for demo mode
 // import axios from 'axios';
-import type { PredictionRequest, FullPredictionResponse } from '../types/api';
+import type { PredictionRequest, FullPredictionResponse, PredictionSnapshotEvent } from '../types/api';
 import { MOCK_PREDICTION, simulateLoading } from './mockPrediction';
 
 // Backend integration disabled for demo mode
@@ -74,5 +74,26 @@ export async function checkHealth(): Promise<boolean> {
   // }
 }
 
+/**
+ * Subscribe to pushed prediction snapshots and Tier 1 ticker updates (SSE)
+ * Backend integration disabled for demo mode - never fires
+ * Returns an unsubscribe function
+ */
+export function subscribeToUpdates(
+  onSnapshot: (snapshot: PredictionSnapshotEvent) => void,
+  onTicker?: (record: Record<string, unknown>) => void
+): () => void {
+  // Backend integration disabled for demo mode
+  void onSnapshot;
+  void onTicker;
+  return () => {};
 
-
+  // Backend integration disabled for demo mode
+  // EventSource reconnects on its own and resends Last-Event-ID
+  // const source = new EventSource(`${API_BASE_URL}/events`);
+  // source.addEventListener('snapshot', (e) => onSnapshot(JSON.parse((e as MessageEvent).data)));
+  // if (onTicker) {
+  //   source.addEventListener('ticker', (e) => onTicker(JSON.parse((e as MessageEvent).data)));
+  // }
+  // return () => source.close();
+}
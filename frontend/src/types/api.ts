@@ -41,7 +41,13 @@ export interface FullPredictionResponse {
   reasoning?: string;
   probability_up?: number;
   probability_down?: number;
+  // Set when the LLM missed the request deadline: 'mlp_only' | 'cached_sentiment'
+  degraded?: string | null;
 }
 
-
-
+/** Payload of the "snapshot" event on GET /events (keys are "risk_level:horizon") */
+export interface PredictionSnapshotEvent {
+  version: string;
+  created_at: string;
+  predictions: Record<string, FullPredictionResponse>;
+}
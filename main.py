@@ -5,18 +5,21 @@ Runs Tier 1 → Tier 2 → Tier 3 pipeline.
 
 from tier1 import get_static_test_data
 from tier2 import MockTier2Processor
-from tier3 import generate_prediction
+from tier3 import generate_prediction, get_prediction_session, PredictionSession
+from tier3_model.prediction_cache import get_prediction_cache, make_cache_key
 import json
 from datetime import datetime
 
 
-def run_pipeline(risk_level: str = "medium", investment_horizon: str = "Mid") -> dict:
+def run_pipeline(risk_level: str = "medium", investment_horizon: str = "Mid",
+                 session: PredictionSession = None) -> dict:
     """
     Run the complete prediction pipeline.
     
     Args:
         risk_level: "low", "medium", or "high"
         investment_horizon: "Short", "Mid", or "Long"
+        session: Prediction session to reuse; defaults to the shared session
         
     Returns:
         Complete prediction result
@@ -41,12 +44,30 @@ def run_pipeline(risk_level: str = "medium", investment_horizon: str = "Mid") ->
     
     # Tier 3: Hybrid prediction
     print(f"\n[Tier 3] Running hybrid prediction (horizon: {investment_horizon})...")
-    prediction = generate_prediction(
+    session = session or get_prediction_session()
+    # Derived from the legacy MLP weights and K2 model, so retraining invalidates the cache
+    model_version = session.model_version
+    cache = get_prediction_cache()
+    cache_key = make_cache_key(
+        model_version,
         numerical_features=tier2_data["numerical_features"],
         text_input=tier2_data["text_input"],
         risk_level=risk_level,
-        investment_horizon=investment_horizon
+        investment_horizon=investment_horizon,
     )
+    prediction = cache.get(cache_key)
+    if prediction is not None:
+        print("  ✓ Served from prediction cache")
+    else:
+        prediction = generate_prediction(
+            numerical_features=tier2_data["numerical_features"],
+            text_input=tier2_data["text_input"],
+            risk_level=risk_level,
+            investment_horizon=investment_horizon,
+            session=session
+        )
+        if not prediction["llm_output"].get("fallback"):
+            cache.set(cache_key, prediction, model_version=model_version)
     print(f"  ✓ S&P 500 Direction: {prediction['sp500_direction']}")
     print(f"  ✓ Recommended Sectors: {', '.join(prediction['recommended_sectors'])}")
     print(f"  ✓ Top Companies: {', '.join(prediction['top_companies'][:5])}")
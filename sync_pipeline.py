@@ -5,6 +5,8 @@ import logging
 import pandas as pd
 from backend.database import db
 from tier2_data_integration import Tier2DataProcessor
+from tier3_model.prediction_cache import get_prediction_cache
+from backend.core.materialize import materialize_predictions
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -34,6 +36,7 @@ def sync_tier1_data():
     
     if db:
         db.upload_tier1_data(tier1_record)
+        get_prediction_cache().invalidate(reason="new Tier 1 data")
         logging.info("Tier 1 Data Synced.")
     else:
         logging.error("Database not connected.")
@@ -77,13 +80,25 @@ def sync_tier2_data():
             # }
             
             db.upload_tier2_data(tier2_data)
+            get_prediction_cache().invalidate(reason="new Tier 2 data")
             logging.info("Tier 2 Data Synced.")
     except Exception as e:
         logging.error(f"Tier 2 Sync Failed: {e}")
 
+def materialize_profiles():
+    """Precompute all risk_level x horizon predictions for the fresh data."""
+    logging.info("Materializing prediction matrix...")
+    try:
+        snapshot = materialize_predictions(save=True)
+        if snapshot:
+            logging.info(f"Prediction snapshot {snapshot['version']} stored.")
+    except Exception as e:
+        logging.error(f"Materialization Failed: {e}")
+
 if __name__ == "__main__":
     if not db:
         logging.error("Supabase connection failed. Check credentials.")
     else:
         sync_tier1_data()
         sync_tier2_data()
+        materialize_profiles()
@@ -7,6 +7,7 @@ from tier2_processing.clean_macro import clean_macro_data
 from tier2_processing.clean_sentiment import clean_sentiment_data
 from tier2_processing.normalizer import normalize_features
 from tier2_processing.feature_engineering import engineer_features
+from tier3_model.prediction_cache import get_prediction_cache
 
 supabase = get_client()
 
@@ -57,6 +58,8 @@ def run_pipeline():
         count += 1
         
     print(f"Processed and inserted {count} records.")
+    if count:
+        get_prediction_cache().invalidate(reason="new Tier 2 processed features")
 
 if __name__ == "__main__":
     run_pipeline()
@@ -4,56 +4,240 @@ Hybrid Model Core
 Combines MLP (numerical) and LLM (textual) outputs for final prediction.
 """
 
-from typing import Dict, Any, List
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, Any, List, Callable, Optional
+import numpy as np
 from tier3_model.mlp_model import get_mlp_predictor
 from tier3_model.llm_client import LLMClient, TOP_COMPANIES
+from tier3_model.llm_scheduler import SchedulerBusyError
+
+# Bump when the combine logic changes; cached predictions are keyed on it
+MODEL_VERSION = "hybrid-v1"
+
+# Combine parameters: sentiment shifts MLP probability by up to SENTIMENT_WEIGHT
+SENTIMENT_WEIGHT = 0.2
+DECISION_THRESHOLD = 0.5
+
+# Stand-in text analysis when a deadline cuts the LLM short and no earlier
+# analysis of the same text is available: sentiment 0 leaves the MLP as is
+NEUTRAL_ANALYSIS = {
+    "sentiment": "neutral",
+    "sentiment_score": 0.0,
+    "geopolitical_risk": "unknown",
+    "relevant_sectors": [],
+    "explanation": "Text analysis did not finish within the request deadline; "
+                   "this prediction is based on the macro indicators only.",
+}
+ANALYSIS_CACHE_SIZE = 256
+
+# Shared pool for LLM network calls, so they overlap with MLP inference
+_executor = None
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=int(os.environ.get("HYBRID_LLM_WORKERS", "16")),
+            thread_name_prefix="hybrid-llm"
+        )
+    return _executor
+
+# Separate bounded pool for batch analysis (analyze_texts): a backfill batch
+# waits in the scheduler's backfill lane on these threads and never occupies
+# the shared pool, so interactive calls still reach the scheduler first
+_batch_executor = None
+def get_batch_executor() -> ThreadPoolExecutor:
+    global _batch_executor
+    if _batch_executor is None:
+        _batch_executor = ThreadPoolExecutor(
+            max_workers=int(os.environ.get("HYBRID_BATCH_LLM_WORKERS", "8")),
+            thread_name_prefix="hybrid-llm-batch"
+        )
+    return _batch_executor
 
 class HybridModel:
-    def __init__(self):
+    def __init__(self, llm=None, concurrent: bool = True):
+        """
+        Args:
+            llm: Text analyzer exposing analyze_text(text, priority); defaults to
+                 LLMClient, or the local distilled classifier when TEXT_ANALYZER=local
+            concurrent: Run the LLM call on the shared executor while the MLP
+                        runs in the calling thread
+        """
+        self.concurrent = concurrent
         self.mlp = get_mlp_predictor()
-        self.llm = LLMClient()
+        if llm is None and os.environ.get("TEXT_ANALYZER", "").lower() == "local":
+            from tier3_model.local_sentiment import LocalSentimentAnalyzer
+            llm = LocalSentimentAnalyzer.load()
+        self.llm = llm or LLMClient()
+        self.model_version = self._compute_model_version()
+        # Last good analysis per text, served when a deadline cuts the LLM short
+        self._analyses = OrderedDict()
+        self._analyses_lock = threading.Lock()
     
-    def predict(self, macro_features: List[float], text_input: str) -> Dict[str, Any]:
+    def _compute_model_version(self) -> str:
+        """
+        MODEL_VERSION + text analyzer + digest of the MLP weights file. The
+        analyzer is the LLM model name, or for the local classifier a digest
+        of its weights, so retraining either model invalidates cached results.
+        """
+        mlp_digest = "untrained"
+        model_path = getattr(self.mlp, "model_path", None)
+        if model_path is not None and os.path.exists(model_path):
+            with open(model_path, "rb") as f:
+                mlp_digest = hashlib.sha256(f.read()).hexdigest()[:12]
+        analyzer = getattr(self.llm, "model", None) or type(self.llm).__name__
+        return f"{MODEL_VERSION}:{analyzer}:{mlp_digest}"
+    
+    def predict(self, macro_features: List[float], text_input: str,
+                priority: str = "interactive", deadline: Optional[float] = None,
+                on_late_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
         """
         Run hybrid prediction.
         
         Args:
             macro_features: [inflation, interest, unemployment, GDP, sp500]
             text_input: Combined text of news/geopolitics
+            priority: LLM scheduler lane ("interactive", "scheduled" or "backfill")
+            deadline: time.monotonic() by which to answer. If the LLM is not
+                      done by then, the result is degraded (see "degraded")
+            on_late_result: Called with the full result once a late LLM
+                            analysis lands (only after a degraded answer)
             
         Returns:
-            Final prediction dictionary
+            Final prediction dictionary. "degraded" is None, "cached_sentiment"
+            (an earlier analysis of the same text was used) or "mlp_only"
+
+        Raises:
+            SchedulerBusyError: The LLM scheduler lane is full (without a
+                                deadline; with one the answer is degraded)
         """
-        # 1. Run MLP
+        start = time.perf_counter()
+        timings = {}
+        degraded = None
+
+        def run_llm():
+            # Returns its own timing: after a deadline it outlives this call
+            llm_start = time.perf_counter()
+            result = self.llm.analyze_text(text_input, priority=priority)
+            return result, (time.perf_counter() - llm_start) * 1000
+
+        if self.concurrent or deadline is not None:
+            # 1+2. Dispatch LLM first (network-bound), run MLP meanwhile
+            llm_future = get_executor().submit(run_llm)
+            mlp_start = time.perf_counter()
+            mlp_result = self.mlp.predict(macro_features)
+            timings["mlp_ms"] = (time.perf_counter() - mlp_start) * 1000
+            if deadline is None:
+                llm_result, timings["llm_ms"] = llm_future.result()
+            else:
+                try:
+                    llm_result, timings["llm_ms"] = llm_future.result(
+                        timeout=max(0.0, deadline - time.monotonic()))
+                except FutureTimeoutError:
+                    llm_result, degraded = self._degraded_analysis(text_input)
+                    llm_future.add_done_callback(
+                        lambda f: self._on_late_analysis(f, text_input, mlp_result, on_late_result)
+                    )
+                except SchedulerBusyError:
+                    # The LLM lane is full: a deadline-bound caller takes the degraded answer
+                    llm_result, degraded = self._degraded_analysis(text_input)
+        else:
+            # 1. Run MLP
+            mlp_start = time.perf_counter()
+            mlp_result = self.mlp.predict(macro_features)
+            timings["mlp_ms"] = (time.perf_counter() - mlp_start) * 1000
+
+            # 2. Run LLM
+            llm_result, timings["llm_ms"] = run_llm()
+        if degraded is None:
+            self._remember_analysis(text_input, llm_result)
+
+        # 3. Combine
+        combine_start = time.perf_counter()
+        result = self._combine(mlp_result, llm_result)
+        result["degraded"] = degraded
+        timings["combine_ms"] = (time.perf_counter() - combine_start) * 1000
+        timings["total_ms"] = (time.perf_counter() - start) * 1000
+        result["timings"] = {k: round(v, 3) for k, v in timings.items()}
+        return result
+
+    def degraded_predict(self, macro_features: List[float], text_input: str) -> Dict[str, Any]:
+        """MLP plus the cached (or neutral) analysis, without calling the LLM."""
+        start = time.perf_counter()
         mlp_result = self.mlp.predict(macro_features)
-        
-        # 2. Run LLM
-        llm_result = self.llm.analyze_text(text_input)
-        
-        # 3. Combine Logic
-        # Heuristic combination:
-        # MLP gives baseline trend
-        # LLM modifies confidence or suggests specific sectors
-        
+        mlp_ms = (time.perf_counter() - start) * 1000
+        llm_result, degraded = self._degraded_analysis(text_input)
+        result = self._combine(mlp_result, llm_result)
+        result["degraded"] = degraded
+        result["timings"] = {"mlp_ms": round(mlp_ms, 3), "total_ms": round((time.perf_counter() - start) * 1000, 3)}
+        return result
+
+    @staticmethod
+    def _text_key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _remember_analysis(self, text: str, analysis: Dict[str, Any]):
+        if analysis.get("fallback"):
+            return
+        key = self._text_key(text)
+        with self._analyses_lock:
+            self._analyses[key] = analysis
+            self._analyses.move_to_end(key)
+            while len(self._analyses) > ANALYSIS_CACHE_SIZE:
+                self._analyses.popitem(last=False)
+
+    def _degraded_analysis(self, text: str):
+        """(analysis, degraded mode) to use when the LLM missed the deadline."""
+        with self._analyses_lock:
+            cached = self._analyses.get(self._text_key(text))
+        if cached is not None:
+            return dict(cached), "cached_sentiment"
+        return dict(NEUTRAL_ANALYSIS), "mlp_only"
+
+    def _on_late_analysis(self, future, text: str, mlp_result: Dict[str, Any],
+                          on_late_result: Optional[Callable[[Dict[str, Any]], None]]):
+        """Done-callback for an LLM call that missed its deadline."""
+        if future.cancelled() or future.exception() is not None:
+            return
+        analysis, _ = future.result()
+        self._remember_analysis(text, analysis)
+        if on_late_result is not None and not analysis.get("fallback"):
+            try:
+                result = self._combine(mlp_result, analysis)
+                result["degraded"] = None
+                on_late_result(result)
+            except Exception as e:
+                print(f"Late LLM result handler failed: {e}")
+
+    def _combine(self, mlp_result: Dict[str, Any], llm_result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Combine Logic
+        Heuristic combination:
+        MLP gives baseline trend
+        LLM modifies confidence or suggests specific sectors
+        """
         mlp_prob_up = mlp_result["probability_up"]
         llm_sentiment = llm_result["sentiment_score"] # -1 to 1
         
         # Adjust probability based on sentiment
         # If sentiment is strong, shift probability by up to 0.2
-        adjusted_prob_up = mlp_prob_up + (llm_sentiment * 0.2)
+        adjusted_prob_up = mlp_prob_up + (llm_sentiment * SENTIMENT_WEIGHT)
         adjusted_prob_up = max(0.0, min(1.0, adjusted_prob_up))
         
-        final_trend = "UP" if adjusted_prob_up >= 0.5 else "DOWN"
+        final_trend = "UP" if adjusted_prob_up >= DECISION_THRESHOLD else "DOWN"
         
         # Get recommended sectors and stocks
         recommended_sectors = llm_result["relevant_sectors"]
-        top_stocks = {}
-        for sector in recommended_sectors:
-            if sector in TOP_COMPANIES:
-                top_stocks[sector] = TOP_COMPANIES[sector]
+        top_stocks = select_top_stocks(recommended_sectors)
         
         return {
             "final_trend": final_trend,
+            "probability_up": adjusted_prob_up,
             "confidence_score": round(abs(adjusted_prob_up - 0.5) * 2, 2), # 0 to 1 confidence from center
             "mlp_output": mlp_result,
             "llm_analysis": llm_result,
@@ -61,6 +245,133 @@ class HybridModel:
             "top_stocks": top_stocks
         }
 
+    def predict_many(self, macro_features_list: List[List[float]], texts: List[str],
+                     priority: str = "backfill") -> "BatchPrediction":
+        """
+        Batch hybrid prediction for N (macro_features, text) pairs.
+        One MLP forward pass, concurrent LLM analysis of the distinct texts,
+        and a vectorized combine.
+        
+        Args:
+            macro_features_list: N rows of [inflation, interest, unemployment, GDP, sp500]
+            texts: N combined texts (identical texts are analyzed once)
+            priority: LLM scheduler lane
+            
+        Returns:
+            Columnar BatchPrediction
+        """
+        if len(macro_features_list) != len(texts):
+            raise ValueError(f"Got {len(macro_features_list)} feature rows but {len(texts)} texts")
+        start = time.perf_counter()
+        timings = {}
+
+        # Fan out LLM calls on the batch pool, run the MLP batch meanwhile
+        llm_start = time.perf_counter()
+        pending = self.analyze_texts(texts, priority=priority)
+
+        mlp_start = time.perf_counter()
+        mlp_prob_up = self.mlp.predict_batch(macro_features_list)
+        timings["mlp_ms"] = (time.perf_counter() - mlp_start) * 1000
+
+        analyses, text_index = pending()
+        timings["llm_ms"] = (time.perf_counter() - llm_start) * 1000
+
+        batch = combine_batch(mlp_prob_up, analyses, text_index)
+        timings["combine_ms"] = batch.timings["combine_ms"]
+        timings["total_ms"] = (time.perf_counter() - start) * 1000
+        batch.timings = {k: round(v, 3) for k, v in timings.items()}
+        return batch
+
+    def analyze_texts(self, texts: List[str], priority: str = "backfill") -> Callable[[], tuple]:
+        """
+        Start analyzing the distinct texts (LLM calls fan out on the batch pool).
+
+        Returns:
+            A callable that waits and returns (analyses, text_index), where
+            text_index maps each input row to its analysis
+        """
+        # Dedupe texts; text_index maps each row to its unique analysis
+        unique_texts = list(dict.fromkeys(texts))
+        position = {text: i for i, text in enumerate(unique_texts)}
+        text_index = np.array([position[t] for t in texts], dtype=np.int64)
+
+        if hasattr(self.llm, "analyze_many"):
+            # Local analyzers score the whole batch in one vectorized call
+            return lambda: (self.llm.analyze_many(unique_texts), text_index)
+        futures = [get_batch_executor().submit(self.llm.analyze_text, text, priority=priority)
+                   for text in unique_texts]
+        return lambda: ([future.result() for future in futures], text_index)
+
+
+def combine_batch(mlp_prob_up: np.ndarray, analyses: List[Dict[str, Any]],
+                  text_index: np.ndarray) -> "BatchPrediction":
+    """Vectorized combine of MLP probabilities with their rows' text analyses."""
+    combine_start = time.perf_counter()
+    sentiment = np.array([a["sentiment_score"] for a in analyses], dtype=float)[text_index] if analyses else np.zeros(0)
+    probability_up = np.clip(mlp_prob_up + sentiment * SENTIMENT_WEIGHT, 0.0, 1.0)
+    final_trend = np.where(probability_up >= DECISION_THRESHOLD, "UP", "DOWN")
+    confidence_score = np.round(np.abs(probability_up - 0.5) * 2, 2)
+    return BatchPrediction(
+        final_trend=final_trend,
+        probability_up=probability_up,
+        confidence_score=confidence_score,
+        mlp_probability_up=mlp_prob_up,
+        sentiment_score=sentiment,
+        text_index=text_index,
+        llm_analyses=analyses,
+        timings={"combine_ms": (time.perf_counter() - combine_start) * 1000},
+    )
+
+
+def select_top_stocks(sectors: List[str]) -> Dict[str, List[str]]:
+    """Top companies for each recognized sector."""
+    return {sector: TOP_COMPANIES[sector] for sector in sectors if sector in TOP_COMPANIES}
+
+
+class BatchPrediction:
+    """
+    Columnar result of HybridModel.predict_many.
+    Per-row columns are NumPy arrays; LLM analyses are stored once per
+    distinct text and referenced through text_index.
+    """
+
+    def __init__(self, final_trend, probability_up, confidence_score, mlp_probability_up,
+                 sentiment_score, text_index, llm_analyses, timings):
+        self.final_trend = final_trend
+        self.probability_up = probability_up
+        self.confidence_score = confidence_score
+        self.mlp_probability_up = mlp_probability_up
+        self.sentiment_score = sentiment_score
+        self.text_index = text_index
+        self.llm_analyses = llm_analyses
+        self.timings = timings
+
+    def __len__(self) -> int:
+        return len(self.final_trend)
+
+    def row(self, i: int) -> Dict[str, Any]:
+        """Row i in the same shape HybridModel.predict returns."""
+        llm_result = self.llm_analyses[self.text_index[i]]
+        mlp_prob_up = float(self.mlp_probability_up[i])
+        recommended_sectors = llm_result["relevant_sectors"]
+        return {
+            "final_trend": str(self.final_trend[i]),
+            "probability_up": float(self.probability_up[i]),
+            "confidence_score": float(self.confidence_score[i]),
+            "mlp_output": {
+                "probability_up": mlp_prob_up,
+                "probability_down": 1.0 - mlp_prob_up,
+                "trend": "UP" if mlp_prob_up >= 0.5 else "DOWN",
+            },
+            "llm_analysis": llm_result,
+            "recommended_sectors": recommended_sectors,
+            "top_stocks": select_top_stocks(recommended_sectors),
+        }
+
+    def to_rows(self) -> List[Dict[str, Any]]:
+        return [self.row(i) for i in range(len(self))]
+
+
 # Global instance
 _hybrid_instance = None
 def get_hybrid_model():
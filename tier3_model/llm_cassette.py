@@ -0,0 +1,183 @@
+"""
+LLM Cassette
+Record/replay of LLM request → response pairs for deterministic, network-free runs.
+
+File layout (little-endian):
+    header  : magic (8 bytes) | entry count (u32) | reserved (u32)
+    index   : count × [sha256 key (32 bytes) | payload offset (u64) | payload length (u32)], sorted by key
+    payloads: zlib-compressed UTF-8 JSON responses
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+MAGIC = b"NWCASS01"
+HEADER = struct.Struct("<8sII")
+INDEX_ENTRY = struct.Struct("<32sQI")
+
+CASSETTE_MODES = ("record", "replay")
+
+
+class CassetteMissError(KeyError):
+    """Raised in replay mode when a request was never recorded."""
+
+
+def request_key(request: Dict[str, Any]) -> bytes:
+    """Canonical sha256 digest of an LLM request payload."""
+    canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).digest()
+
+
+class LLMCassette:
+    """
+    Stores LLM responses keyed by a hash of the full request.
+
+    record: responses are kept in memory and written on save(); a request
+            repeated within the run is served from the recording so the
+            recorded run and its replay see identical responses.
+    replay: the cassette file is memory-mapped and looked up by binary
+            search over the sorted index; a miss raises CassetteMissError.
+    """
+
+    def __init__(self, path: str, mode: str = "replay"):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"mode must be one of {CASSETTE_MODES}")
+        self.path = Path(path)
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self._recorded = {}  # key -> compressed payload
+        self._mm = None
+        self._count = 0
+
+        if mode == "replay":
+            self._open_for_replay()
+        elif self.path.exists():
+            # Re-recording extends an existing cassette
+            self._open_for_replay()
+            for i in range(self._count):
+                key, offset, length = INDEX_ENTRY.unpack_from(self._mm, HEADER.size + i * INDEX_ENTRY.size)
+                self._recorded[key] = bytes(self._mm[offset:offset + length])
+            self.close()
+
+    def _open_for_replay(self):
+        if not self.path.exists():
+            raise FileNotFoundError(f"Cassette not found: {self.path}")
+        with open(self.path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                raise ValueError(f"Empty cassette file: {self.path}")
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, _ = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Not a cassette file: {self.path}")
+        self._count = count
+
+    def _lookup(self, key: bytes) -> Optional[bytes]:
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            pos = HEADER.size + mid * INDEX_ENTRY.size
+            mid_key = self._mm[pos:pos + 32]
+            if mid_key < key:
+                lo = mid + 1
+            elif mid_key > key:
+                hi = mid
+            else:
+                _, offset, length = INDEX_ENTRY.unpack_from(self._mm, pos)
+                return self._mm[offset:offset + length]
+        return None
+
+    def get(self, request: Dict[str, Any]) -> Optional[Any]:
+        """
+        Return the recorded response for a request, or None in record mode.
+
+        Raises:
+            CassetteMissError: Replay mode and the request is not on the cassette
+        """
+        key = request_key(request)
+        if self.mode == "replay":
+            payload = self._lookup(key)
+            if payload is None:
+                self.misses += 1
+                raise CassetteMissError(
+                    f"Request {key.hex()[:16]} not found in cassette {self.path} "
+                    f"(model={request.get('model')}); re-record the run."
+                )
+        else:
+            payload = self._recorded.get(key)
+            if payload is None:
+                self.misses += 1
+                return None
+        self.hits += 1
+        return json.loads(zlib.decompress(payload).decode("utf-8"))
+
+    def put(self, request: Dict[str, Any], response: Any):
+        """Record a response (record mode only)."""
+        if self.mode != "record":
+            raise RuntimeError("Cassette is not in record mode")
+        payload = json.dumps(response, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        self._recorded[request_key(request)] = zlib.compress(payload, 9)
+
+    def save(self):
+        """Write recorded entries to disk atomically (record mode only)."""
+        if self.mode != "record":
+            return
+        keys = sorted(self._recorded)
+        offset = HEADER.size + len(keys) * INDEX_ENTRY.size
+        index = []
+        for key in keys:
+            length = len(self._recorded[key])
+            index.append(INDEX_ENTRY.pack(key, offset, length))
+            offset += length
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, len(keys), 0))
+            f.write(b"".join(index))
+            for key in keys:
+                f.write(self._recorded[key])
+        os.replace(tmp_path, self.path)
+        print(f"Saved {len(keys)} LLM responses to cassette {self.path}")
+
+    def entries(self) -> Iterator[Any]:
+        """Iterate over every recorded response, in key order."""
+        if self.mode == "record":
+            for key in sorted(self._recorded):
+                yield json.loads(zlib.decompress(self._recorded[key]).decode("utf-8"))
+            return
+        for i in range(self._count):
+            _, offset, length = INDEX_ENTRY.unpack_from(self._mm, HEADER.size + i * INDEX_ENTRY.size)
+            yield json.loads(zlib.decompress(self._mm[offset:offset + length]).decode("utf-8"))
+
+    def close(self):
+        """Release the memory map."""
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+    def __len__(self) -> int:
+        return len(self._recorded) if self.mode == "record" else self._count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Responses recorded before a failure are still valid
+        self.save()
+        self.close()
+
+
+def cassette_from_env() -> Optional[LLMCassette]:
+    """Build a cassette from LLM_CASSETTE_MODE / LLM_CASSETTE_PATH, if set."""
+    mode = os.environ.get("LLM_CASSETTE_MODE", "").lower()
+    path = os.environ.get("LLM_CASSETTE_PATH", "")
+    if not mode or not path:
+        return None
+    return LLMCassette(path, mode)
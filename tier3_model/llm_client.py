@@ -6,8 +6,15 @@ Handles text analysis for sentiment and geopolitical risk assessment.
 
 import os
 import json
+import time
 from typing import Dict, Any, Optional
 from openai import OpenAI
+from tier3_model.llm_scheduler import LLMScheduler, SchedulerBusyError, get_llm_scheduler, estimate_tokens
+from tier3_model.llm_cassette import LLMCassette, CassetteMissError, cassette_from_env
+from tier3_model.llm_telemetry import LLMTelemetry, get_llm_telemetry
+
+# Prefix of the user message; local_sentiment.py strips it when harvesting labels
+USER_PROMPT_PREFIX = "Analyze market impact:\n\n"
 
 class LLMClient:
     """
@@ -15,9 +22,14 @@ class LLMClient:
     Handles text analysis for sentiment and geopolitical risk assessment.
     """
     
-    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4o-mini"):
+    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4o-mini",
+                 scheduler: Optional[LLMScheduler] = None, cassette: Optional[LLMCassette] = None,
+                 telemetry: Optional[LLMTelemetry] = None):
         """
         Initialize LLM client.
+        All requests are admitted through the shared LLMScheduler unless one is given.
+        An optional cassette records or replays responses (see llm_cassette.py).
+        Every call is reported to the shared LLMTelemetry collector.
         """
         # Adjust path to find .env if needed, or rely on already loaded env
         self.api_key = api_key or os.environ.get("OPENAI_API_KEY", "")
@@ -27,32 +39,55 @@ class LLMClient:
             self.client = OpenAI(api_key=self.api_key)
         else:
             self.client = None
+        self.scheduler = scheduler or get_llm_scheduler()
+        self.max_tokens = 500
+        self.cassette = cassette or cassette_from_env()
+        self.telemetry = telemetry or get_llm_telemetry()
     
-    def analyze_text(self, text: str) -> Dict[str, Any]:
+    def analyze_text(self, text: str, priority: str = "interactive") -> Dict[str, Any]:
         """
         Analyze text for sentiment and geopolitical risk.
+        
+        Args:
+            text: Input text to analyze
+            priority: Scheduler lane ("interactive", "scheduled" or "backfill")
+
+        Raises:
+            SchedulerBusyError: The scheduler lane is full; other API errors
+                                return a neutral result with "fallback": True
         """
-        if not self.api_key or not self.client:
+        replaying = self.cassette is not None and self.cassette.mode == "replay"
+        if (not self.api_key or not self.client) and not replaying:
+            self.telemetry.record_fallback(self.model, "no_api_key")
             return {
                 "sentiment_score": 0.0,
                 "sentiment": "neutral",
                 "geopolitical_risk": "medium",
                 "explanation": "OpenAI API unavailable (API key not set). Returning neutral default.",
-                "relevant_sectors": []
+                "relevant_sectors": [],
+                "fallback": True
             }
         
         try:
-            return self._get_analysis(text)
+            return self._get_analysis(text, priority)
+        except CassetteMissError:
+            # A replay miss means the run is no longer deterministic; fail loudly
+            raise
+        except SchedulerBusyError:
+            # Backpressure: the caller decides whether to degrade, retry or shed load
+            raise
         except Exception as e:
+            self.telemetry.record_fallback(self.model, type(e).__name__)
             return {
                 "sentiment_score": 0.0,
                 "sentiment": "neutral",
                 "geopolitical_risk": "medium",
                 "explanation": f"OpenAI API error: {str(e)}. Returning neutral default.",
-                "relevant_sectors": []
+                "relevant_sectors": [],
+                "fallback": True
             }
 
-    def _get_analysis(self, text: str) -> Dict[str, Any]:
+    def _get_analysis(self, text: str, priority: str = "interactive") -> Dict[str, Any]:
         system_prompt = """You are a financial market analyst specializing in sentiment analysis and geopolitical risk assessment. 
 Analyze the provided economic and geopolitical text and return a structured JSON response with:
 1. Sentiment: "positive", "neutral", or "negative" (based on market impact)
@@ -62,20 +97,19 @@ Analyze the provided economic and geopolitical text and return a structured JSON
 
 Return ONLY valid JSON."""
 
-        user_prompt = f"Analyze market impact:\n\n{text}"
+        user_prompt = f"{USER_PROMPT_PREFIX}{text}"
         
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
+        request = {
+            "model": self.model,
+            "messages": [
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
             ],
-            temperature=0.7,
-            max_tokens=500,
-            response_format={"type": "json_object"}
-        )
-        
-        content = response.choices[0].message.content
+            "temperature": 0.7,
+            "max_tokens": self.max_tokens,
+            "response_format": {"type": "json_object"}
+        }
+        content = self._complete(request, priority)
         parsed = json.loads(content)
         
         sentiment_str = parsed.get("sentiment", "neutral").lower()
@@ -94,6 +128,58 @@ Return ONLY valid JSON."""
             "relevant_sectors": relevant_sectors
         }
 
+    def _complete(self, request: Dict[str, Any], priority: str) -> str:
+        """
+        Send a chat completion request and return the message content.
+        Served from the cassette when one is attached.
+        """
+        if self.cassette is not None:
+            recorded = self.cassette.get(request)
+            if recorded is not None:
+                self.telemetry.record_cache_hit(request["model"])
+                return recorded["content"]
+
+        estimated = estimate_tokens(
+            "".join(m["content"] for m in request["messages"]), request["max_tokens"]
+        )
+        submitted_at = time.perf_counter()
+        sent_at = []
+
+        def call():
+            sent_at.append(time.perf_counter())
+            return self.client.chat.completions.create(**request)
+
+        try:
+            response = self.scheduler.submit(call, priority=priority, estimated_tokens=estimated)
+        except Exception as e:
+            if not sent_at:
+                # Rejected before the request went out: no round-trip to time
+                self.telemetry.record_rejection(request["model"], type(e).__name__)
+                raise
+            self.telemetry.record_call(
+                request["model"], time.perf_counter() - sent_at[0],
+                queue_wait_sec=sent_at[0] - submitted_at, error=type(e).__name__
+            )
+            raise
+        finished_at = time.perf_counter()
+
+        usage = getattr(response, "usage", None)
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        if prompt_tokens or completion_tokens:
+            self.scheduler.record_usage(estimated, prompt_tokens + completion_tokens)
+        self.telemetry.record_call(
+            request["model"], finished_at - sent_at[0],
+            prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+            queue_wait_sec=sent_at[0] - submitted_at
+        )
+
+        content = response.choices[0].message.content
+        if self.cassette is not None:
+            # Keep the prompt so recorded runs double as training labels
+            self.cassette.put(request, {"content": content, "user_prompt": request["messages"][-1]["content"]})
+        return content
+
 # Sector and company definitions
 SECTORS = {
     "Technology": ["tech", "software", "hardware", "semiconductor", "AI", "cloud", "IT"],
@@ -0,0 +1,214 @@
+"""
+LLM Request Scheduler
+Token-bucket rate limiting with priority lanes for all LLM traffic.
+"""
+
+import heapq
+import itertools
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+# Priority lanes, highest priority first
+PRIORITY_LANES = ("interactive", "scheduled", "backfill")
+
+
+class SchedulerBusyError(RuntimeError):
+    """Raised when a lane is full or a caller waited longer than its timeout."""
+
+
+class TokenBucket:
+    """
+    Classic token bucket.
+    Holds up to `capacity` units and refills continuously at `refill_per_sec`.
+    Not thread-safe on its own; LLMScheduler guards it with its lock.
+    """
+
+    def __init__(self, capacity: float, refill_per_sec: float):
+        self.capacity = float(capacity)
+        self.refill_per_sec = float(refill_per_sec)
+        self.level = float(capacity)
+        self._last = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._last) * self.refill_per_sec)
+        self._last = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` units are available (0.0 if available now)."""
+        self._refill()
+        # Requests larger than the bucket can never fit; let them through once full
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.refill_per_sec
+
+    def take(self, amount: float):
+        """Remove units. Level may go negative when reconciling actual usage."""
+        self._refill()
+        self.level -= amount
+
+    def give(self, amount: float):
+        """Return units, e.g. when an estimate overshot actual usage."""
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+
+class LLMScheduler:
+    """
+    Central gate for LLM calls.
+    Enforces requests-per-minute and tokens-per-minute limits and serves
+    waiting callers strictly by lane (interactive > scheduled > backfill),
+    FIFO within a lane. Each lane has a bounded queue so bulk jobs feel
+    backpressure instead of piling up unbounded work.
+    """
+
+    def __init__(self, requests_per_minute: int = 500, tokens_per_minute: int = 200000,
+                 max_queue_depth: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            requests_per_minute: RPM quota shared by all lanes
+            tokens_per_minute: TPM quota shared by all lanes
+            max_queue_depth: Max waiting callers per lane (missing lanes are unbounded)
+        """
+        self.request_bucket = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        self.token_bucket = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+        self.max_queue_depth = max_queue_depth or {"interactive": 1000, "scheduled": 200, "backfill": 50}
+
+        self._cond = threading.Condition()
+        self._queue = []  # heap of (lane_rank, seq)
+        self._seq = itertools.count()
+        self._metrics = {
+            lane: {
+                "queue_depth": 0,
+                "max_queue_depth": 0,
+                "submitted": 0,
+                "completed": 0,
+                "rejected": 0,
+                "total_wait_sec": 0.0,
+                "max_wait_sec": 0.0,
+            }
+            for lane in PRIORITY_LANES
+        }
+
+    def submit(self, fn: Callable[[], Any], priority: str = "interactive",
+               estimated_tokens: int = 1000, timeout: Optional[float] = None) -> Any:
+        """
+        Block until the call is admitted, then run it in the caller's thread.
+
+        Args:
+            fn: Zero-argument callable performing the LLM request
+            priority: One of PRIORITY_LANES
+            estimated_tokens: Prompt + completion tokens charged up front
+            timeout: Max seconds to wait for admission (None waits forever)
+
+        Returns:
+            Whatever fn returns
+
+        Raises:
+            SchedulerBusyError: Lane queue full or admission timed out
+        """
+        self.acquire(priority, estimated_tokens, timeout)
+        return fn()
+
+    def acquire(self, priority: str = "interactive", estimated_tokens: int = 1000,
+                timeout: Optional[float] = None):
+        """Wait for admission without running anything (see submit)."""
+        if priority not in PRIORITY_LANES:
+            raise ValueError(f"priority must be one of {PRIORITY_LANES}")
+
+        lane_metrics = self._metrics[priority]
+        ticket = (PRIORITY_LANES.index(priority), next(self._seq))
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+
+        with self._cond:
+            limit = self.max_queue_depth.get(priority)
+            if limit is not None and lane_metrics["queue_depth"] >= limit:
+                lane_metrics["rejected"] += 1
+                raise SchedulerBusyError(f"LLM scheduler '{priority}' lane is full ({limit} waiting)")
+
+            heapq.heappush(self._queue, ticket)
+            lane_metrics["submitted"] += 1
+            lane_metrics["queue_depth"] += 1
+            lane_metrics["max_queue_depth"] = max(lane_metrics["max_queue_depth"], lane_metrics["queue_depth"])
+
+            try:
+                while True:
+                    wait = None
+                    if self._queue[0] == ticket:
+                        wait = max(self.request_bucket.wait_time(1),
+                                   self.token_bucket.wait_time(estimated_tokens))
+                        if wait == 0.0:
+                            break
+
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            lane_metrics["rejected"] += 1
+                            raise SchedulerBusyError(f"Timed out waiting in LLM scheduler '{priority}' lane")
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._cond.wait(wait)
+
+                heapq.heappop(self._queue)
+                self.request_bucket.take(1)
+                self.token_bucket.take(estimated_tokens)
+            except BaseException:
+                if ticket in self._queue:
+                    self._queue.remove(ticket)
+                    heapq.heapify(self._queue)
+                raise
+            finally:
+                lane_metrics["queue_depth"] -= 1
+                # Wake the next head of the queue
+                self._cond.notify_all()
+
+            waited = time.monotonic() - start
+            lane_metrics["completed"] += 1
+            lane_metrics["total_wait_sec"] += waited
+            lane_metrics["max_wait_sec"] = max(lane_metrics["max_wait_sec"], waited)
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int):
+        """Reconcile the up-front token estimate with the usage the API reported."""
+        with self._cond:
+            delta = actual_tokens - estimated_tokens
+            if delta > 0:
+                self.token_bucket.take(delta)
+            elif delta < 0:
+                self.token_bucket.give(-delta)
+                self._cond.notify_all()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Snapshot of per-lane queue depth and wait-time metrics."""
+        with self._cond:
+            lanes = {}
+            for lane, m in self._metrics.items():
+                lanes[lane] = dict(m)
+                lanes[lane]["avg_wait_sec"] = m["total_wait_sec"] / m["completed"] if m["completed"] else 0.0
+            return {
+                "lanes": lanes,
+                "queue_depth": len(self._queue),
+                "requests_available": round(self.request_bucket.level, 2),
+                "tokens_available": round(self.token_bucket.level, 2),
+            }
+
+
+def estimate_tokens(text: str, max_completion_tokens: int = 0) -> int:
+    """Rough token estimate (~4 characters per token) plus the completion budget."""
+    return len(text) // 4 + max_completion_tokens
+
+
+# Global instance shared by every LLMClient in the process
+_scheduler_instance = None
+
+def get_llm_scheduler() -> LLMScheduler:
+    """Get or create the process-wide LLM scheduler."""
+    global _scheduler_instance
+    if _scheduler_instance is None:
+        _scheduler_instance = LLMScheduler(
+            requests_per_minute=int(os.environ.get("OPENAI_RPM_LIMIT", "500")),
+            tokens_per_minute=int(os.environ.get("OPENAI_TPM_LIMIT", "200000")),
+        )
+    return _scheduler_instance
@@ -0,0 +1,225 @@
+"""
+LLM Telemetry
+Per-call instrumentation for LLM traffic: latency histograms, token usage,
+cost, errors, scheduler rejections, fallbacks and cache effectiveness.
+"""
+
+import json
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# USD per 1M tokens: (prompt, completion)
+MODEL_PRICING = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+}
+
+SUB_BUCKET_BITS = 7
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+SUB_BUCKET_HALF = SUB_BUCKET_COUNT >> 1
+
+
+class LatencyHistogram:
+    """
+    HDR-style log-linear histogram over integer microseconds.
+    Values below 128us are exact; above that each power-of-two range is split
+    into 64 linear sub-buckets (~1.6% relative precision) with sparse storage.
+    """
+
+    def __init__(self):
+        self.counts = defaultdict(int)
+        self.total_count = 0
+        self.total_us = 0
+        self.min_us = None
+        self.max_us = 0
+
+    @staticmethod
+    def _index(value_us: int) -> int:
+        if value_us < SUB_BUCKET_COUNT:
+            return value_us
+        shift = value_us.bit_length() - SUB_BUCKET_BITS
+        return (shift << (SUB_BUCKET_BITS - 1)) + (value_us >> shift)
+
+    @staticmethod
+    def _highest_equivalent(index: int) -> int:
+        if index < SUB_BUCKET_COUNT:
+            return index
+        shift = index // SUB_BUCKET_HALF - 1
+        mantissa = index - shift * SUB_BUCKET_HALF
+        return ((mantissa + 1) << shift) - 1
+
+    def record(self, seconds: float):
+        """Record one latency sample given in seconds."""
+        value_us = max(0, int(round(seconds * 1_000_000)))
+        self.counts[self._index(value_us)] += 1
+        self.total_count += 1
+        self.total_us += value_us
+        self.min_us = value_us if self.min_us is None else min(self.min_us, value_us)
+        self.max_us = max(self.max_us, value_us)
+
+    def merge(self, other: "LatencyHistogram"):
+        """Add another histogram's samples into this one."""
+        for index, count in other.counts.items():
+            self.counts[index] += count
+        self.total_count += other.total_count
+        self.total_us += other.total_us
+        if other.min_us is not None:
+            self.min_us = other.min_us if self.min_us is None else min(self.min_us, other.min_us)
+        self.max_us = max(self.max_us, other.max_us)
+
+    def percentile(self, pct: float) -> float:
+        """Latency in milliseconds at the given percentile (0-100)."""
+        if self.total_count == 0:
+            return 0.0
+        target = max(1, int(round(pct / 100.0 * self.total_count + 0.4999)))
+        running = 0
+        for index in sorted(self.counts):
+            running += self.counts[index]
+            if running >= target:
+                return min(self._highest_equivalent(index), self.max_us) / 1000.0
+        return self.max_us / 1000.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Summary in milliseconds, suitable for JSON dashboards."""
+        return {
+            "count": self.total_count,
+            "min_ms": (self.min_us or 0) / 1000.0,
+            "mean_ms": round(self.total_us / self.total_count / 1000.0, 3) if self.total_count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p90_ms": self.percentile(90),
+            "p99_ms": self.percentile(99),
+            "p99_9_ms": self.percentile(99.9),
+            "max_ms": self.max_us / 1000.0,
+        }
+
+
+class LLMTelemetry:
+    """
+    Thread-safe aggregator for LLM calls, keyed by model.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Drop all recorded data."""
+        with self._lock:
+            self._models = {}
+
+    def _model(self, model: str) -> Dict[str, Any]:
+        if model not in self._models:
+            self._models[model] = {
+                "latency": LatencyHistogram(),
+                "queue_wait": LatencyHistogram(),
+                "calls": 0,
+                "errors": defaultdict(int),
+                "rejections": defaultdict(int),
+                "fallbacks": defaultdict(int),
+                "cache_hits": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "cost_usd": 0.0,
+            }
+        return self._models[model]
+
+    def record_call(self, model: str, latency_sec: float, prompt_tokens: int = 0,
+                    completion_tokens: int = 0, queue_wait_sec: float = 0.0,
+                    error: Optional[str] = None):
+        """
+        Record one network round-trip to the LLM API.
+
+        Args:
+            model: Model name sent to the API
+            latency_sec: Wall time of the API request itself
+            prompt_tokens / completion_tokens: From response.usage
+            queue_wait_sec: Time spent waiting in the LLM scheduler
+            error: Exception class name if the call failed
+        """
+        prompt_price, completion_price = MODEL_PRICING.get(model, (0.0, 0.0))
+        with self._lock:
+            m = self._model(model)
+            m["calls"] += 1
+            m["latency"].record(latency_sec)
+            m["queue_wait"].record(queue_wait_sec)
+            if error:
+                m["errors"][error] += 1
+            m["prompt_tokens"] += prompt_tokens
+            m["completion_tokens"] += completion_tokens
+            m["cost_usd"] += (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+    def record_rejection(self, model: str, reason: str):
+        """
+        Record a request that failed before reaching the API (e.g. the
+        scheduler was busy). Counted apart from calls, with no latency sample,
+        so the histograms only describe real round-trips.
+        """
+        with self._lock:
+            self._model(model)["rejections"][reason] += 1
+
+    def record_cache_hit(self, model: str):
+        """Record a response served without an API call (cassette or cache)."""
+        with self._lock:
+            self._model(model)["cache_hits"] += 1
+
+    def record_fallback(self, model: str, reason: str):
+        """Record that the neutral default was returned instead of an analysis."""
+        with self._lock:
+            self._model(model)["fallbacks"][reason] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Aggregated metrics per model plus overall totals."""
+        with self._lock:
+            models = {}
+            overall = LatencyHistogram()
+            totals = {"calls": 0, "cache_hits": 0, "errors": 0, "rejections": 0, "fallbacks": 0,
+                      "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0}
+            for name, m in self._models.items():
+                lookups = m["calls"] + m["cache_hits"]
+                models[name] = {
+                    "calls": m["calls"],
+                    "cache_hits": m["cache_hits"],
+                    "cache_hit_rate": round(m["cache_hits"] / lookups, 4) if lookups else 0.0,
+                    "errors": dict(m["errors"]),
+                    "rejections": dict(m["rejections"]),
+                    "fallbacks": dict(m["fallbacks"]),
+                    "prompt_tokens": m["prompt_tokens"],
+                    "completion_tokens": m["completion_tokens"],
+                    "cost_usd": round(m["cost_usd"], 6),
+                    "priced": name in MODEL_PRICING,
+                    "latency": m["latency"].to_dict(),
+                    "queue_wait": m["queue_wait"].to_dict(),
+                }
+                overall.merge(m["latency"])
+                totals["calls"] += m["calls"]
+                totals["cache_hits"] += m["cache_hits"]
+                totals["errors"] += sum(m["errors"].values())
+                totals["rejections"] += sum(m["rejections"].values())
+                totals["fallbacks"] += sum(m["fallbacks"].values())
+                totals["prompt_tokens"] += m["prompt_tokens"]
+                totals["completion_tokens"] += m["completion_tokens"]
+                totals["cost_usd"] += m["cost_usd"]
+            totals["cost_usd"] = round(totals["cost_usd"], 6)
+            totals["latency"] = overall.to_dict()
+            return {"models": models, "totals": totals}
+
+    def dump_json(self, path: str):
+        """Write snapshot() to a JSON file."""
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+
+# Global instance shared by every LLMClient in the process
+_telemetry_instance = None
+
+def get_llm_telemetry() -> LLMTelemetry:
+    """Get or create the process-wide LLM telemetry collector."""
+    global _telemetry_instance
+    if _telemetry_instance is None:
+        _telemetry_instance = LLMTelemetry()
+    return _telemetry_instance
@@ -0,0 +1,208 @@
+"""
+Local Sentiment Classifier
+Hashing-vectorizer + linear models distilled from recorded LLM judgments.
+Scores sentiment and geopolitical risk on CPU without any API calls.
+"""
+
+import argparse
+import hashlib
+import json
+import pickle
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.metrics import confusion_matrix
+
+from tier3_model.llm_cassette import LLMCassette
+from tier3_model.llm_client import SECTORS, USER_PROMPT_PREFIX
+
+SENTIMENT_LABELS = ["negative", "neutral", "positive"]
+RISK_LABELS = ["low", "medium", "high"]
+SENTIMENT_SCORES = {"positive": 1.0, "neutral": 0.0, "negative": -1.0}
+
+DEFAULT_MODEL_PATH = Path(__file__).parent / "local_sentiment.pkl"
+
+
+def harvest_labels(cassette_paths: Iterable[str]) -> Tuple[List[str], List[str], List[str]]:
+    """
+    Collect (text, sentiment, geopolitical_risk) labels from recorded LLM cassettes.
+
+    Returns:
+        Tuple of (texts, sentiments, risks); entries without a usable label are skipped
+    """
+    texts, sentiments, risks = [], [], []
+    for path in cassette_paths:
+        cassette = LLMCassette(path, mode="replay")
+        try:
+            for entry in cassette.entries():
+                prompt = entry.get("user_prompt")
+                if not prompt:
+                    continue
+                try:
+                    parsed = json.loads(entry["content"])
+                except (KeyError, TypeError, json.JSONDecodeError):
+                    continue
+                sentiment = str(parsed.get("sentiment", "")).lower()
+                risk = str(parsed.get("geopolitical_risk", "")).lower()
+                if sentiment not in SENTIMENT_LABELS or risk not in RISK_LABELS:
+                    continue
+                if prompt.startswith(USER_PROMPT_PREFIX):
+                    prompt = prompt[len(USER_PROMPT_PREFIX):]
+                texts.append(prompt)
+                sentiments.append(sentiment)
+                risks.append(risk)
+        finally:
+            cassette.close()
+    return texts, sentiments, risks
+
+
+def match_sectors(text: str) -> List[str]:
+    """Keyword sector match used in place of the LLM's sector list."""
+    text_lower = text.lower()
+    return [sector for sector, keywords in SECTORS.items()
+            if any(keyword.lower() in text_lower for keyword in keywords)]
+
+
+class LocalSentimentAnalyzer:
+    """
+    Drop-in replacement for LLMClient.analyze_text backed by two linear
+    classifiers (sentiment, geopolitical risk) over hashed word n-grams.
+    """
+
+    def __init__(self, n_features: int = 2 ** 18):
+        self.vectorizer = HashingVectorizer(
+            n_features=n_features,
+            ngram_range=(1, 2),
+            alternate_sign=False,
+            norm="l2",
+        )
+        self.sentiment_model = None
+        self.risk_model = None
+        # Set by load() to a digest of the weights; part of the hybrid model version
+        self.model = None
+
+    def fit(self, texts: List[str], sentiments: List[str], risks: List[str]) -> "LocalSentimentAnalyzer":
+        """Train both heads on LLM-labelled texts."""
+        X = self.vectorizer.transform(texts)
+        self.sentiment_model = self._train_head(X, sentiments)
+        self.risk_model = self._train_head(X, risks)
+        return self
+
+    @staticmethod
+    def _train_head(X, labels: List[str]) -> SGDClassifier:
+        model = SGDClassifier(loss="log_loss", alpha=1e-5, max_iter=50, tol=1e-4, random_state=42)
+        model.fit(X, labels)
+        return model
+
+    def analyze_many(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Score a batch of texts in one vectorized pass."""
+        if self.sentiment_model is None or self.risk_model is None:
+            raise RuntimeError("Local sentiment model is not trained; call fit() or load() first.")
+        if not texts:
+            return []
+
+        X = self.vectorizer.transform(texts)
+        sentiment_proba = self.sentiment_model.predict_proba(X)
+        risk_pred = self.risk_model.predict(X)
+        sentiment_classes = self.sentiment_model.classes_
+        best = sentiment_proba.argmax(axis=1)
+
+        results = []
+        for i, text in enumerate(texts):
+            sentiment = str(sentiment_classes[best[i]])
+            confidence = float(sentiment_proba[i, best[i]])
+            results.append({
+                "sentiment_score": SENTIMENT_SCORES.get(sentiment, 0.0),
+                "sentiment": sentiment,
+                "geopolitical_risk": str(risk_pred[i]),
+                "explanation": f"Local classifier: {sentiment} sentiment (p={confidence:.2f}).",
+                "relevant_sectors": match_sectors(text),
+            })
+        return results
+
+    def analyze_text(self, text: str, priority: str = "interactive") -> Dict[str, Any]:
+        """
+        LLMClient-compatible single-text analysis.
+        `priority` is accepted for interface parity and ignored (no quota involved).
+        """
+        return self.analyze_many([text])[0]
+
+    def agreement_report(self, texts: List[str], sentiments: List[str], risks: List[str]) -> Dict[str, Any]:
+        """
+        Compare local predictions with LLM labels.
+
+        Returns:
+            Per-head agreement rate and confusion matrix (rows = LLM, cols = local)
+        """
+        predictions = self.analyze_many(texts)
+        report = {"samples": len(texts)}
+        for head, labels, truth in (("sentiment", SENTIMENT_LABELS, sentiments),
+                                    ("geopolitical_risk", RISK_LABELS, risks)):
+            predicted = [p[head] for p in predictions]
+            agree = float(np.mean([a == b for a, b in zip(truth, predicted)])) if texts else 0.0
+            report[head] = {
+                "agreement": round(agree, 4),
+                "labels": labels,
+                "confusion_matrix": confusion_matrix(truth, predicted, labels=labels).tolist() if texts else [],
+            }
+        return report
+
+    def save(self, path: Path = DEFAULT_MODEL_PATH):
+        """Persist trained heads (the hashing vectorizer is stateless)."""
+        with open(path, "wb") as f:
+            pickle.dump({
+                "n_features": self.vectorizer.n_features,
+                "sentiment_model": self.sentiment_model,
+                "risk_model": self.risk_model,
+            }, f)
+        print(f"Local sentiment model saved to {path}")
+
+    @classmethod
+    def load(cls, path: Path = DEFAULT_MODEL_PATH) -> "LocalSentimentAnalyzer":
+        """Load a model written by save()."""
+        with open(path, "rb") as f:
+            data = f.read()
+        state = pickle.loads(data)
+        analyzer = cls(n_features=state["n_features"])
+        analyzer.sentiment_model = state["sentiment_model"]
+        analyzer.risk_model = state["risk_model"]
+        analyzer.model = f"local-sentiment-{hashlib.sha256(data).hexdigest()[:12]}"
+        return analyzer
+
+
+def train_from_cassettes(cassette_paths: List[str], holdout: float = 0.2,
+                         model_path: Path = DEFAULT_MODEL_PATH) -> Dict[str, Any]:
+    """
+    Harvest labels, train on a deterministic split and report agreement on the holdout.
+    The saved model is refit on all labels.
+    """
+    texts, sentiments, risks = harvest_labels(cassette_paths)
+    if len(texts) < 10:
+        raise ValueError(f"Need at least 10 labelled texts to train, found {len(texts)}")
+
+    order = np.random.RandomState(42).permutation(len(texts))
+    n_test = max(1, int(len(texts) * holdout))
+    test_idx, train_idx = order[:n_test], order[n_test:]
+
+    def pick(values, idx):
+        return [values[i] for i in idx]
+
+    analyzer = LocalSentimentAnalyzer().fit(pick(texts, train_idx), pick(sentiments, train_idx), pick(risks, train_idx))
+    report = analyzer.agreement_report(pick(texts, test_idx), pick(sentiments, test_idx), pick(risks, test_idx))
+    report["train_samples"] = len(train_idx)
+
+    LocalSentimentAnalyzer().fit(texts, sentiments, risks).save(model_path)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the local sentiment classifier from LLM cassettes.")
+    parser.add_argument("cassettes", nargs="+", help="Cassette files recorded with LLM_CASSETTE_MODE=record")
+    parser.add_argument("--holdout", type=float, default=0.2, help="Fraction of labels held out for the agreement report")
+    parser.add_argument("--out", default=str(DEFAULT_MODEL_PATH), help="Output model path")
+    args = parser.parse_args()
+
+    print(json.dumps(train_from_cassettes(args.cassettes, args.holdout, Path(args.out)), indent=2))
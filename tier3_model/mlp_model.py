@@ -26,6 +26,8 @@ class MLPPredictor:
         self.input_dim = 5  # inflation, interest, unemployment, GDP, sp500_index
         # Model path relative to current directory
         self.model_path = Path(__file__).parent / "mlp_model.keras"
+        # Read-only NumPy weights set by freeze(); inference then bypasses TensorFlow
+        self.frozen_layers = None
         
     def create_model(self) -> Sequential:
         """
@@ -114,11 +116,46 @@ class MLPPredictor:
         
         return X, y
     
+    def freeze(self):
+        """
+        Copy the Dense weights into contiguous read-only NumPy arrays and run
+        inference with a NumPy forward pass from then on (Dropout is a no-op
+        at inference). Used before forking serving workers: the arrays are
+        shared copy-on-write and workers never touch the TensorFlow runtime.
+        """
+        if self.model is None:
+            self.load_model()
+        layers = []
+        for layer in self.model.layers:
+            weights = layer.get_weights()
+            if not weights:
+                continue  # Dropout
+            kernel, bias = (np.ascontiguousarray(w, dtype=np.float64) for w in weights)
+            kernel.flags.writeable = False
+            bias.flags.writeable = False
+            layers.append((kernel, bias, layer.get_config().get("activation", "linear")))
+        self.frozen_layers = layers
+
+    def _forward(self, X: np.ndarray) -> np.ndarray:
+        """NumPy forward pass over the frozen layers. Returns probability_up per row."""
+        h = X.astype(np.float64)
+        for kernel, bias, activation in self.frozen_layers:
+            # einsum instead of BLAS matmul: each row is reduced in the same
+            # order whatever the batch size, so sharded runs match bit for bit
+            h = np.einsum("ij,jk->ik", h, kernel) + bias
+            if activation == "relu":
+                h = np.maximum(h, 0.0)
+            elif activation == "sigmoid":
+                h = 1.0 / (1.0 + np.exp(-h))
+            elif activation != "linear":
+                raise ValueError(f"Unsupported activation in frozen MLP: {activation}")
+        return h.reshape(-1).astype(float)
+
     def predict(self, features: list) -> Dict[str, Any]:
         """
         Predict S&P 500 trend from numerical features.
         """
-        if self.model is None:
+        if self.model is None and self.frozen_layers is None:
             self.load_model()
         
         # Validate input
@@ -136,7 +173,10 @@ class MLPPredictor:
         X_normalized = self._normalize_features(X)
         
         # Predict
-        probability_up = float(self.model.predict(X_normalized, verbose=0)[0][0])
+        if self.frozen_layers is not None:
+            probability_up = float(self._forward(X_normalized)[0])
+        else:
+            probability_up = float(self.model.predict(X_normalized, verbose=0)[0][0])
         probability_down = 1.0 - probability_up
         
         # Determine trend
@@ -148,6 +188,32 @@ class MLPPredictor:
             "trend": trend
         }
     
+    def predict_batch(self, features_list: list) -> np.ndarray:
+        """
+        Predict probability UP for many feature rows in one forward pass.
+        
+        Args:
+            features_list: N rows of [inflation, interest, unemployment, GDP, sp500]
+            
+        Returns:
+            Array of shape (N,) with probability_up per row
+        """
+        if self.model is None and self.frozen_layers is None:
+            self.load_model()
+        if len(features_list) == 0:
+            return np.zeros(0)
+        
+        # Same padding/truncation rule as predict()
+        X = np.zeros((len(features_list), self.input_dim))
+        for i, features in enumerate(features_list):
+            row = list(features)[:self.input_dim]
+            X[i, :len(row)] = row
+        
+        X_normalized = self._normalize_features(X)
+        if self.frozen_layers is not None:
+            return self._forward(X_normalized)
+        return self.model.predict(X_normalized, verbose=0, batch_size=1024).reshape(-1).astype(float)
+    
     def _normalize_features(self, X: np.ndarray) -> np.ndarray:
         """
         Simple feature normalization.
@@ -0,0 +1,186 @@
+"""
+Prediction Result Cache
+Two-level cache (in-process LRU + SQLite store) for finished predictions,
+keyed by a canonical hash of the inputs and the model version.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+DEFAULT_CACHE_PATH = Path(__file__).parent.parent / "data" / "prediction_cache.sqlite"
+
+
+def make_cache_key(model_version: str, **inputs) -> str:
+    """
+    Canonical sha256 of the prediction inputs.
+    Floats are rounded to 10 significant digits so equal snapshots that went
+    through different float formatting still share a key.
+    """
+    def canonical(value):
+        if isinstance(value, float):
+            return float(f"{value:.10g}")
+        if isinstance(value, (list, tuple)):
+            return [canonical(v) for v in value]
+        if isinstance(value, dict):
+            return {k: canonical(v) for k, v in value.items()}
+        return value
+
+    payload = json.dumps({"model_version": model_version, "inputs": canonical(inputs)},
+                         sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PredictionCache:
+    """
+    L1: OrderedDict LRU in this process.
+    L2: SQLite file shared by every process on the host.
+
+    invalidate() bumps a generation counter stored in SQLite and clears both
+    levels; other processes notice the new generation within
+    `generation_check_sec` and drop their L1.
+    """
+
+    def __init__(self, path: Optional[Path] = DEFAULT_CACHE_PATH, max_entries: int = 1024,
+                 ttl_sec: float = 86400.0, generation_check_sec: float = 1.0):
+        """
+        Args:
+            path: SQLite file for the persistent level (None keeps the cache in memory only)
+            max_entries: L1 capacity
+            ttl_sec: Default time-to-live for new entries
+            generation_check_sec: How often L1 re-reads the shared generation counter
+        """
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self.generation_check_sec = generation_check_sec
+        self._lock = threading.Lock()
+        self._l1 = OrderedDict()  # key -> (expires_at, value)
+        self._generation = 0
+        self._generation_checked_at = 0.0
+        self.stats = {"l1_hits": 0, "l2_hits": 0, "misses": 0, "invalidations": 0}
+
+        self._db = None
+        if path is not None:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS predictions ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, model_version TEXT, "
+                "created_at REAL NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            self._db.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('generation', 0)")
+            self._generation = self._read_generation()
+
+    def _read_generation(self) -> int:
+        row = self._db.execute("SELECT value FROM meta WHERE name = 'generation'").fetchone()
+        return row[0] if row else 0
+
+    def _sync_generation(self, now: float):
+        """Drop L1 if another process invalidated the shared store."""
+        if self._db is None or now - self._generation_checked_at < self.generation_check_sec:
+            return
+        self._generation_checked_at = now
+        generation = self._read_generation()
+        if generation != self._generation:
+            self._generation = generation
+            self._l1.clear()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return a cached prediction or None (expired entries count as misses)."""
+        now = time.time()
+        with self._lock:
+            self._sync_generation(now)
+            entry = self._l1.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._l1.move_to_end(key)
+                    self.stats["l1_hits"] += 1
+                    return copy.deepcopy(entry[1])
+                del self._l1[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM predictions WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and row[1] > now:
+                    value = json.loads(row[0])
+                    self._put_l1(key, row[1], value)
+                    self.stats["l2_hits"] += 1
+                    return copy.deepcopy(value)
+
+            self.stats["misses"] += 1
+            return None
+
+    def set(self, key: str, value: Any, ttl_sec: Optional[float] = None, model_version: str = ""):
+        """Store a prediction in both levels."""
+        now = time.time()
+        expires_at = now + (self.ttl_sec if ttl_sec is None else ttl_sec)
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._put_l1(key, expires_at, value)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO predictions (key, value, model_version, created_at, expires_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, json.dumps(value), model_version, now, expires_at)
+                )
+
+    def _put_l1(self, key: str, expires_at: float, value: Any):
+        self._l1[key] = (expires_at, value)
+        self._l1.move_to_end(key)
+        while len(self._l1) > self.max_entries:
+            self._l1.popitem(last=False)
+
+    def invalidate(self, key: Optional[str] = None, reason: str = ""):
+        """
+        Drop one entry, or everything when key is None (e.g. new Tier 1/Tier 2 data landed).
+        """
+        with self._lock:
+            if key is not None:
+                self._l1.pop(key, None)
+                if self._db is not None:
+                    self._db.execute("DELETE FROM predictions WHERE key = ?", (key,))
+                return
+
+            self._l1.clear()
+            self.stats["invalidations"] += 1
+            if self._db is not None:
+                # Rolls back on error, so the connection is not left inside a transaction
+                with self._db:
+                    self._db.execute("BEGIN IMMEDIATE")
+                    self._db.execute("DELETE FROM predictions")
+                    self._db.execute("UPDATE meta SET value = value + 1 WHERE name = 'generation'")
+                self._generation = self._read_generation()
+        if reason:
+            print(f"Prediction cache invalidated: {reason}")
+
+    def purge_expired(self) -> int:
+        """Delete expired rows from the persistent store. Returns rows removed."""
+        if self._db is None:
+            return 0
+        with self._lock:
+            return self._db.execute("DELETE FROM predictions WHERE expires_at <= ?", (time.time(),)).rowcount
+
+
+# Global instance
+_cache_instance = None
+
+def get_prediction_cache() -> PredictionCache:
+    """Get or create the process-wide prediction cache."""
+    global _cache_instance
+    if _cache_instance is None:
+        path = os.environ.get("PREDICTION_CACHE_PATH", str(DEFAULT_CACHE_PATH))
+        _cache_instance = PredictionCache(
+            path=Path(path) if path else None,
+            ttl_sec=float(os.environ.get("PREDICTION_CACHE_TTL", "86400")),
+        )
+    return _cache_instance
@@ -0,0 +1,109 @@
+"""
+Single-Flight Request Coalescing
+Concurrent calls with the same key share one in-flight computation.
+"""
+
+import os
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+class _Call:
+    """One in-flight computation and the callers waiting on it."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    The first caller for a key (the leader) runs the function in its own
+    thread; callers arriving while it runs wait for and share its result,
+    or its exception. Nothing is cached once the call finishes.
+    """
+
+    def __init__(self, timeout_sec: Optional[float] = None):
+        """
+        Args:
+            timeout_sec: Default max seconds a follower waits for the leader
+        """
+        self.timeout_sec = timeout_sec
+        self._lock = threading.Lock()
+        self._calls: Dict[Any, _Call] = {}
+        self.stats = {"leaders": 0, "coalesced": 0, "errors": 0, "timeouts": 0, "max_waiters": 0}
+
+    def do(self, key: Any, fn: Callable[[], Any], timeout_sec: Optional[float] = None) -> Any:
+        """
+        Run fn once per key at a time.
+
+        Args:
+            key: Hashable canonical key of the computation
+            fn: Zero-argument callable
+            timeout_sec: Follower wait limit (overrides the default)
+
+        Raises:
+            TimeoutError: A follower waited longer than its timeout
+            Exception: Whatever the leader's fn raised
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+                self.stats["leaders"] += 1
+                leader = True
+            else:
+                call.waiters += 1
+                self.stats["coalesced"] += 1
+                self.stats["max_waiters"] = max(self.stats["max_waiters"], call.waiters)
+                leader = False
+
+        if not leader:
+            timeout = self.timeout_sec if timeout_sec is None else timeout_sec
+            if not call.done.wait(timeout):
+                with self._lock:
+                    self.stats["timeouts"] += 1
+                raise TimeoutError(f"Timed out after {timeout}s waiting for in-flight computation")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self.stats["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self) -> int:
+        """Number of keys currently being computed."""
+        with self._lock:
+            return len(self._calls)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["in_flight"] = len(self._calls)
+            return stats
+
+
+# Global instance
+_single_flight_instance = None
+
+def get_single_flight() -> SingleFlight:
+    """Get or create the process-wide single-flight group for predictions."""
+    global _single_flight_instance
+    if _single_flight_instance is None:
+        _single_flight_instance = SingleFlight(
+            timeout_sec=float(os.environ.get("SINGLE_FLIGHT_TIMEOUT_SEC", "60"))
+        )
+    return _single_flight_instance